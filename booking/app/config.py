@@ -17,12 +17,82 @@ class Config:
     MARKETING_ROUTING_KEY = os.getenv("MARKETING_ROUTING_KEY")
     BOOKING_CREATED_ROUTING_KEY = os.getenv("BOOKING_CREATED_ROUTING_KEY")
     BOOKING_CANCELLED_ROUTING_KEY = os.getenv("BOOKING_CANCELLED_ROUTING_KEY")
+    PAYMENT_LINK_CREATED_ROUTING_KEY = os.getenv("PAYMENT_LINK_CREATED_ROUTING_KEY", "payment_link_created")
 
     # API Keys
     ITINERARY_MS_PORT = os.getenv("ITINERARY_MS_PORT")
     PAYMENT_MS_PORT = os.getenv("PAYMENT_MS_PORT")
     API_PORT = os.getenv("API_PORT")
 
+    # Payment links: when async, POST /bookings returns at once and the payments
+    # service creates the link from the booking_created event. Clients can long
+    # poll GET /bookings/<id>?wait=<seconds> for it, waiting at most this long
+    BOOKING_ASYNC_PAYMENT_LINK = os.getenv("BOOKING_ASYNC_PAYMENT_LINK", "true").lower() == "true"
+    BOOKING_MAX_WAIT_SECONDS = float(os.getenv("BOOKING_MAX_WAIT_SECONDS", "30"))
+
+    # Booking storage: "sqlite" (kept in BOOKING_DB) or "memory" (lost on restart)
+    BOOKING_STORAGE = os.getenv("BOOKING_STORAGE", "sqlite")
+    BOOKING_DB = os.getenv("BOOKING_DB", "./bookings.db")
+
+    # Sharding: bookings are spread over BOOKING_SHARD_COUNT shards by consistent
+    # hashing of their id. BOOKING_SHARDS lists the shards this replica owns (all
+    # by default) and BOOKING_SHARD_URLS the host:port of the replica of each
+    # shard, to forward requests about bookings owned elsewhere
+    BOOKING_SHARD_COUNT = int(os.getenv("BOOKING_SHARD_COUNT", "1"))
+    BOOKING_SHARDS = [shard for shard in os.getenv("BOOKING_SHARDS", "").split(",") if shard] or [str(shard) for shard in range(BOOKING_SHARD_COUNT)]
+    BOOKING_SHARD_URLS = [url for url in os.getenv("BOOKING_SHARD_URLS", "").split(",") if url]
+
+    # HTTP client: connections kept per service (and how long to wait for a free one),
+    # timeouts in seconds, and retries (with exponential backoff) for failed connections
+    # and, on idempotent calls, 502/503/504 answers
+    HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+    HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "2"))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "2"))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "5"))
+    HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+    HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.2"))
+
+    # Itinerary cache, in seconds: how long entries are fresh, and for how long
+    # after that they are still served while being refreshed in the background
+    ITINERARY_CACHE_TTL = float(os.getenv("ITINERARY_CACHE_TTL", "600"))
+    ITINERARY_CACHE_STALE = float(os.getenv("ITINERARY_CACHE_STALE", "3600"))
+    ITINERARY_LIST_CACHE_TTL = float(os.getenv("ITINERARY_LIST_CACHE_TTL", "30"))
+    ITINERARY_LIST_CACHE_STALE = float(os.getenv("ITINERARY_LIST_CACHE_STALE", "300"))
+    # Promotions price bookings for this long at most, like in the itinerary service
+    PROMOTION_TTL_SECONDS = int(os.getenv("PROMOTION_TTL_SECONDS", "604800"))
+
+    # Publisher: messages per batch, whether each batch is committed in an AMQP
+    # transaction (delivery guarantee), and how many messages may wait to be sent
+    PUBLISHER_BATCH_SIZE = int(os.getenv("PUBLISHER_BATCH_SIZE", "100"))
+    PUBLISHER_TRANSACTIONS = os.getenv("PUBLISHER_TRANSACTIONS", "true").lower() == "true"
+    PUBLISHER_QUEUE_SIZE = int(os.getenv("PUBLISHER_QUEUE_SIZE", "10000"))
+
+    # Log shipping: lines per message, max delay, buffered lines and what to drop
+    # when the buffer is full ("drop_oldest" or "drop_newest")
+    LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "50"))
+    LOG_FLUSH_INTERVAL_MS = int(os.getenv("LOG_FLUSH_INTERVAL_MS", "200"))
+    LOG_BUFFER_SIZE = int(os.getenv("LOG_BUFFER_SIZE", "10000"))
+    LOG_OVERFLOW_POLICY = os.getenv("LOG_OVERFLOW_POLICY", "drop_oldest")
+
+    # Payment signature checks: processes verifying them (0 verifies in the consumer
+    # thread) and how many recent results are kept for redeliveries
+    VERIFY_WORKERS = int(os.getenv("VERIFY_WORKERS", "0"))
+    VERIFY_CACHE_SIZE = int(os.getenv("VERIFY_CACHE_SIZE", "10000"))
+
+    # Consumer: threads handling booking events (in order per booking) and promotions,
+    # and how many unacknowledged deliveries each booking event queue / the promotions queue gets
+    CONSUMER_WORKERS = int(os.getenv("CONSUMER_WORKERS", "8"))
+    PROMOTION_WORKERS = int(os.getenv("PROMOTION_WORKERS", "2"))
+    CONSUMER_PREFETCH = int(os.getenv("CONSUMER_PREFETCH", "50"))
+    PROMOTIONS_PREFETCH = int(os.getenv("PROMOTIONS_PREFETCH", "5"))
+
+    # Promotion fan-out: users per chunk, chunks sent at once, users notified per
+    # second (0 for no limit) and retries of a failed chunk
+    FANOUT_CHUNK_SIZE = int(os.getenv("FANOUT_CHUNK_SIZE", "1000"))
+    FANOUT_CONCURRENCY = int(os.getenv("FANOUT_CONCURRENCY", "4"))
+    FANOUT_RATE = float(os.getenv("FANOUT_RATE", "0"))
+    FANOUT_MAX_RETRIES = int(os.getenv("FANOUT_MAX_RETRIES", "3"))
+
     @classmethod
     def validate(cls):
         required_vars = [
@@ -0,0 +1,194 @@
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+from app.models.booking import Booking
+
+# Fields bookings can be listed by, besides the creation date
+INDEXED_FIELDS = ["status", "customer_email", "destination_id"]
+
+
+def list_key(booking: Booking) -> Tuple[str, str]:
+    """Position of a booking in listings: by creation date, then id."""
+    return booking.created_at.isoformat(), booking.id
+
+
+class BookingStore(ABC):
+    """Storage backend of the bookings. Implemented by MemoryBookingStore and SQLiteBookingStore."""
+
+    @abstractmethod
+    def save(self, booking: Booking) -> None:
+        ...
+
+    @abstractmethod
+    def get(self, booking_id: str) -> Optional[Booking]:
+        ...
+
+    @abstractmethod
+    def list(self, filters: dict, limit: Optional[int] = None, after: Optional[Tuple[str, str]] = None) -> List[Booking]:
+        """
+        Bookings matching `filters`, ordered by `list_key`.
+
+        Args:
+            filters (dict): Exact values for INDEXED_FIELDS (status as its value),
+                and `created_from` (inclusive) / `created_to` (exclusive) as ISO dates
+            limit (int): Maximum number of bookings, all when None
+            after (tuple): Only bookings whose `list_key` follows this one
+        """
+
+
+class MemoryBookingStore(BookingStore):
+    """
+    Bookings kept in a dict, lost on restart.
+
+    Listings use secondary indexes updated on every save: the ids per value of
+    each INDEXED_FIELDS field, and every `list_key` in order, so a page only
+    touches the bookings it returns (or the ones matching the filters).
+    """
+
+    def __init__(self):
+        self.bookings: Dict[str, Booking] = {}
+        self._lock = threading.Lock()
+        self._keys: List[Tuple[str, str]] = []
+        self._indexes: Dict[str, Dict[object, Set[str]]] = {field: defaultdict(set) for field in INDEXED_FIELDS}
+        # Indexed values of each booking, to move it when they change
+        self._indexed: Dict[str, dict] = {}
+
+    def _index_values(self, booking: Booking) -> dict:
+        return {
+            "status": booking.status.value,
+            "customer_email": booking.customer_email,
+            "destination_id": booking.destination_id,
+        }
+
+    def save(self, booking: Booking) -> None:
+        values = self._index_values(booking)
+        with self._lock:
+            previous = self._indexed.get(booking.id)
+            if previous is None:
+                insort(self._keys, list_key(booking))
+            for field in INDEXED_FIELDS:
+                if previous is not None and previous[field] != values[field]:
+                    self._indexes[field][previous[field]].discard(booking.id)
+                self._indexes[field][values[field]].add(booking.id)
+            self._indexed[booking.id] = values
+            self.bookings[booking.id] = booking
+
+    def get(self, booking_id: str) -> Optional[Booking]:
+        return self.bookings.get(booking_id)
+
+    def list(self, filters: dict, limit: Optional[int] = None, after: Optional[Tuple[str, str]] = None) -> List[Booking]:
+        with self._lock:
+            postings = [self._indexes[field].get(filters[field], set()) for field in INDEXED_FIELDS if filters.get(field) is not None]
+            if postings:
+                postings.sort(key=len)
+                ids = postings[0].intersection(*postings[1:])
+                keys = sorted(list_key(self.bookings[booking_id]) for booking_id in ids)
+            else:
+                keys = self._keys
+
+            start = bisect_right(keys, after) if after else 0
+            if filters.get("created_from"):
+                start = max(start, bisect_left(keys, (filters["created_from"],)))
+            end = bisect_left(keys, (filters["created_to"],)) if filters.get("created_to") else len(keys)
+            if limit is not None:
+                end = min(end, start + limit)
+
+            return [self.bookings[booking_id] for _, booking_id in keys[start:end]]
+
+
+class SQLiteBookingStore(BookingStore):
+    """
+    Bookings kept in an SQLite file, one row per booking.
+
+    The booking itself is stored as JSON, next to indexed copies of the fields
+    bookings are looked up by. The database runs in WAL mode, so readers do not
+    block the writer, and each thread uses its own connection. Statements are
+    parameterized and built from a fixed set of clauses, so sqlite3 prepares
+    each one once per connection and reuses it.
+    """
+    SCHEMA = [
+        """
+        CREATE TABLE IF NOT EXISTS bookings (
+            id TEXT PRIMARY KEY,
+            customer_email TEXT NOT NULL,
+            status TEXT NOT NULL,
+            destination_id INTEGER NOT NULL,
+            created_at TEXT NOT NULL,
+            data TEXT NOT NULL
+        )
+        """,
+        # Each filter index is ordered like listings, so a filtered page is a range scan
+        "CREATE INDEX IF NOT EXISTS bookings_customer_email_created ON bookings (customer_email, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS bookings_status_created ON bookings (status, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS bookings_destination_id_created ON bookings (destination_id, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS bookings_created_at ON bookings (created_at, id)",
+    ]
+    UPSERT = """
+        INSERT INTO bookings (id, customer_email, status, destination_id, created_at, data)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (id) DO UPDATE SET
+            customer_email = excluded.customer_email,
+            status = excluded.status,
+            destination_id = excluded.destination_id,
+            created_at = excluded.created_at,
+            data = excluded.data
+    """
+    SELECT_ONE = "SELECT data FROM bookings WHERE id = ?"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        for statement in self.SCHEMA:
+            connection.execute(statement)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit: every save is its own transaction
+            connection = sqlite3.connect(self.path, isolation_level=None, timeout=5)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def save(self, booking: Booking) -> None:
+        self._connection().execute(self.UPSERT, (
+            booking.id,
+            booking.customer_email,
+            booking.status.value,
+            booking.destination_id,
+            booking.created_at.isoformat(),
+            booking.model_dump_json(),
+        ))
+
+    def get(self, booking_id: str) -> Optional[Booking]:
+        row = self._connection().execute(self.SELECT_ONE, (booking_id,)).fetchone()
+        return Booking.model_validate_json(row[0]) if row else None
+
+    def list(self, filters: dict, limit: Optional[int] = None, after: Optional[Tuple[str, str]] = None) -> List[Booking]:
+        conditions, params = [], []
+        for field in INDEXED_FIELDS:
+            if filters.get(field) is not None:
+                conditions.append(f"{field} = ?")
+                params.append(filters[field])
+        if filters.get("created_from"):
+            conditions.append("created_at >= ?")
+            params.append(filters["created_from"])
+        if filters.get("created_to"):
+            conditions.append("created_at < ?")
+            params.append(filters["created_to"])
+        if after:
+            conditions.append("(created_at, id) > (?, ?)")
+            params.extend(after)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        # LIMIT -1 is no limit
+        query = f"SELECT data FROM bookings {where} ORDER BY created_at, id LIMIT ?"
+        params.append(limit if limit is not None else -1)
+
+        rows = self._connection().execute(query, params).fetchall()
+        return [Booking.model_validate_json(data) for (data,) in rows]
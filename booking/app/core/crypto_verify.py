@@ -2,17 +2,36 @@ import os
 import rsa 
 from dotenv import load_dotenv
 
+# OpenSSL backed verification is much faster than the pure Python rsa package
+try:
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import padding
+except ImportError:
+    serialization = None
+
 load_dotenv(override=True)
 
 PUBLIC_KEY_FILE = os.environ.get("PAYMENTS_SERVICE_PUBLIC_KEY")
 
 public_key=None
+fast_public_key=None
 
 if os.path.exists(PUBLIC_KEY_FILE):
     with open(PUBLIC_KEY_FILE, "rb") as pub_file:
-        public_key = rsa.PublicKey.load_pkcs1(pub_file.read())
+        key_data = pub_file.read()
+        public_key = rsa.PublicKey.load_pkcs1(key_data)
+        if serialization:
+            fast_public_key = serialization.load_pem_public_key(key_data)
 
 def verify_signature(value, sig):
+    if fast_public_key:
+        # Same PKCS#1 v1.5 SHA-256 signature as rsa.sign(..., "SHA-256")
+        try:
+            fast_public_key.verify(sig, value.encode(), padding.PKCS1v15(), hashes.SHA256())
+            return True
+        except InvalidSignature:
+            return False
     if public_key:
         try:
             rsa.verify(value.encode(), sig, public_key)
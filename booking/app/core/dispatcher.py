@@ -0,0 +1,43 @@
+import queue
+import threading
+import zlib
+
+
+class KeyedDispatcher:
+    """
+    Runs tasks on a fixed pool of worker threads, in order per key.
+
+    Every key is always handled by the same worker (chosen by a hash of the key),
+    so tasks with the same key run one after the other in submission order,
+    while tasks with different keys run in parallel on up to `workers` threads.
+    """
+
+    def __init__(self, workers: int):
+        self._queues = [queue.Queue() for _ in range(workers)]
+        self._threads = []
+        for worker_queue in self._queues:
+            thread = threading.Thread(target=self._run, args=(worker_queue,))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, key: str, task) -> None:
+        worker = zlib.crc32(key.encode("utf-8")) % len(self._queues)
+        self._queues[worker].put(task)
+
+    def _run(self, worker_queue: queue.Queue):
+        while True:
+            task = worker_queue.get()
+            if task is None:
+                return
+            try:
+                task()
+            except Exception as e:
+                print(f"Error in dispatcher task: {e}")
+
+    def stop(self) -> None:
+        """Run the tasks already submitted, then stop the workers."""
+        for worker_queue in self._queues:
+            worker_queue.put(None)
+        for thread in self._threads:
+            thread.join()
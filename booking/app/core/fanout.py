@@ -0,0 +1,74 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TokenBucket:
+    """Allows `rate` units per second on average, with bursts of up to one second's worth."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, units: int) -> None:
+        """Block until `units` can be spent. A rate of 0 never blocks."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                # A chunk larger than the bucket waits for a full bucket, then goes through
+                if self._tokens >= min(units, self.rate):
+                    self._tokens -= units
+                    return
+                wait = (min(units, self.rate) - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class FanOut:
+    """
+    Delivers one message to many recipients in the background.
+
+    Recipients are split into chunks of `chunk_size`, sent by at most
+    `concurrency` threads and throttled to `rate` recipients per second (0 for
+    no limit). A failing chunk is retried up to `max_retries` times with
+    exponential backoff before being given up.
+    """
+    RETRY_BASE_SECONDS = 0.5
+
+    def __init__(self, send, chunk_size: int, concurrency: int, rate: float, max_retries: int):
+        """
+        Args:
+            send (callable): send(recipients, message), raises on failure
+        """
+        self._send = send
+        self._chunk_size = chunk_size
+        self._max_retries = max_retries
+        self._bucket = TokenBucket(rate)
+        self._pool = ThreadPoolExecutor(max_workers=concurrency)
+
+    def publish(self, recipients: list, message) -> int:
+        """Queue `message` for every recipient and return how many there are."""
+        for start in range(0, len(recipients), self._chunk_size):
+            self._pool.submit(self._deliver, recipients[start:start + self._chunk_size], message)
+        return len(recipients)
+
+    def _deliver(self, chunk: list, message) -> None:
+        self._bucket.acquire(len(chunk))
+        for attempt in range(self._max_retries + 1):
+            try:
+                self._send(chunk, message)
+                return
+            except Exception as e:
+                print(f"Error notifying {len(chunk)} users (attempt {attempt + 1}): {e}")
+                if attempt < self._max_retries:
+                    time.sleep(self.RETRY_BASE_SECONDS * 2 ** attempt)
+        print(f"Gave up notifying {len(chunk)} users")
+
+    def stop(self) -> None:
+        """Deliver what is queued, then stop the threads."""
+        self._pool.shutdown()
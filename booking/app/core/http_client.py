@@ -0,0 +1,85 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from app.config import config
+
+
+class HttpClient:
+    """
+    Shared HTTP client for the calls to the other services.
+
+    One requests.Session per service keeps connections alive between requests.
+    At most HTTP_POOL_SIZE requests per host run at once; callers wait up to
+    HTTP_POOL_TIMEOUT for a free slot, then fail with requests.Timeout. Every call
+    gets a (connect, read) timeout. Failed connections are retried up to
+    HTTP_RETRIES times with backoff. 502/503/504 answers are only retried for
+    idempotent calls, and reads are never retried, so a request the service may
+    already have handled is not sent twice.
+    """
+    _instance = None
+    _lock = threading.Lock()
+    _sessions: dict[tuple[str, bool], requests.Session] = {}
+    _slots: dict[str, threading.BoundedSemaphore] = {}
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super(HttpClient, cls).__new__(cls)
+        return cls._instance
+
+    def _session(self, host: str, idempotent: bool) -> requests.Session:
+        session = self._sessions.get((host, idempotent))
+        if session is None:
+            with self._lock:
+                session = self._sessions.get((host, idempotent))
+                if session is None:
+                    session = self._create_session(idempotent)
+                    self._sessions[(host, idempotent)] = session
+                    self._slots.setdefault(host, threading.BoundedSemaphore(config.HTTP_POOL_SIZE))
+        return session
+
+    def _create_session(self, idempotent: bool) -> requests.Session:
+        retry = Retry(
+            total=config.HTTP_RETRIES,
+            connect=config.HTTP_RETRIES,
+            read=0,
+            status=config.HTTP_RETRIES if idempotent else 0,
+            status_forcelist=[502, 503, 504] if idempotent else [],
+            allowed_methods=None,
+            backoff_factor=config.HTTP_RETRY_BACKOFF,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=config.HTTP_POOL_SIZE,
+            max_retries=retry
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        return session
+
+    def request(self, method: str, host: str, port: str, path: str, idempotent: bool = None, **kwargs) -> requests.Response:
+        """
+        Send a request to http://{host}:{port}{path}, raises requests.RequestException on failure.
+
+        Args:
+            idempotent (bool): Whether the call can safely be sent again after an error
+                answer. Defaults to True for GET only; pass False for a GET with side effects.
+        """
+        if idempotent is None:
+            idempotent = method == "GET"
+        kwargs.setdefault("timeout", (config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT))
+        session = self._session(host, idempotent)
+
+        slots = self._slots[host]
+        if not slots.acquire(timeout=config.HTTP_POOL_TIMEOUT):
+            raise requests.Timeout(f"No free connection to {host} after {config.HTTP_POOL_TIMEOUT}s")
+        try:
+            return session.request(method, f"http://{host}:{port}{path}", **kwargs)
+        finally:
+            slots.release()
+
+    def get(self, host: str, port: str, path: str, **kwargs) -> requests.Response:
+        return self.request("GET", host, port, path, **kwargs)
@@ -0,0 +1,196 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from urllib.parse import urlencode
+from app.config import config
+from app.core.http_client import HttpClient
+
+
+class ItineraryCache:
+    """
+    Read-through cache of the itinerary service, with stale-while-revalidate.
+
+    Single itineraries are kept for ITINERARY_CACHE_TTL seconds. Their
+    `available_cabins` is kept current in between by the booking_created and
+    booking_cancelled events (see `apply_booking_event`), so bookings can be
+    checked without a request, and promotions are laid over their `cabin_cost`
+    until they expire like in the itinerary service (see `apply_promotion`), so
+    bookings are priced like the catalog. Catalog pages are kept by query string
+    for ITINERARY_LIST_CACHE_TTL seconds and warm the itinerary entries.
+
+    An entry older than its TTL but within its stale window is still returned,
+    and a single background request refreshes it. Older entries are fetched
+    before returning.
+    """
+    MAX_LISTS = 1024
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(ItineraryCache, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            with self._lock:
+                if not hasattr(self, '_initialized'):
+                    self._entries_lock = threading.Lock()
+                    # itinerary id -> (itinerary, fetched at)
+                    self._itineraries: dict[int, tuple[dict, float]] = {}
+                    # query string -> ((body, status), fetched at)
+                    self._lists: OrderedDict[str, tuple[tuple, float]] = OrderedDict()
+                    self._refreshing: set = set()
+                    # itinerary id -> (boarding date, new cost, expires at, epoch seconds)
+                    self._promotions: dict[int, tuple[str, float, float]] = {}
+                    self._initialized = True
+
+    def _state(self, fetched_at: float, ttl: float, stale: float) -> str:
+        age = time.monotonic() - fetched_at
+        if age < ttl:
+            return "fresh"
+        if age < ttl + stale:
+            return "stale"
+        return "expired"
+
+    def _refresh_in_background(self, key: tuple, fetch) -> None:
+        with self._entries_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                fetch()
+            except Exception as e:
+                print(f"Failed refreshing itinerary cache {key}: {e}")
+            finally:
+                with self._entries_lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def get_itinerary(self, itinerary_id: int) -> dict | None:
+        """
+        Return the itinerary as sent by the itinerary service, or None if it
+        does not exist. Raises requests.RequestException if it has to be fetched
+        and the service cannot be reached.
+        """
+        self._expire_promotion(itinerary_id)
+        entry = self._itineraries.get(itinerary_id)
+        if entry is not None:
+            itinerary, fetched_at = entry
+            state = self._state(fetched_at, config.ITINERARY_CACHE_TTL, config.ITINERARY_CACHE_STALE)
+            if state == "stale":
+                self._refresh_in_background(("itinerary", itinerary_id), lambda: self._fetch_itinerary(itinerary_id))
+            if state != "expired":
+                return self._with_promotion(itinerary)
+        return self._with_promotion(self._fetch_itinerary(itinerary_id))
+
+    def _with_promotion(self, itinerary: dict | None) -> dict | None:
+        """The itinerary at its promotional price when one applies to its departure."""
+        if itinerary is None:
+            return None
+        promotion = self._promotions.get(itinerary["id"])
+        if promotion is None or promotion[0] != itinerary["date"] or promotion[2] <= time.time():
+            return itinerary
+        return {**itinerary, "cabin_cost": promotion[1]}
+
+    def _expire_promotion(self, itinerary_id: int) -> None:
+        """
+        Drop the promotion of `itinerary_id` once it is over, with the cached
+        itinerary: fetched during the promotion, its cabin_cost is the promotional one.
+        """
+        promotion = self._promotions.get(itinerary_id)
+        if promotion is None or promotion[2] > time.time():
+            return
+        with self._entries_lock:
+            if self._promotions.get(itinerary_id) == promotion:
+                del self._promotions[itinerary_id]
+                self._itineraries.pop(itinerary_id, None)
+
+    def apply_promotion(self, itinerary_id: int, boarding_date: str, new_cost: float) -> None:
+        """
+        Price the departure of `itinerary_id` on `boarding_date` at `new_cost` per
+        cabin for PROMOTION_TTL_SECONDS at most and never past the boarding date,
+        like the itinerary service does with the same promotion event.
+
+        Raises:
+            ValueError: If the boarding date or the cost is invalid
+        """
+        boarding_date = date.fromisoformat(boarding_date)
+        new_cost = float(new_cost)
+        if not math.isfinite(new_cost) or new_cost < 0:
+            raise ValueError(f"Invalid cost: {new_cost}")
+
+        expires_at = min(time.time() + config.PROMOTION_TTL_SECONDS, datetime.combine(boarding_date, datetime.min.time()).timestamp())
+        with self._entries_lock:
+            self._promotions[itinerary_id] = (boarding_date.isoformat(), new_cost, expires_at)
+
+    def _fetch_itinerary(self, itinerary_id: int) -> dict | None:
+        response = HttpClient().get("itinerary", config.ITINERARY_MS_PORT, f"/itineraries/{itinerary_id}")
+        if response.status_code != 200:
+            with self._entries_lock:
+                self._itineraries.pop(itinerary_id, None)
+            return None
+
+        itinerary = response.json()
+        with self._entries_lock:
+            self._itineraries[itinerary_id] = (itinerary, time.monotonic())
+        return itinerary
+
+    def get_list(self, params: dict) -> tuple:
+        """
+        Return (body, status) of GET /itineraries with `params`. Raises
+        requests.RequestException if it has to be fetched and the service cannot
+        be reached.
+        """
+        key = urlencode(params, doseq=True)
+        entry = self._lists.get(key)
+        if entry is not None:
+            response, fetched_at = entry
+            state = self._state(fetched_at, config.ITINERARY_LIST_CACHE_TTL, config.ITINERARY_LIST_CACHE_STALE)
+            if state == "stale":
+                self._refresh_in_background(("list", key), lambda: self._fetch_list(key, params))
+            if state != "expired":
+                with self._entries_lock:
+                    if key in self._lists:
+                        self._lists.move_to_end(key)
+                return response
+        return self._fetch_list(key, params)
+
+    def _fetch_list(self, key: str, params: dict) -> tuple:
+        response = HttpClient().get("itinerary", config.ITINERARY_MS_PORT, "/itineraries", params=params)
+        body = response.json()
+        if response.status_code != 200:
+            return body, response.status_code
+
+        now = time.monotonic()
+        with self._entries_lock:
+            self._lists[key] = ((body, response.status_code), now)
+            self._lists.move_to_end(key)
+            while len(self._lists) > self.MAX_LISTS:
+                self._lists.popitem(last=False)
+
+            # Whole itineraries of the page also serve single lookups
+            if "fields" not in params:
+                items = body["items"] if isinstance(body, dict) else body
+                for itinerary in items:
+                    self._itineraries.setdefault(itinerary["id"], (itinerary, now))
+
+        return body, response.status_code
+
+    def apply_booking_event(self, itinerary_id: int, cabins: int) -> None:
+        """Add `cabins` (negative for a booking) to the cached available cabins."""
+        with self._entries_lock:
+            entry = self._itineraries.get(itinerary_id)
+            if entry is None:
+                return
+            itinerary, fetched_at = entry
+            available_cabins = max(0, itinerary["available_cabins"] + cabins)
+            # Replace rather than mutate, readers may hold the previous dict
+            self._itineraries[itinerary_id] = ({**itinerary, "available_cabins": available_cabins}, fetched_at)
@@ -0,0 +1,101 @@
+import queue
+import threading
+import time
+import pika
+
+
+class Publisher:
+    """
+    Background publisher fed by an in-process queue.
+
+    Request threads only enqueue messages, so they never wait on the broker or on
+    each other. A single thread owns the publishing connection, drains up to
+    `batch_size` messages at a time and, when `transactional` is set, commits each
+    batch in one AMQP transaction: the broker has accepted every message of the
+    batch once tx_commit returns, at the cost of one round trip per batch.
+    """
+    MAX_ATTEMPTS = 5
+
+    def __init__(self, create_connection, setup, batch_size: int, transactional: bool, max_queue: int):
+        self._create_connection = create_connection
+        self._setup = setup
+        self._batch_size = batch_size
+        self._transactional = transactional
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._connection = None
+        self._channel = None
+        self._running = True
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def publish(self, exchange: str, routing_key: str, body: bytes, headers: dict) -> None:
+        """Queue a message for publishing. Blocks only when the queue is full."""
+        self._queue.put((exchange, routing_key, body, headers))
+
+    def _connect(self):
+        if self._connection and self._connection.is_open and self._channel and self._channel.is_open:
+            return
+        self._connection = self._create_connection()
+        self._channel = self._connection.channel()
+        self._setup(self._channel)
+        if self._transactional:
+            self._channel.tx_select()
+
+    def _close(self):
+        try:
+            if self._connection and self._connection.is_open:
+                self._connection.close()
+        except Exception:
+            pass
+        self._connection = None
+        self._channel = None
+
+    def _run(self):
+        while self._running or not self._queue.empty():
+            try:
+                batch = [self._queue.get(timeout=1)]
+            except queue.Empty:
+                # Idle: let the connection answer heartbeats
+                if self._connection and self._connection.is_open:
+                    try:
+                        self._connection.process_data_events(time_limit=0)
+                    except Exception as e:
+                        print(f"Publisher connection lost: {e}")
+                        self._close()
+                continue
+
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._send(batch)
+
+    def _send(self, batch: list):
+        for attempt in range(self.MAX_ATTEMPTS):
+            try:
+                self._connect()
+                for exchange, routing_key, body, headers in batch:
+                    self._channel.basic_publish(
+                        exchange=exchange,
+                        routing_key=routing_key,
+                        body=body,
+                        properties=pika.BasicProperties(headers=headers)
+                    )
+                if self._transactional:
+                    self._channel.tx_commit()
+                return
+            except Exception as e:
+                print(f"Error publishing batch of {len(batch)} messages (attempt {attempt + 1}): {e}")
+                self._close()
+                time.sleep(1)
+
+        print(f"Error: dropped batch of {len(batch)} messages, broker unavailable.")
+
+    def stop(self):
+        """Publish what is still queued, then close the connection."""
+        self._running = False
+        self._thread.join()
+        self._close()
@@ -3,19 +3,46 @@ import json
 import time
 import pika
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 from app.config import config
 from app.services.marketing_manager import MarketingManager
-from app.core.crypto_verify import verify_signature
+from app.core.signature_verifier import SignatureVerifier
+from app.core.publisher import Publisher
+from common.log_sink import LogSink
+from app.core.itinerary_cache import ItineraryCache
+from app.core.dispatcher import KeyedDispatcher
 from app.services.booking_manager import BookingsManager
 from app.models.payment import Payment
 from app.models.ticket import TicketBookingResponse
 
+DEAD_LETTER_QUEUE = "booking_dead_letter"
+
 class RabbitMQManager:
+    """
+    Publishes booking events and consumes payment, ticket and promotion events.
+
+    The consumer thread owns its own connection, registers its consumers once and
+    blocks in start_consuming. Booking events are handled on a KeyedDispatcher, in
+    order per booking, and promotions on a pool of their own so a fan-out never
+    delays a booking. Deliveries are acknowledged after handling, and those that
+    can't be handled are kept in DEAD_LETTER_QUEUE. Messages are published by
+    a Publisher thread with its own connection, so request threads only enqueue
+    them. Log lines are batched by a LogSink. Promotions are only received for
+    the destinations that have subscribers (see _apply_promotion_bindings).
+    """
     _instance = None
-    _connection = None
-    _channel = None
+    _publisher = None
+    _log_sink = None
+    _verifier = None
+    _dispatcher = None
+    _promotion_pool = None
+    _consumer_connection = None
+    _consumer_channel = None
     _consumer_thread = None
+    _promotions_queue_name = None
+    _promotion_bindings: set = set()
     _running = False
     _lock = threading.Lock()
 
@@ -29,9 +56,29 @@ class RabbitMQManager:
         if not hasattr(self, '_initialized'):
             with self._lock:
                 if not hasattr(self, '_initialized'):
-                    self._connection = self._create_connection()
-                    self._channel = self._connection.channel()
-                    self._setup()
+                    self._publisher = Publisher(
+                        create_connection=self._create_connection,
+                        setup=self._setup,
+                        batch_size=config.PUBLISHER_BATCH_SIZE,
+                        transactional=config.PUBLISHER_TRANSACTIONS,
+                        max_queue=config.PUBLISHER_QUEUE_SIZE
+                    )
+                    self._log_sink = LogSink(
+                        create_connection=self._create_connection,
+                        sender="booking",
+                        routing_key=config.LOGS_ROUTING_KEY,
+                        batch_size=config.LOG_BATCH_SIZE,
+                        flush_interval_ms=config.LOG_FLUSH_INTERVAL_MS,
+                        capacity=config.LOG_BUFFER_SIZE,
+                        overflow_policy=config.LOG_OVERFLOW_POLICY
+                    )
+                    self._verifier = SignatureVerifier(
+                        workers=config.VERIFY_WORKERS,
+                        cache_size=config.VERIFY_CACHE_SIZE
+                    )
+                    self._dispatcher = KeyedDispatcher(workers=config.CONSUMER_WORKERS)
+                    self._promotion_pool = ThreadPoolExecutor(max_workers=config.PROMOTION_WORKERS)
+                    MarketingManager().on_interest_change = self._sync_promotion_bindings
                     self._start_consumer_thread()
                     self._initialized = True
 
@@ -50,31 +97,64 @@ class RabbitMQManager:
             )
         )
 
-    def _setup(self):
-        self._channel.exchange_declare(exchange="direct", exchange_type="direct")
-        self._channel.exchange_declare(exchange="promotions_topic", exchange_type="topic")
+    def _setup(self, channel):
+        channel.exchange_declare(exchange="direct", exchange_type="direct")
+        channel.exchange_declare(exchange="promotions_topic", exchange_type="topic")
+
+        # Payment Accepted, Payment Rejected, Ticket Generated and Payment Link Created
+        # Queues ->  consumer, one of each per owned shard
+        for queue_name, routing_key in self._event_queues().items():
+            for shard_queue, shard_routing_key in self._shard_queues(queue_name, routing_key):
+                channel.queue_declare(queue=shard_queue, durable=True)
+                channel.queue_bind(exchange="direct", queue=shard_queue, routing_key=shard_routing_key)
 
-        # Payment Accepted Queue ->  consumer
-        queue_name = "payment_approved"
-        self._channel.queue_declare(queue=queue_name, durable=True)
-        self._channel.queue_bind(exchange="direct", queue=queue_name, routing_key=config.PAYMENT_ACCEPTED_ROUTING_KEY)
+        # Dead Letter Queue -> events that can't be handled, kept for inspection
+        channel.queue_declare(queue=DEAD_LETTER_QUEUE, durable=True)
 
-        # Payment Rejected Queue ->  consumer
-        queue_name = "payment_rejected"
-        self._channel.queue_declare(queue=queue_name, durable=True)
-        self._channel.queue_bind(exchange="direct", queue=queue_name, routing_key=config.PAYMENT_REJECTED_ROUTING_KEY)
+        print("Exchanges and queues setup complete")
 
-        # Ticket Generated Queue ->  consumer
-        queue_name = "ticket_generated"
-        self._channel.queue_declare(queue=queue_name, durable=True)
-        self._channel.queue_bind(exchange="direct", queue=queue_name, routing_key=config.TICKET_GENERATED_ROUTING_KEY)
+    def _event_queues(self) -> dict:
+        """Queues of the events about a single booking, with their routing key."""
+        return {
+            "payment_approved": config.PAYMENT_ACCEPTED_ROUTING_KEY,
+            "payment_rejected": config.PAYMENT_REJECTED_ROUTING_KEY,
+            "ticket_generated": config.TICKET_GENERATED_ROUTING_KEY,
+            "payment_link_created": config.PAYMENT_LINK_CREATED_ROUTING_KEY,
+        }
 
-        # Promotion Queue ->  consumer
-        queue_name = "promotions"
-        self._channel.queue_declare(queue=queue_name, durable=True)
-        self._channel.queue_bind(exchange="promotions_topic", queue=queue_name, routing_key=str(config.MARKETING_ROUTING_KEY) + f".#")
+    def _shard_queues(self, queue_name: str, routing_key: str) -> list[tuple[str, str]]:
+        """
+        (queue, routing key) pairs to consume an event about bookings from. When
+        sharded, publishers suffix the routing key with the booking's shard (see
+        HashRing) and there is one queue per shard this replica owns.
+        """
+        if config.BOOKING_SHARD_COUNT == 1:
+            return [(queue_name, routing_key)]
+        return [(f"{queue_name}.{shard}", f"{routing_key}.{shard}") for shard in config.BOOKING_SHARDS]
 
-        print("Exchanges and queues setup complete")
+    def _sync_promotion_bindings(self):
+        """Called by MarketingManager when the destinations with subscribers change."""
+        connection = self._consumer_connection
+        if connection is None or not connection.is_open:
+            # Bindings are applied again when the consumer reconnects
+            return
+        try:
+            connection.add_callback_threadsafe(self._apply_promotion_bindings)
+        except Exception as e:
+            print(f"Could not update promotion bindings: {e}")
+
+    def _apply_promotion_bindings(self):
+        """
+        Bind the promotions queue to the promotions of the destinations somebody is
+        subscribed to (or to all of them if somebody is subscribed to every promotion)
+        and unbind the others. Runs on the consumer thread.
+        """
+        wanted = {f"{config.MARKETING_ROUTING_KEY}.{suffix}" for suffix in MarketingManager().routing_interest()}
+        for routing_key in wanted - self._promotion_bindings:
+            self._consumer_channel.queue_bind(exchange="promotions_topic", queue=self._promotions_queue_name, routing_key=routing_key)
+        for routing_key in self._promotion_bindings - wanted:
+            self._consumer_channel.queue_unbind(exchange="promotions_topic", queue=self._promotions_queue_name, routing_key=routing_key)
+        self._promotion_bindings = wanted
 
     def _start_consumer_thread(self):
         if not self._consumer_thread:
@@ -83,90 +163,151 @@ class RabbitMQManager:
             self._consumer_thread.daemon = True
             self._consumer_thread.start()
 
-    def _reconnect_if_needed(self):
-        if not self._connection or self._connection.is_closed or not self._channel or self._channel.is_closed:
-            print("Connection lost. Reconnecting...")
-            try:
-                self._connection = self._create_connection()
-                self._channel = self._connection.channel()
-                self._setup()
-                print("Reconnection successful.")
-            except Exception as e:
-                print(f"Failed to reconnect: {e}")
-                if self._connection and not self._connection.is_closed:
-                    self._connection.close()
-                self._connection = None
-                self._channel = None
-                return False
-        return True
-
     def _consume_messages(self):
         print("Consumer thread started.")
-        queues = ["payment_approved", "payment_rejected", "ticket_generated", "promotions"]
         handlers = {
             "payment_approved": self._handle_payment_approved,
             "payment_rejected": self._handle_payment_rejected,
             "ticket_generated": self._handle_ticket_generated,
-            "promotions": self._handle_promotion
+            "payment_link_created": self._handle_payment_link_created,
         }
 
         while self._running:
             try:
-                with self._lock:
-                    if not self._reconnect_if_needed():
-                        time.sleep(5)
-                        continue
-
-                    # Set up consumers for each queue if not already set up
-                    for queue_name in queues:
-                        try:
-                            self._channel.basic_consume(
-                                queue=queue_name,
-                                on_message_callback=lambda ch, method, properties, body, q=queue_name: 
-                                    handlers[q](ch, method, properties, body),
-                                auto_ack=True
-                            )
-                        except Exception as e:
-                            print(f"Error setting up consumer for {queue_name}: {e}")
-                            continue
-                
-                # Process any pending messages without blocking
-                if self._connection and self._connection.is_open:
-                    self._connection.process_data_events()
-                
-                time.sleep(0.1)  # Small sleep to prevent CPU spinning
+                self._consumer_connection = self._create_connection()
+                self._consumer_channel = self._consumer_connection.channel()
+                self._setup(self._consumer_channel)
+
+                # Prefetch applies to the consumers registered after it, so each kind of queue has its own
+                self._consumer_channel.basic_qos(prefetch_count=config.CONSUMER_PREFETCH)
+                for queue_name, routing_key in self._event_queues().items():
+                    for shard_queue, _ in self._shard_queues(queue_name, routing_key):
+                        self._consumer_channel.basic_consume(
+                            queue=shard_queue,
+                            on_message_callback=partial(self._dispatch, handlers[queue_name], self._booking_id_of)
+                        )
+
+                # Subscribers are per replica, so each one reads promotions from its own exclusive
+                # queue, bound only to the destinations its users are interested in
+                self._promotions_queue_name = self._consumer_channel.queue_declare(queue="", exclusive=True).method.queue
+                self._promotion_bindings = set()
+                self._apply_promotion_bindings()
+                self._consumer_channel.basic_qos(prefetch_count=config.PROMOTIONS_PREFETCH)
+                self._consumer_channel.basic_consume(
+                    queue=self._promotions_queue_name,
+                    on_message_callback=self._dispatch_promotion
+                )
+
+                # Booking events of every booking instance keep the itinerary cache current,
+                # so each instance reads them from its own exclusive queue
+                cache_queue = self._consumer_channel.queue_declare(queue="", exclusive=True).method.queue
+                for routing_key in [config.BOOKING_CREATED_ROUTING_KEY, config.BOOKING_CANCELLED_ROUTING_KEY]:
+                    self._consumer_channel.queue_bind(exchange="direct", queue=cache_queue, routing_key=routing_key)
+                self._consumer_channel.basic_consume(
+                    queue=cache_queue,
+                    on_message_callback=self._handle_booking_event,
+                    auto_ack=True
+                )
+
+                # Every promotion changes the price bookings are made at, whoever is subscribed to it
+                prices_queue = self._consumer_channel.queue_declare(queue="", exclusive=True).method.queue
+                self._consumer_channel.queue_bind(exchange="promotions_topic", queue=prices_queue, routing_key="promotions.#")
+                self._consumer_channel.basic_consume(
+                    queue=prices_queue,
+                    on_message_callback=self._handle_promotion_price,
+                    auto_ack=True
+                )
+
+                # Blocks on the socket and dispatches deliveries as they arrive
+                self._consumer_channel.start_consuming()
 
             except Exception as e:
                 print(f"Error in consumer thread loop: {e}")
-                time.sleep(5)
+                if self._consumer_connection and not self._consumer_connection.is_closed:
+                    self._consumer_connection.close()
+                if self._running:
+                    time.sleep(5)
     
-    def _handle_payment_approved(self, ch, method, properties, body):
+    def _booking_id_of(self, body: bytes) -> str:
         data = json.loads(body.decode("utf-8"))
-        self.publish_log("Payment Accepted Received", headers={"sender": "booking"})
-        signature = base64.b64decode(data["signature"])
-        transaction = data["transaction"]
-        transaction_str = json.dumps(transaction, sort_keys=True)
-        if not verify_signature(value=transaction_str, sig=signature):
-            self.publish_log(f"ERROR: Payment accepted - signature invalid! transaction_id: {transaction['id']} for booking_id {transaction['booking_id']}", headers={"sender": "booking"})
+        return data["transaction"]["booking_id"] if "transaction" in data else data["booking_id"]
+
+    def _dispatch(self, handler, key_of, ch, method, properties, body):
+        """
+        Hand a booking event to the worker pool. Events with the same key (the
+        booking id) are handled in order by one worker, others in parallel.
+        """
+        try:
+            key = key_of(body)
+        except Exception as e:
+            self._dead_letter(ch, method, properties, body, f"malformed message: {e}")
             return
-        booking_manager = BookingsManager()
-        transaction["signature"] = data["signature"]
-        payment = Payment.from_dict(transaction)
-        booking_manager.register_payment_accepted(transaction["booking_id"], payment)
+
+        self._dispatcher.submit(key, partial(self._handle, handler, ch, method, properties, body))
+
+    def _dispatch_promotion(self, ch, method, properties, body):
+        """Promotions need no order, they are handled apart from the booking events."""
+        self._promotion_pool.submit(self._handle, self._handle_promotion, ch, method, properties, body)
+
+    def _handle(self, handler, ch, method, properties, body):
+        """
+        Run `handler` on a delivery and settle it: acknowledged once handled, a
+        failure is requeued once and then dead-lettered.
+        """
+        try:
+            handler(ch, method, properties, body)
+            settle = partial(ch.basic_ack, delivery_tag=method.delivery_tag)
+        except Exception as e:
+            print(f"Error handling message from {method.routing_key}: {e}")
+            if method.redelivered:
+                settle = partial(self._dead_letter, ch, method, properties, body, str(e))
+            else:
+                settle = partial(ch.basic_nack, delivery_tag=method.delivery_tag, requeue=True)
+        # The channel belongs to the consumer thread
+        try:
+            ch.connection.add_callback_threadsafe(settle)
+        except Exception as e:
+            print(f"Could not settle message, it will be redelivered: {e}")
+
+    def _dead_letter(self, ch, method, properties, body: bytes, reason: str):
+        """Move a delivery to DEAD_LETTER_QUEUE with the reason. Runs on the consumer thread."""
+        print(f"Message from {method.routing_key} dead-lettered: {reason}")
+        headers = dict(properties.headers or {})
+        headers["x-dead-letter-reason"] = reason
+        headers["x-original-routing-key"] = method.routing_key
+        ch.basic_publish(
+            exchange="",
+            routing_key=DEAD_LETTER_QUEUE,
+            body=body,
+            properties=pika.BasicProperties(headers=headers, delivery_mode=2)
+        )
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+
+    def _handle_payment_approved(self, ch, method, properties, body):
+        data = json.loads(body.decode("utf-8"))
+        self.publish_log("Payment Accepted Received")
+        self._verify_payment(data, accepted=True)
 
     def _handle_payment_rejected(self, ch, method, properties, body):
         data = json.loads(body.decode("utf-8"))
-        self.publish_log("Payment Rejected Received", headers={"sender": "booking"})
+        self.publish_log("Payment Rejected Received")
+        self._verify_payment(data, accepted=False)
+
+    def _verify_payment(self, data: dict, accepted: bool):
         signature = base64.b64decode(data["signature"])
         transaction = data["transaction"]
         transaction_str = json.dumps(transaction, sort_keys=True)
-        if not verify_signature(value=transaction_str, sig=signature):
-            self.publish_log(f"ERROR: Payment rejected signature invalid! transaction_id: {transaction['id']} for booking_id {transaction['booking_id']}", headers={"sender": "booking"})
+        if not self._verifier.submit(transaction_str, signature).result():
+            kind = "Payment accepted -" if accepted else "Payment rejected"
+            self.publish_log(f"ERROR: {kind} signature invalid! transaction_id: {transaction['id']} for booking_id {transaction['booking_id']}")
             return
         booking_manager = BookingsManager()
         transaction["signature"] = data["signature"]
         payment = Payment.from_dict(transaction)
-        booking_manager.register_payment_rejected(transaction["booking_id"], payment)
+        if accepted:
+            booking_manager.register_payment_accepted(transaction["booking_id"], payment)
+        else:
+            booking_manager.register_payment_rejected(transaction["booking_id"], payment)
 
     def _handle_ticket_generated(self, ch, method, properties, body):
         data = json.loads(body.decode("utf-8"))
@@ -174,29 +315,36 @@ class RabbitMQManager:
         booking_manager = BookingsManager()
         booking_manager.register_ticket_generated(data["booking_id"], TicketBookingResponse.from_dict(data))
 
+    def _handle_payment_link_created(self, ch, method, properties, body):
+        data = json.loads(body.decode("utf-8"))
+        if not data.get("payment_link"):
+            self.publish_log(f"ERROR: Payment link failed for booking_id {data['booking_id']}: {data.get('error')}")
+        BookingsManager().register_payment_link(data["booking_id"], data.get("payment_link"))
+
+    def _handle_booking_event(self, ch, method, properties, body):
+        data = json.loads(body.decode("utf-8"))
+        cabins = data["number_of_cabins"]
+        if method.routing_key == config.BOOKING_CREATED_ROUTING_KEY:
+            cabins = -cabins
+        ItineraryCache().apply_booking_event(int(data["destination_id"]), cabins)
+
+    def _handle_promotion_price(self, ch, method, properties, body):
+        try:
+            data = json.loads(body.decode("utf-8"))
+            ItineraryCache().apply_promotion(int(data["destination_id"]), data["boarding_date"], data["new_cost"])
+        except Exception as e:
+            print(f"Invalid promotion, price not applied: {e}")
+
     def _handle_promotion(self, ch, method, properties, body):
-        notified = MarketingManager().notify_all(body)
-        self.publish_log(message=f"Promotion Received and emmitted {notified} notifications")
+        # Promotions are published on promotions.<destination_id>
+        suffix = method.routing_key.rsplit(".", 1)[-1]
+        destination_id = int(suffix) if suffix.isdigit() else None
+        notified = MarketingManager().notify_all(body, destination_id)
+        self.publish_log(f"Promotion Received and emmitted {notified} notifications")
 
 
     def _publish_message(self, exchange: str, routing_key: str, message: str, headers: dict = {"sender": "booking"}):
-        with self._lock:
-            try:
-                if not self._reconnect_if_needed():
-                    print("Error: Could not publish message, no connection available.")
-                    return
-
-                self._channel.basic_publish(
-                    exchange=exchange,
-                    routing_key=routing_key,
-                    body=message.encode("utf-8"),
-                    properties=pika.BasicProperties(headers=headers)
-                )
-            except Exception as e:
-                print(f"Error publishing message: {e}")
-
-                if self._connection and not self._connection.is_closed:
-                    self._connection.close()
+        self._publisher.publish(exchange, routing_key, message.encode("utf-8"), headers)
 
     def publish_booking_created(self, message: str):
         self._publish_message("direct", config.BOOKING_CREATED_ROUTING_KEY, message, {"sender": "booking"})
@@ -204,19 +352,24 @@ class RabbitMQManager:
     def publish_booking_cancelled(self, message: str):
         self._publish_message("direct", config.BOOKING_CANCELLED_ROUTING_KEY, message, {"sender": "booking"})
 
-    def publish_log(self, message: str, headers: dict = {"sender": "booking"}):
-        self._publish_message("direct", config.LOGS_ROUTING_KEY, message, headers)
+    def publish_log(self, message: str):
+        self._log_sink.log(message)
 
     def stop(self):
         print("Stopping RabbitMQ Manager...")
         self._running = False
+        if self._consumer_connection and self._consumer_connection.is_open:
+            self._consumer_connection.add_callback_threadsafe(self._consumer_channel.stop_consuming)
         if self._consumer_thread:
             self._consumer_thread.join()
             self._consumer_thread = None
 
-        with self._lock:
-            if self._channel and self._channel.is_open:
-                self._channel.close()
-            if self._connection and self._connection.is_open:
-                self._connection.close()
+        if self._consumer_connection and self._consumer_connection.is_open:
+            self._consumer_connection.close()
+
+        self._dispatcher.stop()
+        self._promotion_pool.shutdown()
+        self._verifier.stop()
+        self._publisher.stop()
+        self._log_sink.stop()
         print("RabbitMQ Manager stopped.")
\ No newline at end of file
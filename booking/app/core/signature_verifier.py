@@ -0,0 +1,59 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from app.core.crypto_verify import verify_signature
+
+
+class SignatureVerifier:
+    """
+    Verifies payment signatures off the consumer thread, remembering the results.
+
+    With `workers` > 0 the checks run on a process pool, so several messages are
+    verified in parallel and the consumer keeps receiving meanwhile; with 0 they
+    run inline. Results are kept by (payload hash, signature) for the last
+    `cache_size` messages, so a redelivered message is not verified again, and
+    a message submitted while the same one is being verified shares its result.
+    """
+
+    def __init__(self, workers: int, cache_size: int):
+        self._pool = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+        self._cache_size = cache_size
+        self._results: OrderedDict[tuple, Future] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, value: str, sig: bytes) -> Future:
+        """Future of verify_signature(value, sig)."""
+        key = (hashlib.sha256(value.encode()).digest(), sig)
+        with self._lock:
+            future = self._results.get(key)
+            if future is not None:
+                self._results.move_to_end(key)
+                return future
+
+            if self._pool:
+                future = self._pool.submit(verify_signature, value, sig)
+            else:
+                future = Future()
+                try:
+                    future.set_result(verify_signature(value, sig))
+                except Exception as e:
+                    future.set_exception(e)
+
+            self._results[key] = future
+            while len(self._results) > self._cache_size:
+                self._results.popitem(last=False)
+
+        future.add_done_callback(lambda done: self._forget_failure(key, done))
+        return future
+
+    def _forget_failure(self, key: tuple, future: Future) -> None:
+        # Only verdicts are cached, an error (e.g. missing key file) is retried next time
+        if future.exception() is not None:
+            with self._lock:
+                if self._results.get(key) is future:
+                    del self._results[key]
+
+    def stop(self) -> None:
+        if self._pool:
+            self._pool.shutdown()
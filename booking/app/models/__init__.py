@@ -1,10 +1,11 @@
-from .base import BookingStatus, PaymentStatus
+from .base import BookingStatus, PaymentStatus, PaymentLinkStatus
 from .ticket import Ticket, TicketBookingResponse
 from .booking import Booking
 
 __all__ = [
     'BookingStatus',
     'PaymentStatus',
+    'PaymentLinkStatus',
     'Ticket',
     'TicketBookingResponse',
     'Booking'
@@ -11,4 +11,9 @@ class BookingStatus(Enum):
 class PaymentStatus(Enum):
     PENDING = "PENDING"
     AUTHORIZED = "AUTHORIZED"
-    DECLINED = "DECLINED" 
\ No newline at end of file
+    DECLINED = "DECLINED"
+
+class PaymentLinkStatus(Enum):
+    PENDING = "PENDING"
+    CREATED = "CREATED"
+    FAILED = "FAILED"
@@ -2,7 +2,7 @@ from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional, Dict, Any
 from uuid import UUID
 from datetime import datetime, UTC
-from .base import BookingStatus
+from .base import BookingStatus, PaymentLinkStatus
 from .payment import Payment
 from .ticket import TicketBookingResponse
 
@@ -20,6 +20,7 @@ class Booking(BaseModel):
     status: BookingStatus = BookingStatus.CREATED
     payment: Optional[Payment] = None
     payment_link: Optional[str] = None
+    payment_link_status: Optional[PaymentLinkStatus] = None
     tickets: Optional[TicketBookingResponse] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
@@ -54,6 +55,11 @@ class Booking(BaseModel):
         self.payment = new_payment
         self.updated_at = datetime.now(UTC)
 
+    def update_payment_link(self, payment_link: Optional[str], status: PaymentLinkStatus) -> None:
+        self.payment_link = payment_link
+        self.payment_link_status = status
+        self.updated_at = datetime.now(UTC)
+
     def add_tickets(self, new_tickets: TicketBookingResponse) -> None:
         self.tickets.extend(new_tickets)
         self.updated_at = datetime.now(UTC)
@@ -73,6 +79,7 @@ class Booking(BaseModel):
             "status": str(self.status.value),
             "payment": self.payment.to_dict() if self.payment else None,
             "payment_link": self.payment_link,
+            "payment_link_status": self.payment_link_status.value if self.payment_link_status else None,
             "tickets": self.tickets.to_dict() if self.tickets else None,
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat(),
@@ -89,6 +96,8 @@ class Booking(BaseModel):
             data['uuid'] = UUID(data['uuid'])
         if isinstance(data.get('status'), str):
             data['status'] = BookingStatus(data['status'])
+        if isinstance(data.get('payment_link_status'), str):
+            data['payment_link_status'] = PaymentLinkStatus(data['payment_link_status'])
         if 'payment' in data:
             data['payment'] = Payment(**data['payment'])
         if 'tickets' in data:
@@ -4,23 +4,73 @@ from flask import Blueprint, request, jsonify, current_app
 
 from app.services.booking_manager import BookingsManager
 from app.core.rabbitmq import RabbitMQManager
+from app.core.http_client import HttpClient
+from app.models.base import PaymentLinkStatus
 
 bookings_bp = Blueprint("bookings", __name__)
 
+def _forward_to_owner(booking_id):
+    """Answer of the replica owning `booking_id` when sharded, None when it is owned here."""
+    manager = BookingsManager()
+    if manager.owns(booking_id):
+        return None
+
+    shard = int(manager.ring.shard_for(booking_id))
+    urls = current_app.config["BOOKING_SHARD_URLS"]
+    if shard >= len(urls):
+        return jsonify({"error": f"Booking {booking_id} belongs to shard {shard}, which is not served here"}), 421
+
+    host, port = urls[shard].rsplit(":", 1)
+    # A long poll (?wait=) is answered after up to `wait` seconds, on top of the usual read timeout
+    wait = min(request.args.get("wait", 0, type=float), current_app.config["BOOKING_MAX_WAIT_SECONDS"])
+    timeout = (current_app.config["HTTP_CONNECT_TIMEOUT"], current_app.config["HTTP_READ_TIMEOUT"] + max(wait, 0))
+    try:
+        response = HttpClient().request(request.method, host, port, request.full_path, timeout=timeout)
+    except requests.RequestException as e:
+        return jsonify({"error": f"Booking shard {shard} unavailable: {e}"}), 503
+    try:
+        body = response.json()
+    except ValueError:
+        return jsonify({"error": f"Booking shard {shard} sent an invalid answer ({response.status_code})"}), 502
+    return body, response.status_code
+
 @bookings_bp.route("/bookings", methods=["GET"])
 def get_bookings():
+    filters = {
+        "status": request.args.get("status"),
+        "customer_email": request.args.get("customer_email"),
+        "destination_id": request.args.get("destination_id", type=int),
+        "created_from": request.args.get("created_from"),
+        "created_to": request.args.get("created_to"),
+    }
+    limit = request.args.get("limit", type=int)
     try:
-        bookings = BookingsManager().get_all_bookings()
+        bookings, next_cursor = BookingsManager().list_bookings(filters, limit, request.args.get("cursor"))
         list_bookings = [booking.to_dict() for booking in bookings]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(e)
         return jsonify({"error": str(e)}), e.__dict__.get("code", 500)
-    return jsonify(list_bookings if len(list_bookings) else [])
+
+    # With a limit the page comes with the cursor of the next one
+    if limit is not None:
+        return jsonify({"items": list_bookings, "next_cursor": next_cursor})
+    return jsonify(list_bookings)
 
 @bookings_bp.route("/bookings/<booking_id>", methods=["GET"])
 def get_booking(booking_id):
+    forwarded = _forward_to_owner(booking_id)
+    if forwarded is not None:
+        return forwarded
+
+    # ?wait=<seconds> long polls while the payment link is still being created
+    wait = min(request.args.get("wait", 0, type=float), current_app.config["BOOKING_MAX_WAIT_SECONDS"])
     try:
-        booking = BookingsManager().get_booking(booking_id)
+        if wait > 0:
+            booking = BookingsManager().wait_for_payment_link(booking_id, wait)
+        else:
+            booking = BookingsManager().get_booking(booking_id)
     except Exception as e:
         print(e)
         return jsonify({"error": str(e)}), e.__dict__.get("code", 500)
@@ -33,20 +83,36 @@ def create_booking():
     data = request.json
     try:
         booking = BookingsManager().create_booking(**data)
+        async_payment_link = current_app.config["BOOKING_ASYNC_PAYMENT_LINK"]
+        if async_payment_link:
+            # The payments service answers the booking_created event with the link
+            booking.payment_link_status = PaymentLinkStatus.PENDING
+            BookingsManager().save_booking(booking)
 
         rabbitmq_manager = RabbitMQManager()
         rabbitmq_manager.publish_log(f"Booking created: {booking.id}")
         rabbitmq_manager.publish_booking_created(json.dumps({
+            "booking_id": booking.id,
             "destination_id": booking.destination_id,
             "number_of_cabins": booking.number_of_cabins,
+            "number_of_passengers": booking.number_of_passengers,
+            "amount": booking.total_cost,
             "customer_email": booking.customer_email,
-            "customer_name": booking.customer_name
+            "customer_name": booking.customer_name,
+            "create_payment_link": async_payment_link
         }))
 
+        if async_payment_link:
+            return jsonify(booking.to_dict())
+
         payment_link = None
         try:
-            payment_response = requests.get(
-                f'http://payments:{current_app.config["PAYMENT_MS_PORT"]}/payment-link',
+            payment_response = HttpClient().get(
+                "payments",
+                current_app.config["PAYMENT_MS_PORT"],
+                "/payment-link",
+                # Creates a payment: an error answer must not send it again
+                idempotent=False,
                 json={
                     "booking_id": booking.id,
                     "amount": booking.total_cost,
@@ -67,6 +133,7 @@ def create_booking():
             print(f"Error calling payments service: {str(e)}")
 
         booking.payment_link = payment_link
+        BookingsManager().save_booking(booking)
         booking_response = booking.to_dict()
             
     except Exception as e:
@@ -78,12 +145,17 @@ def create_booking():
 
 @bookings_bp.route("/bookings/<booking_id>", methods=["DELETE"])
 def cancel_booking(booking_id):
+    forwarded = _forward_to_owner(booking_id)
+    if forwarded is not None:
+        return forwarded
+
     try:
         result = BookingsManager().cancel_booking(booking_id)
 
         rabbitmq_manager = RabbitMQManager()
         rabbitmq_manager.publish_log(f"Booking cancelled: {booking_id}")  
         rabbitmq_manager.publish_booking_cancelled(json.dumps({
+            "booking_id": result.id,
             "destination_id": result.destination_id,
             "number_of_cabins": result.number_of_cabins,
             "customer_email": result.customer_email,
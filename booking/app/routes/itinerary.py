@@ -1,5 +1,7 @@
 import requests
 from flask import Blueprint, current_app, request
+from app.core.http_client import HttpClient
+from app.core.itinerary_cache import ItineraryCache
 
 itineraries_bp = Blueprint("itineraries", __name__)
 
@@ -19,7 +21,25 @@ def get_itineraries():
         filters['min_cabins'] = request.args.get('min_cabins', type=int)
     if request.args.get('continent'):
         filters['continent'] = request.args.get('continent')
+    if request.args.get('sort'):
+        filters['sort'] = request.args.get('sort')
+    if request.args.get('limit'):
+        filters['limit'] = request.args.get('limit', type=int)
+    if request.args.get('cursor'):
+        filters['cursor'] = request.args.get('cursor')
+    if request.args.get('fields'):
+        filters['fields'] = request.args.getlist('fields')
 
-    response = requests.get(f'http://itinerary:{current_app.config["ITINERARY_MS_PORT"]}/itineraries', params=filters)
-    
-    return response.json()
\ No newline at end of file
+    try:
+        return ItineraryCache().get_list(filters)
+    except requests.RequestException as e:
+        return {"error": f"Itinerary service unavailable: {e}"}, 503
+
+@itineraries_bp.route("/itineraries/search", methods=["GET"])
+def search_ports():
+    try:
+        response = HttpClient().get("itinerary", current_app.config["ITINERARY_MS_PORT"], "/itineraries/search", params=request.args)
+    except requests.RequestException as e:
+        return {"error": f"Itinerary service unavailable: {e}"}, 503
+
+    return response.json(), response.status_code
\ No newline at end of file
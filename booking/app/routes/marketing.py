@@ -4,15 +4,28 @@ from app.services.marketing_manager import MarketingManager
 
 marketing_bp = Blueprint("marketing", __name__)
 
+def valid_destination_ids(destination_ids) -> bool:
+    """None (every destination) or a list of integer destination ids."""
+    return destination_ids is None or (
+        isinstance(destination_ids, list)
+        and all(isinstance(d, int) and not isinstance(d, bool) for d in destination_ids)
+    )
+
 @marketing_bp.route("/marketing/subscribe", methods=["POST"])
 def subscribe():
     user_id = request.json.get('user_id')
+    # Optional: only the promotions of these destinations
+    destination_ids = request.json.get('destination_ids')
 
     if not user_id:
         return jsonify({'error': 'User ID is required'}), 400
+    if not valid_destination_ids(destination_ids):
+        return jsonify({'error': 'destination_ids must be a list of integers'}), 400
+    if destination_ids == []:
+        return jsonify({'error': 'destination_ids must not be empty, leave it out to subscribe to every destination'}), 400
 
     marketing_manager = MarketingManager()
-    marketing_manager.subscribe(user_id)
+    marketing_manager.subscribe(user_id, destination_ids)
 
     return jsonify({"message": "Subscribed to marketing notifications"}), 200
 
@@ -20,12 +33,15 @@ def subscribe():
 @marketing_bp.route("/marketing/unsubscribe", methods=["DELETE"])
 def unsubscribe():
     user_id = request.json.get('user_id')
+    destination_ids = request.json.get('destination_ids')
 
     if not user_id:
         return jsonify({'error': 'User ID is required'}), 400
+    if not valid_destination_ids(destination_ids):
+        return jsonify({'error': 'destination_ids must be a list of integers'}), 400
     
     marketing_manager = MarketingManager()
-    marketing_manager.unsubscribe(user_id)
+    marketing_manager.unsubscribe(user_id, destination_ids)
 
     return jsonify({"message": "Unsubscribed from marketing notifications"}), 200
     
\ No newline at end of file
@@ -1,19 +1,32 @@
-from typing import Dict, List, Optional
+import base64
+import threading
+from datetime import datetime, UTC
+from typing import Dict, List, Optional, Tuple
 from uuid import uuid4
-from flask import current_app
 import requests
 
-from app.models.base import BookingStatus, PaymentStatus
+from app.models.base import BookingStatus, PaymentStatus, PaymentLinkStatus
 from app.models.itinerary import Itinerary
 from app.models.booking import Booking
 from app.models.ticket import TicketBookingResponse
 from app.models.payment import Payment
+from app.core.itinerary_cache import ItineraryCache
+from app.core.booking_store import BookingStore, MemoryBookingStore, SQLiteBookingStore, list_key
+from common.shard_ring import HashRing
+from app.config import config
+
+MAX_PAGE_SIZE = 1000
 
 class BookingsManager:
     _instance = None
     _initialized = False
 
+    # Write-through cache of the store
     bookings: Dict[str, Booking] = {}
+    store: BookingStore = None
+    ring: HashRing = None
+    # Notified whenever a payment link is registered, for long polling
+    _payment_link_updated = threading.Condition()
 
     def __new__(cls):
         if cls._instance is None:
@@ -22,18 +35,23 @@ class BookingsManager:
 
     def __init__(self):
         if not BookingsManager._initialized:
-            try:
-                BookingsManager._initialized = True
-            except Exception as e:
-                print(f"Failed loading itinerary file {e}")
+            if config.BOOKING_STORAGE == "sqlite":
+                BookingsManager.store = SQLiteBookingStore(config.BOOKING_DB)
+            else:
+                BookingsManager.store = MemoryBookingStore()
+            BookingsManager.ring = HashRing(config.BOOKING_SHARD_COUNT)
+            BookingsManager._initialized = True
 
     def get_itinerary(self, itinerary_id: int) -> Optional[Itinerary]:
-        response = requests.get(f'http://itinerary:{current_app.config["ITINERARY_MS_PORT"]}/itineraries/{itinerary_id}')
+        try:
+            data = ItineraryCache().get_itinerary(itinerary_id)
+        except requests.RequestException as e:
+            raise Exception({"error": f"Itinerary service unavailable: {e}", "code": 503})
 
-        if response.status_code != 200:
+        if data is None:
             raise Exception({"error": "Itinerary not found", "code": 404})
 
-        itinerary = Itinerary(**response.json())
+        itinerary = Itinerary(**data)
 
         return itinerary
 
@@ -53,7 +71,7 @@ class BookingsManager:
             raise Exception({"error": "Not enough cabins available", "code": 400})
                 
         booking = Booking(
-            id=f"RES-{uuid4().hex[:8].upper()}",
+            id=self._new_booking_id(),
             uuid=uuid4(),
             number_of_passengers=number_of_passengers,
             origin=origin,
@@ -66,55 +84,161 @@ class BookingsManager:
             status=BookingStatus.CREATED,
         )
         
-        self.bookings[booking.id] = booking
+        self.save_booking(booking)
 
         return booking
 
+    def _new_booking_id(self) -> str:
+        """Random booking id whose shard is owned by this replica."""
+        while True:
+            booking_id = f"RES-{uuid4().hex[:8].upper()}"
+            if self.owns(booking_id):
+                return booking_id
+
+    def owns(self, booking_id: str) -> bool:
+        return self.ring.shard_for(booking_id) in config.BOOKING_SHARDS
 
     def cancel_booking(self, booking_id: str) -> Booking:
-        booking = self.bookings.get(booking_id)
+        booking = self.get_booking(booking_id)
         if not booking:
             raise Exception({"error": "Booking not found", "code": 404})
             
         booking.update_status(BookingStatus.CANCELLED)
-        updated_booking = self.get_booking(booking_id)
+        self.save_booking(booking)
 
-        return updated_booking
+        return booking
     
     def register_payment_accepted(self, booking_id: str, payment: Payment) -> bool:
-        booking = self.bookings.get(booking_id)
+        booking = self.get_booking(booking_id)
         if not booking:
             return False
             
         booking.update_payment(payment)
-        booking.update_status(BookingStatus.PAID)
+        # A redelivered payment must not undo the tickets
+        if booking.status != BookingStatus.BOOKED:
+            booking.update_status(BookingStatus.PAID)
+        self.save_booking(booking)
 
         return True
 
     def register_payment_rejected(self, booking_id: str, payment: Payment) -> bool:
-        booking = self.bookings.get(booking_id)
+        booking = self.get_booking(booking_id)
         if not booking:
             return False
             
         booking.update_payment(payment)
         booking.update_status(BookingStatus.REJECTED)
+        self.save_booking(booking)
 
         return True
 
     def register_ticket_generated(self, booking_id: str, ticket_response: TicketBookingResponse) -> bool:
-        booking = self.bookings.get(booking_id)
+        booking = self.get_booking(booking_id)
         if not booking:
             return False
             
         print("Booking tickets: ", ticket_response)
         booking.tickets = ticket_response
         booking.update_status(BookingStatus.BOOKED)
+        self.save_booking(booking)
+
+        return True
+
+    def register_payment_link(self, booking_id: str, payment_link: Optional[str]) -> bool:
+        booking = self.get_booking(booking_id)
+        if not booking:
+            return False
+
+        status = PaymentLinkStatus.CREATED if payment_link else PaymentLinkStatus.FAILED
+        with self._payment_link_updated:
+            booking.update_payment_link(payment_link, status)
+            self.save_booking(booking)
+            self._payment_link_updated.notify_all()
 
         return True
 
+    def wait_for_payment_link(self, booking_id: str, timeout: float) -> Optional[Booking]:
+        """Return the booking once its payment link is no longer pending, or after `timeout` seconds."""
+        with self._payment_link_updated:
+            self._payment_link_updated.wait_for(
+                lambda: getattr(self.bookings.get(booking_id), "payment_link_status", None) != PaymentLinkStatus.PENDING,
+                timeout=timeout
+            )
+        return self.get_booking(booking_id)
+
+    def save_booking(self, booking: Booking) -> None:
+        self.store.save(booking)
+        self.bookings[booking.id] = booking
+
     def get_booking(self, booking_id: str) -> Optional[Booking]:
-        return self.bookings.get(booking_id)
+        booking = self.bookings.get(booking_id)
+        if booking is None:
+            booking = self.store.get(booking_id)
+            if booking is not None:
+                booking = self.bookings.setdefault(booking_id, booking)
+        return booking
 
     def get_all_bookings(self) -> List[Booking]:
-        return list(self.bookings.values())
+        return self.list_bookings({})[0]
+
+    def list_bookings(self, filters: dict, limit: int = None, cursor: str = None) -> Tuple[List[Booking], Optional[str]]:
+        """
+        Return the bookings matching the filters, oldest first, and the cursor of the next page.
+
+        Args:
+            filters (dict): status, customer_email, destination_id, and the
+                created_from (inclusive) / created_to (exclusive) ISO dates
+            limit (int): Page size, all bookings when None
+            cursor (str): `next_cursor` returned by the previous page
+
+        Raises:
+            ValueError: If a filter, the limit or the cursor is invalid
+        """
+        store_filters = {
+            "customer_email": filters.get("customer_email"),
+            "destination_id": filters.get("destination_id"),
+        }
+        if filters.get("status"):
+            try:
+                store_filters["status"] = BookingStatus(filters["status"].upper()).value
+            except ValueError:
+                raise ValueError(f"Invalid status: {filters['status']}")
+        for field in ["created_from", "created_to"]:
+            if filters.get(field):
+                store_filters[field] = self._normalize_date(field, filters[field])
+
+        if limit is not None:
+            if limit <= 0:
+                raise ValueError("limit must be a positive integer")
+            limit = min(limit, MAX_PAGE_SIZE)
+
+        after = self._decode_cursor(cursor) if cursor else None
+        # One more than the page tells whether there is a next one
+        bookings = self.store.list(store_filters, limit + 1 if limit is not None else None, after)
+
+        next_cursor = None
+        if limit is not None and len(bookings) > limit:
+            bookings = bookings[:limit]
+            created_at, booking_id = list_key(bookings[-1])
+            next_cursor = base64.urlsafe_b64encode(f"{created_at}|{booking_id}".encode("utf-8")).decode("utf-8")
+
+        # Cached objects take precedence, they are the ones being updated
+        return [self.bookings.setdefault(booking.id, booking) for booking in bookings], next_cursor
+
+    def _normalize_date(self, field: str, value: str) -> str:
+        """Format a date filter like the stored creation dates, in UTC."""
+        try:
+            date = datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"Invalid {field}: {value}")
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=UTC)
+        return date.astimezone(UTC).isoformat()
+
+    def _decode_cursor(self, cursor: str) -> Tuple[str, str]:
+        try:
+            created_at, booking_id = base64.urlsafe_b64decode(cursor.encode("utf-8")).decode("utf-8").split("|")
+        except Exception:
+            raise ValueError("Invalid cursor")
+        return created_at, booking_id
 
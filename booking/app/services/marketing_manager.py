@@ -1,14 +1,24 @@
+import threading
+from typing import Dict, List, Optional, Set
 
+from app.config import config
+from app.core.fanout import FanOut
 
 class MarketingManager:
     _instance = None
     _initialized = False
 
-    # Data structure:
-    #   [
-    #     "user_id": number,
-    #   ]
-    data = []
+    # Users notified of every promotion
+    subscribers: Set[str] = set()
+    # Users notified of the promotions of some destinations, by destination id
+    destination_subscribers: Dict[int, Set[str]] = {}
+    # Destinations of each user in destination_subscribers, to unsubscribe them
+    user_destinations: Dict[str, Set[int]] = {}
+
+    _lock = threading.Lock()
+    _fanout: FanOut = None
+    # Called without arguments when routing_interest() changes
+    on_interest_change = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -17,30 +27,95 @@ class MarketingManager:
 
     def __init__(self):
         if not MarketingManager._initialized:
+            MarketingManager._fanout = FanOut(
+                send=self._send,
+                chunk_size=config.FANOUT_CHUNK_SIZE,
+                concurrency=config.FANOUT_CONCURRENCY,
+                rate=config.FANOUT_RATE,
+                max_retries=config.FANOUT_MAX_RETRIES
+            )
             MarketingManager._initialized = True
 
-    def notify_all(self, message):
-        notified = 0
-        for user in self.data:
-            print(f"Sending message to user {user}: {message}")
-            notified += 1
+    def _send(self, user_ids: List[str], message) -> None:
+        print(f"Sending message to {len(user_ids)} users: {message}")
 
-        return notified
+    def recipients(self, destination_id: Optional[int] = None) -> List[str]:
+        with self._lock:
+            users = set(self.subscribers)
+            if destination_id is not None:
+                users |= self.destination_subscribers.get(destination_id, set())
+        return list(users)
 
+    def routing_interest(self) -> Set[str]:
+        """
+        Suffixes of the promotion routing keys somebody is interested in: "#" if a
+        user is subscribed to every promotion, else the ids of the destinations
+        with subscribers.
+        """
+        with self._lock:
+            return self._routing_interest()
 
-    def subscribe(self, user_id):
-        if user_id in self.data:
-            print(f"User {user_id} already subscribed to marketing notifications")
-            return
-        
-        self.data.append(user_id)
-        print(f"Subscribed user {user_id} to marketing notifications")
+    def _routing_interest(self) -> Set[str]:
+        if self.subscribers:
+            return {"#"}
+        return {str(destination_id) for destination_id in self.destination_subscribers}
+
+    def _interest_changed(self) -> None:
+        if self.on_interest_change:
+            self.on_interest_change()
 
-    def unsubscribe(self, user_id):
-        if user_id not in self.data:
-            print(f"User {user_id} is not subscribed to marketing notifications")
+    def notify_all(self, message, destination_id: Optional[int] = None) -> int:
+        """
+        Queue `message` for the users subscribed to every promotion and to the
+        promotions of `destination_id`, and return how many they are. The
+        notifications are sent in the background (see FanOut).
+        """
+        return self._fanout.publish(self.recipients(destination_id), message)
+
+    def subscribe(self, user_id, destination_ids: Optional[List[int]] = None):
+        """Subscribe to every promotion (`destination_ids` None), or only to those of `destination_ids`."""
+        if destination_ids is not None and not destination_ids:
             return
-        
-        self.data = [d for d in self.data if d != user_id]
-        print(f"Unsubscribed user {user_id} from marketing notifications")
+        with self._lock:
+            interest = self._routing_interest()
+            if destination_ids is None:
+                if user_id in self.subscribers:
+                    print(f"User {user_id} already subscribed to marketing notifications")
+                    return
+                self.subscribers.add(user_id)
+                print(f"Subscribed user {user_id} to marketing notifications")
+            else:
+                for destination_id in destination_ids:
+                    self.destination_subscribers.setdefault(destination_id, set()).add(user_id)
+                self.user_destinations.setdefault(user_id, set()).update(destination_ids)
+                print(f"Subscribed user {user_id} to marketing notifications for destinations {destination_ids}")
+            changed = self._routing_interest() != interest
+        if changed:
+            self._interest_changed()
+
+    def unsubscribe(self, user_id, destination_ids: Optional[List[int]] = None):
+        """Unsubscribe from the promotions of `destination_ids`, or from all of them when it is None."""
+        with self._lock:
+            interest = self._routing_interest()
+            if user_id not in self.subscribers and user_id not in self.user_destinations:
+                print(f"User {user_id} is not subscribed to marketing notifications")
+                return
+
+            if destination_ids is None:
+                self.subscribers.discard(user_id)
+                destination_ids = list(self.user_destinations.get(user_id, set()))
 
+            user_destinations = self.user_destinations.get(user_id, set())
+            for destination_id in destination_ids:
+                users = self.destination_subscribers.get(destination_id)
+                if users is not None:
+                    users.discard(user_id)
+                    if not users:
+                        del self.destination_subscribers[destination_id]
+                user_destinations.discard(destination_id)
+            if not user_destinations:
+                self.user_destinations.pop(user_id, None)
+            print(f"Unsubscribed user {user_id} from marketing notifications")
+            changed = self._routing_interest() != interest
+        if changed:
+            self._interest_changed()
@@ -0,0 +1,133 @@
+"""
+Throughput of the booking stores (operations/s): creating, reading and listing
+bookings with MemoryBookingStore and SQLiteBookingStore, against the plain
+dict the bookings used to be kept in.
+
+--bookings bookings are created for --customers customers over --destinations
+destinations, then read back by id in random order. Listings are filtered by
+customer, by status and destination, and walked page by page (--page bookings
+per page) with the keyset of the previous page, like GET /bookings?limit=
+does with its cursor. The dict is filtered and sorted on every page, which is
+what listing it took. The SQLite database is written to a temporary directory.
+Run from the booking directory:
+
+    cd booking
+    python -m benchmarks.booking_store --bookings 20000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+
+from app.core.booking_store import BookingStore, MemoryBookingStore, SQLiteBookingStore, list_key
+from app.models.base import BookingStatus
+from app.models.booking import Booking
+
+
+class DictBookingStore(BookingStore):
+    """The class-level dict of BookingsManager before the stores, scanned to list."""
+
+    def __init__(self):
+        self.bookings = {}
+
+    def save(self, booking: Booking) -> None:
+        self.bookings[booking.id] = booking
+
+    def get(self, booking_id: str):
+        return self.bookings.get(booking_id)
+
+    def list(self, filters: dict, limit=None, after=None):
+        matching = sorted(
+            (booking for booking in self.bookings.values()
+             if all(getattr(booking, field) == value for field, value in filters.items())
+             and (after is None or list_key(booking) > after)),
+            key=list_key
+        )
+        return matching[:limit] if limit is not None else matching
+
+
+def make_bookings(count: int, customers: int, destinations: int, seed: int) -> list[Booking]:
+    rng = random.Random(seed)
+    statuses = list(BookingStatus)
+    return [
+        Booking(
+            id=f"RES-{uuid.UUID(int=rng.getrandbits(128)).hex[:12].upper()}", uuid=uuid.uuid4(),
+            number_of_passengers=2, origin="Santos", destination_id=rng.randrange(destinations),
+            boarding_date="2030-01-01", number_of_cabins=1, total_cost=1000.0,
+            customer_email=f"customer-{rng.randrange(customers)}@example.com", customer_name="Benchmark",
+            status=rng.choice(statuses)
+        )
+        for _ in range(count)
+    ]
+
+
+def walk(store: BookingStore, filters: dict, page: int) -> int:
+    """Read every page of a listing, return how many bookings it had."""
+    total, after = 0, None
+    while True:
+        bookings = store.list(filters, page, after)
+        total += len(bookings)
+        if len(bookings) < page:
+            return total
+        after = list_key(bookings[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bookings", type=int, default=20_000)
+    parser.add_argument("--customers", type=int, default=1_000)
+    parser.add_argument("--destinations", type=int, default=50)
+    parser.add_argument("--listings", type=int, default=100, help="listings walked per filter")
+    parser.add_argument("--page", type=int, default=50)
+    args = parser.parse_args()
+
+    bookings = make_bookings(args.bookings, args.customers, args.destinations, seed=0)
+    rng = random.Random(1)
+    reads = [rng.choice(bookings).id for _ in range(args.bookings)]
+    by_customer = [{"customer_email": rng.choice(bookings).customer_email} for _ in range(args.listings)]
+    by_status = [{"status": BookingStatus.PAID.value, "destination_id": rng.randrange(args.destinations)} for _ in range(args.listings)]
+
+    print(f"{args.bookings} bookings, {args.customers} customers, {args.destinations} destinations, pages of {args.page}")
+    print(f"{'store':10} {'create/s':>12} {'get/s':>12} {'customer pages/s':>18} {'status+dest pages/s':>20}")
+    with tempfile.TemporaryDirectory() as directory:
+        stores = [
+            ("dict", DictBookingStore()),
+            ("memory", MemoryBookingStore()),
+            ("sqlite", SQLiteBookingStore(os.path.join(directory, "bookings.db"))),
+        ]
+        expected = None
+        for name, store in stores:
+            start = time.perf_counter()
+            for booking in bookings:
+                store.save(booking)
+            create = args.bookings / (time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for booking_id in reads:
+                store.get(booking_id)
+            get = len(reads) / (time.perf_counter() - start)
+
+            rates, found = [], []
+            for listings in (by_customer, by_status):
+                # Status filters compare values, the dict holds the enum
+                if name == "dict":
+                    listings = [{**f, "status": BookingStatus(f["status"])} if "status" in f else f for f in listings]
+                start = time.perf_counter()
+                pages = 0
+                for filters in listings:
+                    count = walk(store, filters, args.page)
+                    found.append(count)
+                    pages += count // args.page + 1
+                rates.append(pages / (time.perf_counter() - start))
+
+            if expected is None:
+                expected = found
+            elif found != expected:
+                raise SystemExit(f"{name} listed other bookings than the dict")
+            print(f"{name:10} {create:12.0f} {get:12.0f} {rates[0]:18.0f} {rates[1]:20.0f}")
+
+
+if __name__ == "__main__":
+    main()
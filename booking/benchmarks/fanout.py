@@ -0,0 +1,98 @@
+"""
+Fan-out of one promotion to a large number of subscribers.
+
+Times MarketingManager.notify_all with --subscribers users (1M by default), with
+a send that takes --send-ms per call like a notification API would: how long the
+promotion consumer is held by notify_all, and how long until every user has
+been sent the promotion in chunks. The previous design, one send per user in
+the consumer, is timed on --sample users and extrapolated. Subscribing and
+unsubscribing --churn users is also timed against the list the subscribers used
+to be kept in, whose cost grows with the number of subscribers.
+
+    cd booking
+    python -m benchmarks.fanout --subscribers 1000000
+
+FANOUT_CHUNK_SIZE, FANOUT_CONCURRENCY and FANOUT_RATE are read from the
+environment like in the service.
+"""
+import argparse
+import contextlib
+import io
+import threading
+import time
+
+from app.config import config
+from app.services.marketing_manager import MarketingManager
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=1_000_000)
+    parser.add_argument("--send-ms", type=float, default=5.0, help="duration of one send call")
+    parser.add_argument("--sample", type=int, default=200, help="users sent one by one for the baseline")
+    parser.add_argument("--churn", type=int, default=200, help="users subscribing and unsubscribing")
+    args = parser.parse_args()
+
+    sent = 0
+    done = threading.Event()
+    lock = threading.Lock()
+
+    def send(user_ids, message):
+        nonlocal sent
+        time.sleep(args.send_ms / 1000)
+        with lock:
+            sent += len(user_ids)
+            if sent >= args.subscribers:
+                done.set()
+
+    MarketingManager._send = staticmethod(send)
+    manager = MarketingManager()
+    users = [f"user-{i}" for i in range(args.subscribers)]
+    # Filled directly, subscribe() prints a line per user
+    manager.subscribers.update(users)
+
+    print(f"{args.subscribers} subscribers, {args.send_ms} ms per send, chunks of {config.FANOUT_CHUNK_SIZE}, "
+          f"{config.FANOUT_CONCURRENCY} senders, rate {config.FANOUT_RATE or 'unlimited'}")
+
+    start = time.perf_counter()
+    manager.notify_all({"destination_id": 1, "new_cost": 100})
+    queued = time.perf_counter() - start
+    done.wait()
+    delivered = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for user in users[:args.sample]:
+        send([user], {"destination_id": 1, "new_cost": 100})
+    per_user = (time.perf_counter() - start) / args.sample
+    sequential = per_user * args.subscribers
+
+    print(f"{'notify_all returns after':34} {queued * 1000:12.1f} ms")
+    print(f"{'every user sent after':34} {delivered * 1000:12.1f} ms")
+    print(f"{'one send per user (extrapolated)':34} {sequential * 1000:12.1f} ms ({sequential / delivered:.0f}x)")
+
+    # Users joining and leaving --churn times, with the subscribers all there
+    churn = [f"user-new-{i}" for i in range(args.churn)]
+    subscribers_list = list(users)
+    start = time.perf_counter()
+    for user in churn:
+        if user not in subscribers_list:
+            subscribers_list.append(user)
+    for user in churn:
+        subscribers_list.remove(user)
+    as_list = (time.perf_counter() - start) / args.churn
+
+    # subscribe() and unsubscribe() print a line each, kept out of the timing
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for user in churn:
+            manager.subscribe(user)
+        for user in churn:
+            manager.unsubscribe(user)
+        as_set = (time.perf_counter() - start) / args.churn
+
+    print(f"{'subscribe + unsubscribe, set':34} {as_set * 1e6:12.1f} us per user")
+    print(f"{'subscribe + unsubscribe, list':34} {as_list * 1e6:12.1f} us per user ({as_list / as_set:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Latency of POST /bookings (p50/p99) with the pooled HttpClient against one-shot
+`requests` calls, a new connection for every call, like booking used to make.
+
+The itinerary and payments services are local stand-ins answering after
+--service-ms, and the broker is the in-process stand-in of payment_latency.
+The payment link is created synchronously and the itinerary cache is off, so
+every booking makes both calls. --concurrency clients send --requests bookings
+in total, after --warmup ones. Run from the booking directory:
+
+    cd booking
+    python -m benchmarks.http_pooling --requests 2000 --concurrency 4
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.payments import use_new_key
+from benchmarks.stubs import route_to_localhost, start_stub
+
+BOOKING = {
+    "boarding_date": "2030-01-01", "destination_id": 1, "number_of_cabins": 1, "number_of_passengers": 2,
+    "origin": "Santos", "customer_email": "benchmark@example.com", "customer_name": "Benchmark"
+}
+
+
+def one_shot_request(self, method, host, port, path, idempotent=None, **kwargs):
+    """HttpClient.request without the pool: a new session and connection every call."""
+    kwargs.setdefault("timeout", (2, 5))
+    return requests.request(method, f"http://{host}:{port}{path}", **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--service-ms", type=float, default=1, help="time the stand-in services take to answer")
+    args = parser.parse_args()
+
+    port = start_stub(args.service_ms)
+    os.environ.update(
+        BOOKING_STORAGE="memory", BOOKING_ASYNC_PAYMENT_LINK="false",
+        ITINERARY_CACHE_TTL="0", ITINERARY_CACHE_STALE="0",
+        ITINERARY_MS_PORT=str(port), PAYMENT_MS_PORT=str(port)
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        # The public key is read when the app modules are imported
+        use_new_key(directory)
+        from flask import Flask
+        from app.config import Config
+        from app.core.http_client import HttpClient
+        from app.core.rabbitmq import RabbitMQManager
+        from app.routes.booking import bookings_bp
+        from benchmarks.payment_latency import StandInBroker
+
+    broker = StandInBroker()
+    RabbitMQManager._create_connection = lambda self: broker.connect()
+    manager = RabbitMQManager()
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.register_blueprint(bookings_bp)
+    pooled_request = HttpClient.request
+
+    def post_booking(_) -> float:
+        start = time.perf_counter()
+        response = app.test_client().post("/bookings", json=BOOKING)
+        elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code != 200 or not response.get_json().get("payment_link"):
+            raise SystemExit(f"POST /bookings failed: {response.status_code} {response.get_data(as_text=True)}")
+        return elapsed
+
+    print(f"{args.requests} bookings from {args.concurrency} clients, services answering in {args.service_ms} ms, "
+          f"latency in ms")
+    print(f"{'HTTP client':28} {'mean':>8} {'p50':>8} {'p99':>8} {'max':>8} {'bookings/s':>12}")
+    for name, request in [("one-shot requests", one_shot_request), ("pooled HttpClient", pooled_request)]:
+        HttpClient.request = request
+        route_to_localhost()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(post_booking, range(args.warmup)))
+            start = time.perf_counter()
+            latencies = sorted(pool.map(post_booking, range(args.requests)))
+            elapsed = time.perf_counter() - start
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"{name:28} {statistics.mean(latencies):8.2f} {statistics.median(latencies):8.2f} {p99:8.2f} "
+              f"{latencies[-1]:8.2f} {args.requests / elapsed:12.0f}")
+    manager.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Latency from a payment_accepted event reaching booking to the booking being
+PAID, with the blocking consumer against the 100 ms polling loop it replaced.
+
+The events are signed with a key pair made for the run and delivered by an
+in-process stand-in for the broker, one every --interval-ms. The blocking run
+is the real RabbitMQManager (consumer thread, dispatcher and signature
+verification); the polling run hands the events to the same handler from a
+loop that sleeps 100 ms between polls, like the consumer used to. Run from the
+booking directory:
+
+    cd booking
+    python -m benchmarks.payment_latency --events 200
+"""
+import argparse
+import os
+import queue
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+from benchmarks.payments import payment_event, use_new_key
+
+POLL_SECONDS = 0.1
+
+
+class StandInBroker:
+    """Every connection booking opens; deliveries go to the consumer blocked in start_consuming."""
+
+    def __init__(self):
+        self.consumers = {}
+        self.inbox = queue.Queue()
+        self._tags = iter(range(1, 1 << 62))
+
+    def publish(self, queue_name: str, routing_key: str, body: bytes) -> None:
+        self.inbox.put(("deliver", queue_name, routing_key, body))
+
+    def connect(self):
+        return StandInConnection(self)
+
+
+class StandInConnection:
+    is_open = True
+    is_closed = False
+
+    def __init__(self, broker: StandInBroker):
+        self._broker = broker
+
+    def channel(self):
+        return self
+
+    def close(self):
+        pass
+
+    def process_data_events(self, time_limit: float = 0):
+        pass
+
+    def add_callback_threadsafe(self, callback):
+        self._broker.inbox.put(("callback", callback))
+
+    @property
+    def connection(self):
+        return self
+
+    # Channel
+    def exchange_declare(self, **kwargs):
+        pass
+
+    def queue_declare(self, queue: str, **kwargs):
+        return SimpleNamespace(method=SimpleNamespace(queue=queue or f"amq.gen-{uuid.uuid4()}"))
+
+    def queue_bind(self, **kwargs):
+        pass
+
+    def queue_unbind(self, **kwargs):
+        pass
+
+    def basic_qos(self, **kwargs):
+        pass
+
+    def basic_consume(self, queue: str, on_message_callback, auto_ack: bool = False):
+        self._broker.consumers[queue] = on_message_callback
+
+    def start_consuming(self):
+        while True:
+            item = self._broker.inbox.get()
+            if item is None:
+                return
+            if item[0] == "callback":
+                item[1]()
+                continue
+            _, queue_name, routing_key, body = item
+            method = SimpleNamespace(delivery_tag=next(self._broker._tags), redelivered=False, routing_key=routing_key)
+            self._broker.consumers[queue_name](self, method, SimpleNamespace(headers={"sender": "payments"}), body)
+
+    def stop_consuming(self):
+        self._broker.inbox.put(None)
+
+    def basic_ack(self, **kwargs):
+        pass
+
+    def basic_nack(self, **kwargs):
+        pass
+
+    def basic_publish(self, **kwargs):
+        pass
+
+    def tx_select(self):
+        pass
+
+    def tx_commit(self):
+        pass
+
+    def confirm_delivery(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--interval-ms", type=float, default=20, help="time between two events")
+    args = parser.parse_args()
+
+    os.environ["BOOKING_STORAGE"] = "memory"
+    with tempfile.TemporaryDirectory() as directory:
+        # The public key is read when the app modules are imported
+        private_key = use_new_key(directory)
+        from app.config import config
+        from app.core.rabbitmq import RabbitMQManager
+        from app.models.booking import Booking
+        from app.services.booking_manager import BookingsManager
+
+    # Time each booking gets PAID at, once `expected` of them are
+    paid_at = {}
+    expected = 0
+    all_paid = threading.Event()
+    register_payment_accepted = BookingsManager.register_payment_accepted
+
+    def timed_register(self, booking_id, payment):
+        result = register_payment_accepted(self, booking_id, payment)
+        paid_at[booking_id] = time.perf_counter()
+        if len(paid_at) == expected:
+            all_paid.set()
+        return result
+
+    BookingsManager.register_payment_accepted = timed_register
+
+    def run(deliver) -> list[float]:
+        nonlocal expected
+        paid_at.clear()
+        all_paid.clear()
+        bookings = []
+        for _ in range(args.events):
+            booking = Booking(
+                id=f"RES-{uuid.uuid4().hex[:12]}", uuid=uuid.uuid4(), number_of_passengers=2, origin="Santos",
+                destination_id=1, boarding_date="2030-01-01", number_of_cabins=1, total_cost=1000.0,
+                customer_email="benchmark@example.com", customer_name="Benchmark"
+            )
+            BookingsManager().save_booking(booking)
+            bookings.append((booking.id, payment_event(private_key, booking.id)))
+        expected = len(bookings)
+
+        sent_at = {}
+        for booking_id, body in bookings:
+            sent_at[booking_id] = time.perf_counter()
+            deliver(body)
+            time.sleep(args.interval_ms / 1000)
+        all_paid.wait(timeout=30)
+        return [(paid_at[booking_id] - sent_at[booking_id]) * 1000 for booking_id in sent_at if booking_id in paid_at]
+
+    broker = StandInBroker()
+    RabbitMQManager._create_connection = lambda self: broker.connect()
+    manager = RabbitMQManager()
+    blocking = run(lambda body: broker.publish("payment_approved", config.PAYMENT_ACCEPTED_ROUTING_KEY, body))
+
+    # The previous consumer: poll, handle what arrived in the consumer thread, sleep
+    polled = queue.Queue()
+    stop = threading.Event()
+
+    def poll():
+        channel = StandInConnection(broker)
+        while not stop.is_set():
+            while not polled.empty():
+                body = polled.get()
+                method = SimpleNamespace(delivery_tag=0, redelivered=False, routing_key=config.PAYMENT_ACCEPTED_ROUTING_KEY)
+                manager._handle_payment_approved(channel, method, SimpleNamespace(headers={}), body)
+            time.sleep(POLL_SECONDS)
+
+    poller = threading.Thread(target=poll, daemon=True)
+    poller.start()
+    polling = run(polled.put)
+    stop.set()
+    poller.join()
+    manager.stop()
+
+    print(f"{args.events} payment_accepted events, one every {args.interval_ms} ms, latency to PAID in ms")
+    print(f"{'consumer':24} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for name, latencies in [("blocking (current)", blocking), (f"polling every {POLL_SECONDS * 1000:.0f} ms", polling)]:
+        if len(latencies) < args.events:
+            print(f"{name}: only {len(latencies)} of {args.events} bookings were paid")
+            continue
+        ordered = sorted(latencies)
+        p95, p99 = (ordered[min(len(ordered) - 1, int(len(ordered) * q))] for q in (0.95, 0.99))
+        print(f"{name:24} {statistics.mean(ordered):8.2f} {statistics.median(ordered):8.2f} {p95:8.2f} {p99:8.2f} {ordered[-1]:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+POST /bookings with the payment link created asynchronously (the payments
+service answers the booking_created event) against creating it in the request,
+while payments is slow: latency of the request, throughput, and how long until
+the booking has its link.
+
+The payments service is a local stand-in answering GET /payment-link after
+--payments-ms, and for the booking_created events a pool of --payment-workers
+threads standing for it publishes payment_link_created after the same time,
+through the in-process broker stand-in of payment_latency. --concurrency
+clients send --requests bookings. When bookings are accepted faster than
+payments creates links, the async links wait in the queue in front of it, and
+their latency grows with the backlog. Run from the booking directory:
+
+    cd booking
+    python -m benchmarks.payment_link --requests 1000 --payments-ms 50
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.http_pooling import BOOKING
+from benchmarks.payments import use_new_key
+from benchmarks.stubs import route_to_localhost, start_stub
+
+
+def percentiles(latencies: list[float]) -> tuple[float, float]:
+    ordered = sorted(latencies)
+    return statistics.median(ordered), ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--payments-ms", type=float, default=50, help="time payments takes to create a link")
+    parser.add_argument("--payment-workers", type=int, default=8, help="links the payments stand-in creates at once")
+    args = parser.parse_args()
+
+    port = start_stub(args.payments_ms)
+    os.environ.update(
+        BOOKING_STORAGE="memory", ITINERARY_MS_PORT=str(port), PAYMENT_MS_PORT=str(port),
+        BOOKING_CREATED_ROUTING_KEY="booking_created"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        # The public key is read when the app modules are imported
+        use_new_key(directory)
+        from flask import Flask
+        from app.config import Config, config
+        from app.core.rabbitmq import RabbitMQManager
+        from app.routes.booking import bookings_bp
+        from app.services.booking_manager import BookingsManager
+        from benchmarks.payment_latency import StandInBroker, StandInConnection
+
+    broker = StandInBroker()
+    payments = ThreadPoolExecutor(max_workers=args.payment_workers)
+
+    def create_link(body: bytes) -> None:
+        time.sleep(args.payments_ms / 1000)
+        booking_id = json.loads(body)["booking_id"]
+        broker.publish("payment_link_created", config.PAYMENT_LINK_CREATED_ROUTING_KEY, json.dumps({
+            "booking_id": booking_id, "payment_link": f"http://payments/pay/{booking_id}"
+        }).encode("utf-8"))
+
+    def basic_publish(self, exchange, routing_key, body, properties=None, **kwargs):
+        if routing_key == config.BOOKING_CREATED_ROUTING_KEY and json.loads(body)["create_payment_link"]:
+            payments.submit(create_link, body)
+
+    StandInConnection.basic_publish = basic_publish
+    RabbitMQManager._create_connection = lambda self: broker.connect()
+    manager = RabbitMQManager()
+    route_to_localhost()
+
+    # Time each booking gets its link at
+    linked_at = {}
+    register_payment_link = BookingsManager.register_payment_link
+
+    def timed_register(self, booking_id, payment_link):
+        result = register_payment_link(self, booking_id, payment_link)
+        linked_at[booking_id] = time.perf_counter()
+        return result
+
+    BookingsManager.register_payment_link = timed_register
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.register_blueprint(bookings_bp)
+
+    def post_booking(_) -> tuple[str, float, float]:
+        start = time.perf_counter()
+        response = app.test_client().post("/bookings", json=BOOKING)
+        end = time.perf_counter()
+        if response.status_code != 200:
+            raise SystemExit(f"POST /bookings failed: {response.status_code} {response.get_data(as_text=True)}")
+        return response.get_json()["id"], start, end
+
+    print(f"{args.requests} bookings from {args.concurrency} clients, payments creating a link in {args.payments_ms} ms, "
+          f"latency in ms")
+    print(f"{'payment link':14} {'POST p50':>10} {'POST p99':>10} {'bookings/s':>12} {'link p50':>10} {'link p99':>10}")
+    for name, async_payment_link in [("in request", False), ("async", True)]:
+        app.config["BOOKING_ASYNC_PAYMENT_LINK"] = async_payment_link
+        linked_at.clear()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as clients:
+            start = time.perf_counter()
+            posted = list(clients.map(post_booking, range(args.requests)))
+            elapsed = time.perf_counter() - start
+
+        # Clients long poll for the link, every booking must get one
+        for booking_id, _, _ in posted:
+            booking = app.test_client().get(f"/bookings/{booking_id}?wait=30").get_json()
+            if not booking.get("payment_link"):
+                raise SystemExit(f"{name}: booking {booking_id} got no payment link")
+
+        post_p50, post_p99 = percentiles([(end - start) * 1000 for _, start, end in posted])
+        if async_payment_link:
+            link_p50, link_p99 = percentiles([(linked_at[booking_id] - start) * 1000 for booking_id, start, _ in posted])
+        else:
+            link_p50, link_p99 = post_p50, post_p99
+        print(f"{name:14} {post_p50:10.2f} {post_p99:10.2f} {args.requests / elapsed:12.0f} {link_p50:10.2f} {link_p99:10.2f}")
+
+    payments.shutdown()
+    manager.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Payment events signed like the payments service signs them, for the benchmarks."""
+import base64
+import json
+import os
+import uuid
+
+import rsa
+
+
+def use_new_key(directory: str) -> rsa.PrivateKey:
+    """
+    Make booking verify payments with a new key pair, its public key written to
+    `directory`, and return the private key. Call it before importing app modules.
+    """
+    public_key, private_key = rsa.newkeys(2048)
+    path = os.path.join(directory, "payments_public.pem")
+    with open(path, "wb") as file:
+        file.write(public_key.save_pkcs1())
+    os.environ["PAYMENTS_SERVICE_PUBLIC_KEY"] = path
+    return private_key
+
+
+def payment_event(private_key: rsa.PrivateKey, booking_id: str, status: str = "AUTHORIZED") -> bytes:
+    """Body of a payment_accepted / payment_rejected message about `booking_id`."""
+    transaction = {
+        "id": str(uuid.uuid4()),
+        "booking_id": booking_id,
+        "status": status,
+        "card_last4": "4242",
+        "amount": 1000.0,
+        "currency": "BRL",
+        "transaction_id": str(uuid.uuid4()),
+        "number_of_passengers": 2,
+        "number_of_cabins": 1
+    }
+    transaction_str = json.dumps(transaction, sort_keys=True)
+    signature = rsa.sign(transaction_str.encode(), private_key, "SHA-256")
+    return json.dumps({
+        "transaction": transaction,
+        "signature": base64.b64encode(signature).decode("utf-8")
+    }).encode("utf-8")
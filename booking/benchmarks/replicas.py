@@ -0,0 +1,168 @@
+"""
+Throughput of booking creation (bookings/s) with 1, 2 and 4 booking replicas,
+each owning its shard of the HashRing.
+
+Every replica is a process of its own serving the booking routes, with its own
+SQLite database, BOOKING_SHARD_COUNT set to the number of replicas and
+BOOKING_SHARDS to its shard, the in-process broker stand-in of payment_latency
+and a local stand-in for the itinerary service. --clients-per-replica clients
+per replica send POST /bookings for --seconds, spread over the replicas like a
+load balancer would. Some of the bookings are then read back from another
+replica, which forwards the request to the owner. The replicas and the clients
+share the machine: scaling is only near-linear with a CPU for each replica and
+some left for the clients. Run from the booking directory:
+
+    cd booking
+    python -m benchmarks.replicas --replicas 1 2 4
+"""
+import argparse
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from benchmarks.http_pooling import BOOKING
+from benchmarks.payments import use_new_key
+from benchmarks.stubs import route_to_localhost, start_stub
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve(port: int) -> None:
+    """Run one replica, configured by the environment its parent set."""
+    from flask import Flask
+    from werkzeug.serving import make_server
+    from app.config import Config
+    from app.core.rabbitmq import RabbitMQManager
+    from app.routes.booking import bookings_bp
+    from app.services.booking_manager import BookingsManager
+    from benchmarks.payment_latency import StandInBroker
+
+    broker = StandInBroker()
+    RabbitMQManager._create_connection = lambda self: broker.connect()
+    RabbitMQManager()
+    BookingsManager()
+    route_to_localhost()
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.register_blueprint(bookings_bp)
+    make_server("127.0.0.1", port, app, threaded=True).serve_forever()
+
+
+def start_replicas(count: int, itinerary_port: int, directory: str) -> tuple[list[subprocess.Popen], list[str]]:
+    urls = [f"127.0.0.1:{free_port()}" for _ in range(count)]
+    replicas = []
+    for shard, url in enumerate(urls):
+        env = {
+            **os.environ,
+            "BOOKING_SHARD_COUNT": str(count), "BOOKING_SHARDS": str(shard), "BOOKING_SHARD_URLS": ",".join(urls),
+            "BOOKING_DB": os.path.join(directory, f"bookings-{count}-{shard}.db"),
+            "ITINERARY_MS_PORT": str(itinerary_port), "PAYMENT_MS_PORT": str(itinerary_port),
+        }
+        replicas.append(subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.replicas", "--serve", url.rsplit(":", 1)[1]],
+            env=env, stdout=subprocess.DEVNULL
+        ))
+
+    deadline = time.monotonic() + 60
+    for replica, url in zip(replicas, urls):
+        while True:
+            try:
+                requests.get(f"http://{url}/bookings?limit=1", timeout=1)
+                break
+            except requests.RequestException:
+                if replica.poll() is not None or time.monotonic() > deadline:
+                    stop_replicas(replicas)
+                    raise SystemExit(f"Replica {url} did not start")
+                time.sleep(0.1)
+    return replicas, urls
+
+
+def stop_replicas(replicas: list[subprocess.Popen]) -> None:
+    for replica in replicas:
+        replica.terminate()
+    for replica in replicas:
+        replica.wait()
+
+
+def load(urls: list[str], clients: int, seconds: float) -> list[str]:
+    """POST /bookings from `clients` threads for `seconds`, return the ids of the bookings created."""
+    created = [[] for _ in range(clients)]
+    failures = []
+    stop = time.perf_counter() + seconds
+
+    def client(i: int) -> None:
+        session = requests.Session()
+        url = f"http://{urls[i % len(urls)]}/bookings"
+        while time.perf_counter() < stop:
+            response = session.post(url, json=BOOKING, timeout=10)
+            if response.status_code != 200:
+                failures.append(f"POST /bookings failed: {response.status_code} {response.text}")
+                return
+            created[i].append(response.json()["id"])
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if failures:
+        raise SystemExit(failures[0])
+    return [booking_id for ids in created for booking_id in ids]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replicas", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients-per-replica", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    os.environ.update(BOOKING_STORAGE="sqlite", BOOKING_ASYNC_PAYMENT_LINK="true")
+    itinerary_port = start_stub()
+
+    print(f"POST /bookings for {args.seconds} s, {args.clients_per_replica} clients per replica, {os.cpu_count()} CPUs")
+    print(f"{'replicas':>8} {'bookings/s':>12} {'scaling':>8} {'per replica':>12}")
+    baseline = None
+    with tempfile.TemporaryDirectory() as directory:
+        # One key pair for every replica, their public key is read when the app modules are imported
+        use_new_key(directory)
+        for count in args.replicas:
+            replicas, urls = start_replicas(count, itinerary_port, directory)
+            try:
+                # Warm up the itinerary cache and the connections
+                load(urls, count, 0.5)
+                created = load(urls, count * args.clients_per_replica, args.seconds)
+
+                # Any replica answers for any booking, forwarding to its owner
+                for i, booking_id in enumerate(created[:200]):
+                    response = requests.get(f"http://{urls[(i + 1) % count]}/bookings/{booking_id}", timeout=10)
+                    if response.status_code != 200 or response.json().get("id") != booking_id:
+                        raise SystemExit(f"Booking {booking_id} not found through replica {urls[(i + 1) % count]}")
+            finally:
+                stop_replicas(replicas)
+
+            rate = len(created) / args.seconds
+            baseline = baseline or rate
+            print(f"{count:>8} {rate:12.0f} {rate / baseline:7.2f}x {rate / count:12.0f}")
+
+
+if __name__ == "__main__":
+    main()
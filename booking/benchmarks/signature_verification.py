@@ -0,0 +1,88 @@
+"""
+Throughput of payment signature verification (signatures/s).
+
+Signs --messages payment events with a key pair made for the run, then verifies
+them the way the consumer used to (pure Python rsa, one at a time), with the
+OpenSSL backend when `cryptography` is installed, through SignatureVerifier on
+a pool of --workers processes, and once more as redeliveries answered from the
+SignatureVerifier cache. Run from the booking directory:
+
+    cd booking
+    python -m benchmarks.signature_verification --messages 2000 --workers 4
+"""
+import argparse
+import base64
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.payments import payment_event, use_new_key
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=4, help="processes of the verification pool")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # The public key is read when the app modules are imported
+        private_key = use_new_key(directory)
+        from app.core import crypto_verify
+        from app.core.signature_verifier import SignatureVerifier
+
+    # What the consumer verifies: the transaction serialized with sorted keys, and its signature
+    checks = []
+    for i in range(args.messages):
+        data = json.loads(payment_event(private_key, f"RES-{i:08d}"))
+        checks.append((json.dumps(data["transaction"], sort_keys=True), base64.b64decode(data["signature"])))
+
+    def inline():
+        return all(crypto_verify.verify_signature(value, sig) for value, sig in checks)
+
+    def pooled(verifier: SignatureVerifier):
+        futures = [verifier.submit(value, sig) for value, sig in checks]
+        return all(future.result() for future in futures)
+
+    fast_public_key = crypto_verify.fast_public_key
+    runs = []
+
+    # Pure Python rsa, what the consumer used to run for every message. The pool
+    # processes are started before the timing (forked, they use this backend too)
+    crypto_verify.fast_public_key = None
+    pool = SignatureVerifier(workers=args.workers, cache_size=len(checks))
+    for value, sig in checks[:args.workers]:
+        pool.submit(value + " ", sig).result()
+    runs.append(("rsa, inline", inline))
+    runs.append((f"{args.workers} processes", lambda: pooled(pool)))
+
+    results = []
+    for name, run in runs:
+        start = time.perf_counter()
+        assert run(), f"{name}: a valid signature was refused"
+        results.append((name, time.perf_counter() - start))
+    pool.stop()
+    crypto_verify.fast_public_key = fast_public_key
+
+    if fast_public_key is not None:
+        start = time.perf_counter()
+        assert inline(), "cryptography: a valid signature was refused"
+        results.append(("cryptography, inline", time.perf_counter() - start))
+    else:
+        print("cryptography is not installed, its backend is skipped")
+
+    verifier = SignatureVerifier(workers=0, cache_size=len(checks))
+    pooled(verifier)
+    start = time.perf_counter()
+    assert pooled(verifier), "cache: a valid signature was refused"
+    results.append(("redeliveries, cached", time.perf_counter() - start))
+
+    print(f"{args.messages} payment signatures (RSA 2048, SHA-256), {os.cpu_count()} CPUs")
+    baseline = results[0][1]
+    for name, elapsed in results:
+        print(f"{name:28} {elapsed:8.3f} s {args.messages / elapsed:12.0f} signatures/s {baseline / elapsed:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
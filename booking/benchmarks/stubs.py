@@ -0,0 +1,63 @@
+"""Stand-ins for the itinerary and payments services, for the benchmarks."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ITINERARY = {
+    "id": 1, "destination": "Salvador", "origin": "Santos", "ship_name": "Benchmark", "return_port": "Santos",
+    "places_visited": ["Salvador"], "number_of_nights": 7, "cabin_cost": 1000.0, "cabin_capacity": 4,
+    "trip_continent": "America do Sul", "date": "2030-01-01", "available_cabins": 1_000_000
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Keep-alive answers to GET /itineraries/<id> and GET /payment-link, after `delay` seconds."""
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written apart, Nagle would hold the body for the ACK of the headers
+    disable_nagle_algorithm = True
+    delay = 0.0
+
+    def do_GET(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length)) if length else {}
+        if self.delay:
+            time.sleep(self.delay)
+
+        if self.path.startswith("/itineraries/"):
+            status, body = 200, {**ITINERARY, "id": int(self.path.rsplit("/", 1)[-1])}
+        elif self.path == "/payment-link":
+            status, body = 201, {"payment": {"payment_link": f"http://payments/pay/{request.get('booking_id')}"}}
+        else:
+            status, body = 404, {"error": "Not found"}
+
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub(delay_ms: float = 0) -> int:
+    """Serve StubHandler on a free local port in the background and return the port."""
+    handler = type("Handler", (StubHandler,), {"delay": delay_ms / 1000})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1]
+
+
+def route_to_localhost() -> None:
+    """Send the calls HttpClient makes to the services (by their compose host names) to 127.0.0.1."""
+    from app.core.http_client import HttpClient
+
+    request = HttpClient.request
+
+    def local_request(self, method, host, port, path, **kwargs):
+        return request(self, method, "127.0.0.1", port, path, **kwargs)
+
+    HttpClient.request = local_request
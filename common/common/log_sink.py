@@ -0,0 +1,134 @@
+import json
+import threading
+from collections import deque
+import pika
+
+
+class LogSink:
+    """
+    Non-blocking log shipping to the logger service.
+
+    `log` only appends the line to a bounded ring buffer. A background thread
+    with its own connection sends the buffered lines as one message (a JSON list
+    of lines, with a "batch" header) every `batch_size` lines or `flush_interval_ms`.
+    A batch that could not be sent goes back to the front of the buffer and is
+    sent again on the next flush. When the buffer is full, `overflow_policy`
+    decides which line is lost: "drop_oldest" (default) or "drop_newest".
+    Counters are kept in `stats` ("failed" counts lines of failed sends).
+    """
+
+    def __init__(self, create_connection, sender: str, routing_key: str, batch_size: int = 50,
+                 flush_interval_ms: int = 200, capacity: int = 10000, overflow_policy: str = "drop_oldest"):
+        self._create_connection = create_connection
+        self._sender = sender
+        self._routing_key = routing_key
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval_ms / 1000
+        self._capacity = capacity
+        self._drop_newest = overflow_policy == "drop_newest"
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._connection = None
+        self._channel = None
+        self.stats = {"logged": 0, "sent": 0, "dropped": 0, "failed": 0}
+        self._reported_drops = 0
+        self._running = True
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def log(self, line: str) -> None:
+        with self._lock:
+            self.stats["logged"] += 1
+            if len(self._buffer) >= self._capacity:
+                self.stats["dropped"] += 1
+                if self._drop_newest:
+                    return
+                self._buffer.popleft()
+            self._buffer.append(line)
+            full = len(self._buffer) >= self._batch_size
+        if full:
+            self._wake.set()
+
+    def _requeue(self, batch: list) -> None:
+        """Put an unsent batch back at the front, keeping the buffer within capacity."""
+        with self._lock:
+            self._buffer.extendleft(reversed(batch))
+            overflow = len(self._buffer) - self._capacity
+            if overflow > 0:
+                self.stats["dropped"] += overflow
+                for _ in range(overflow):
+                    if self._drop_newest:
+                        self._buffer.pop()
+                    else:
+                        self._buffer.popleft()
+
+    def _connect(self):
+        if self._connection and self._connection.is_open and self._channel and self._channel.is_open:
+            return
+        self._connection = self._create_connection()
+        self._channel = self._connection.channel()
+        self._channel.exchange_declare(exchange="direct", exchange_type="direct")
+
+    def _close(self):
+        try:
+            if self._connection and self._connection.is_open:
+                self._connection.close()
+        except Exception:
+            pass
+        self._connection = None
+        self._channel = None
+
+    def _run(self):
+        while self._running:
+            self._wake.wait(self._flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """Send everything buffered so far. Only called from the flusher thread."""
+        sent_any = False
+        while True:
+            with self._lock:
+                batch = [self._buffer.popleft() for _ in range(min(self._batch_size, len(self._buffer)))]
+            if not batch:
+                break
+
+            try:
+                self._connect()
+                self._channel.basic_publish(
+                    exchange="direct",
+                    routing_key=self._routing_key,
+                    body=json.dumps(batch).encode("utf-8"),
+                    properties=pika.BasicProperties(
+                        headers={"sender": self._sender, "batch": len(batch)},
+                        content_type="application/json"
+                    )
+                )
+                self.stats["sent"] += len(batch)
+                sent_any = True
+            except Exception as e:
+                print(f"Error shipping {len(batch)} log lines: {e}")
+                self.stats["failed"] += len(batch)
+                self._requeue(batch)
+                self._close()
+                break
+
+        if not sent_any and self._connection and self._connection.is_open:
+            # Idle: let the connection answer heartbeats
+            try:
+                self._connection.process_data_events(time_limit=0)
+            except Exception:
+                self._close()
+
+        if self.stats["dropped"] != self._reported_drops:
+            print(f"Log buffer full: dropped {self.stats['dropped'] - self._reported_drops} lines")
+            self._reported_drops = self.stats["dropped"]
+
+    def stop(self) -> None:
+        self._running = False
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        self._close()
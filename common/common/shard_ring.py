@@ -0,0 +1,47 @@
+import hashlib
+from bisect import bisect
+
+
+class HashRing:
+    """
+    Consistent hashing of booking ids onto the shards "0" .. "shard_count - 1".
+
+    Every shard owns POINTS_PER_SHARD points of a 64 bit ring, and a booking
+    belongs to the shard of the first point after its hash. The points of a
+    shard do not depend on the number of shards, so adding one only moves the
+    bookings that land on the new shard's points.
+
+    The same ring is used by booking and by the services publishing events
+    about bookings, which suffix the routing key with the shard.
+    """
+    POINTS_PER_SHARD = 100
+
+    def __init__(self, shard_count: int):
+        self.shards = [str(shard) for shard in range(shard_count)]
+        points = sorted(
+            (self._hash(f"{shard}:{point}"), shard)
+            for shard in self.shards
+            for point in range(self.POINTS_PER_SHARD)
+        )
+        self._hashes = [hash_ for hash_, _ in points]
+        self._owners = [shard for _, shard in points]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+    def shard_for(self, booking_id: str) -> str:
+        i = bisect(self._hashes, self._hash(booking_id)) % len(self._hashes)
+        return self._owners[i]
+
+    def routing_key(self, routing_key: str, booking_id: str) -> str:
+        """Routing key of an event about `booking_id`, suffixed with its shard when sharded."""
+        if len(self.shards) == 1:
+            return routing_key
+        return f"{routing_key}.{self.shard_for(booking_id)}"
+
+    def routing_keys(self, routing_key: str) -> list[str]:
+        """Every routing key an event published with `routing_key` may be sent on."""
+        if len(self.shards) == 1:
+            return [routing_key]
+        return [f"{routing_key}.{shard}" for shard in self.shards]
@@ -14,7 +14,7 @@ const BookingDetails: FC = () => {
     const fetchBooking = async () => {
       try {
         const response = await fetch(
-          `${import.meta.env.VITE_API_URL}/bookings/${id}`
+          `${import.meta.env.VITE_API_URL}/bookings/${id}?wait=10`
         );
         if (!response.ok) {
           throw new Error("Failed to fetch booking details");
@@ -61,6 +61,7 @@ export interface Booking {
   payment?: Payment;
   total_cost: number;
   payment_link?: string;
+  payment_link_status?: "PENDING" | "CREATED" | "FAILED";
   tickets?: TicketBookingResponse;
 }
 
@@ -13,10 +13,31 @@ class Config:
     LOGS_ROUTING_KEY = os.getenv("LOGS_ROUTING_KEY")
     BOOKING_CREATED_ROUTING_KEY = os.getenv("BOOKING_CREATED_ROUTING_KEY")
     BOOKING_CANCELLED_ROUTING_KEY = os.getenv("BOOKING_CANCELLED_ROUTING_KEY")
+    MARKETING_ROUTING_KEY = os.getenv("MARKETING_ROUTING_KEY")
 
     # API Keys
     ITINERARY_MS_PORT = os.getenv("ITINERARY_MS_PORT")
 
+    # Catalog storage backend: "memory" or "columnar"
+    ITINERARY_STORAGE = os.getenv("ITINERARY_STORAGE", "memory")
+    # Inventory consumer: unacked deliveries per channel, and how many deliveries
+    # (or how long) to collect before applying them in one pass
+    CONSUMER_PREFETCH = int(os.getenv("CONSUMER_PREFETCH", "200"))
+    CONSUMER_BATCH_SIZE = int(os.getenv("CONSUMER_BATCH_SIZE", "100"))
+    CONSUMER_BATCH_TIMEOUT_MS = int(os.getenv("CONSUMER_BATCH_TIMEOUT_MS", "50"))
+    # Refused inventory changes are retried with exponential backoff, then dead-lettered
+    CONSUMER_MAX_RETRIES = int(os.getenv("CONSUMER_MAX_RETRIES", "5"))
+    CONSUMER_RETRY_BASE_MS = int(os.getenv("CONSUMER_RETRY_BASE_MS", "1000"))
+    # Bookings already applied, to drop duplicate deliveries
+    DEDUP_CACHE_SIZE = int(os.getenv("DEDUP_CACHE_SIZE", "100000"))
+    DEDUP_TTL_SECONDS = int(os.getenv("DEDUP_TTL_SECONDS", "3600"))
+
+    # Longest a promotion lasts, it also ends on the boarding date
+    PROMOTION_TTL_SECONDS = int(os.getenv("PROMOTION_TTL_SECONDS", "604800"))
+
+    # Binary snapshot of the catalog, leave empty to always load the JSON file
+    ITINERARY_SNAPSHOT = os.getenv("ITINERARY_SNAPSHOT", "./itinerarios_portugues.snapshot")
+
     @classmethod
     def validate(cls):
         required_vars = [
@@ -27,6 +48,7 @@ class Config:
             cls.LOGS_ROUTING_KEY,
             cls.BOOKING_CREATED_ROUTING_KEY,
             cls.BOOKING_CANCELLED_ROUTING_KEY,
+            cls.MARKETING_ROUTING_KEY,
             cls.ITINERARY_MS_PORT
         ]
         if not all(required_vars):
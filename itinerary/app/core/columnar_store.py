@@ -0,0 +1,219 @@
+from array import array
+from datetime import date
+import numpy as np
+from app.models import Itinerary
+from app.core.itinerary_index import SORT_FIELDS, normalize_text
+
+
+class StringColumn:
+    """Dictionary encoded string column: one int32 code per row plus the list of distinct values."""
+
+    def __init__(self, values: list[str] = None, codes: np.ndarray = None):
+        self.values: list[str] = values if values is not None else []
+        self.codes = codes
+        self._lookup = {value: code for code, value in enumerate(self.values)}
+        self._buffer = array("i")
+
+    def append(self, value: str) -> None:
+        code = self._lookup.get(value)
+        if code is None:
+            code = len(self.values)
+            self._lookup[value] = code
+            self.values.append(value)
+        self._buffer.append(code)
+
+    def freeze(self) -> None:
+        self.codes = np.frombuffer(self._buffer, dtype=np.int32)
+
+    def value(self, row: int) -> str:
+        return self.values[self.codes[row]]
+
+    def codes_for(self, value: str, key=None) -> list[int]:
+        """Codes whose value matches `value`, optionally comparing through `key`."""
+        if key is None:
+            code = self._lookup.get(value)
+            return [] if code is None else [code]
+        return [code for code, candidate in enumerate(self.values) if key(candidate) == value]
+
+
+class ColumnarStore:
+    """
+    Column oriented storage for the itinerary catalog.
+
+    Numeric fields live in NumPy arrays and string fields are dictionary encoded
+    into int32 codes. `places_visited` is flattened into one code array, with
+    `place_rows` telling which row each entry belongs to. Filters are evaluated
+    as boolean masks over whole columns, and `Itinerary` objects are only built
+    for the rows that are returned.
+    """
+    STRING_COLUMNS = ["destination", "origin", "ship_name", "return_port", "trip_continent", "places"]
+    NUMERIC_COLUMNS = [
+        "ids", "cabin_cost", "cabin_capacity", "available_cabins", "number_of_nights",
+        "dates", "place_rows", "place_offsets", "id_order", "sorted_ids",
+        "rank_date", "rank_price", "rank_nights"
+    ]
+
+    def __init__(self, columns: dict[str, np.ndarray], strings: dict[str, StringColumn]):
+        self.columns = columns
+        self.strings = strings
+
+        self.ids = columns["ids"]
+        self.cabin_cost = columns["cabin_cost"]
+        self.cabin_capacity = columns["cabin_capacity"]
+        # Inventory is the only mutable column, keep a private writable copy
+        self.available_cabins_column = np.array(columns["available_cabins"], dtype=np.int32)
+        self.number_of_nights = columns["number_of_nights"]
+        self.dates = columns["dates"]
+        self.place_rows = columns["place_rows"]
+        self.place_offsets = columns["place_offsets"]
+        self._id_order = columns["id_order"]
+        self._sorted_ids = columns["sorted_ids"]
+        self.ranks = {sort: columns[f"rank_{sort}"] for sort in SORT_FIELDS}
+
+        self.destination = strings["destination"]
+        self.origin = strings["origin"]
+        self.ship_name = strings["ship_name"]
+        self.return_port = strings["return_port"]
+        self.trip_continent = strings["trip_continent"]
+        self.places = strings["places"]
+
+    @classmethod
+    def from_records(cls, records: list[dict]) -> 'ColumnarStore':
+        ids = array("q")
+        cabin_cost = array("d")
+        cabin_capacity = array("i")
+        available_cabins = array("i")
+        number_of_nights = array("i")
+        dates = array("i")
+        place_rows = array("i")
+        strings = {name: StringColumn() for name in cls.STRING_COLUMNS}
+
+        for row, item in enumerate(records):
+            itinerary = Itinerary(**item)
+            ids.append(itinerary.id)
+            cabin_cost.append(itinerary.cabin_cost)
+            cabin_capacity.append(itinerary.cabin_capacity)
+            available_cabins.append(itinerary.available_cabins)
+            number_of_nights.append(itinerary.number_of_nights)
+            dates.append(itinerary.date.toordinal())
+            strings["destination"].append(itinerary.destination)
+            strings["origin"].append(itinerary.origin)
+            strings["ship_name"].append(itinerary.ship_name)
+            strings["return_port"].append(itinerary.return_port)
+            strings["trip_continent"].append(itinerary.trip_continent)
+            for place in itinerary.places_visited:
+                strings["places"].append(place)
+                place_rows.append(row)
+
+        for column in strings.values():
+            column.freeze()
+
+        columns = {
+            "ids": np.frombuffer(ids, dtype=np.int64),
+            "cabin_cost": np.frombuffer(cabin_cost, dtype=np.float64),
+            "cabin_capacity": np.frombuffer(cabin_capacity, dtype=np.int32),
+            "available_cabins": np.frombuffer(available_cabins, dtype=np.int32),
+            "number_of_nights": np.frombuffer(number_of_nights, dtype=np.int32),
+            "dates": np.frombuffer(dates, dtype=np.int32),
+            "place_rows": np.frombuffer(place_rows, dtype=np.int32),
+        }
+        columns["place_offsets"] = np.searchsorted(columns["place_rows"], np.arange(len(ids) + 1))
+        # Sorted view of the ids for lookups without a per-row dict
+        columns["id_order"] = np.argsort(columns["ids"], kind="stable")
+        columns["sorted_ids"] = columns["ids"][columns["id_order"]]
+
+        # Presorted orders, stored as the rank of every row (ties keep catalog order)
+        sort_columns = {"date": columns["dates"], "price": columns["cabin_cost"], "nights": columns["number_of_nights"]}
+        for sort, column in sort_columns.items():
+            rank = np.empty(len(ids), dtype=np.int64)
+            rank[np.argsort(column, kind="stable")] = np.arange(len(ids))
+            columns[f"rank_{sort}"] = rank
+
+        return cls(columns, strings)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def position_of(self, itinerary_id: int) -> int | None:
+        i = np.searchsorted(self._sorted_ids, itinerary_id)
+        if i < len(self._sorted_ids) and self._sorted_ids[i] == itinerary_id:
+            return int(self._id_order[i])
+        return None
+
+    def get(self, position: int) -> Itinerary:
+        start, end = self.place_offsets[position], self.place_offsets[position + 1]
+        return Itinerary.model_construct(
+            id=int(self.ids[position]),
+            destination=self.destination.value(position),
+            origin=self.origin.value(position),
+            ship_name=self.ship_name.value(position),
+            return_port=self.return_port.value(position),
+            places_visited=[self.places.values[code] for code in self.places.codes[start:end]],
+            number_of_nights=int(self.number_of_nights[position]),
+            cabin_cost=float(self.cabin_cost[position]),
+            cabin_capacity=int(self.cabin_capacity[position]),
+            trip_continent=self.trip_continent.value(position),
+            date=date.fromordinal(int(self.dates[position])),
+            available_cabins=int(self.available_cabins_column[position]),
+        )
+
+    def available_cabins(self, position: int) -> int:
+        return int(self.available_cabins_column[position])
+
+    def set_available_cabins(self, position: int, cabins: int) -> None:
+        self.available_cabins_column[position] = cabins
+
+    def names(self) -> list[tuple[str, str, int]]:
+        """(field, name, itineraries) for every port and destination name in the catalog."""
+        columns = {
+            "origin": self.origin,
+            "destination": self.destination,
+            "return_port": self.return_port,
+            "places_visited": self.places,
+        }
+        names = []
+        for field, column in columns.items():
+            counts = np.bincount(column.codes, minlength=len(column.values))
+            names.extend((field, value, int(count)) for value, count in zip(column.values, counts) if count)
+        return names
+
+    def cabin_costs(self) -> np.ndarray:
+        """Catalog price of every position."""
+        return self.cabin_cost
+
+    def sort_keys(self, positions: list[int], sort: str) -> list[int]:
+        """Rank of each position in the catalog presorted by `sort`."""
+        return self.ranks[sort][np.asarray(positions, dtype=np.int64)].tolist()
+
+    def search(self, filters: dict) -> list[int]:
+        """
+        Return the catalog positions matching the filters, in catalog order.
+
+        Args:
+            filters (dict): Same criteria as ItineraryIndex.search.
+        """
+        mask = np.ones(len(self.ids), dtype=bool)
+
+        if filters.get('origin') is not None:
+            mask &= np.isin(self.origin.codes, self.origin.codes_for(filters['origin']))
+
+        if filters.get('destination') is not None:
+            mask &= np.isin(self.destination.codes, self.destination.codes_for(filters['destination']))
+
+        if filters.get('continent') is not None:
+            codes = self.trip_continent.codes_for(filters['continent'].lower(), key=str.lower)
+            mask &= np.isin(self.trip_continent.codes, codes)
+
+        if filters.get('date') is not None:
+            mask &= self.dates == filters['date'].toordinal()
+
+        if filters.get('min_cabins') is not None:
+            mask &= self.available_cabins_column >= filters['min_cabins']
+
+        for place in filters.get('places_visited') or []:
+            codes = self.places.codes_for(normalize_text(place), key=normalize_text)
+            visits = np.zeros(len(self.ids), dtype=bool)
+            visits[self.place_rows[np.isin(self.places.codes, codes)]] = True
+            mask &= visits
+
+        return np.flatnonzero(mask).tolist()
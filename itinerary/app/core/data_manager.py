@@ -1,15 +1,50 @@
+import base64
+import heapq
 import json
-from datetime import datetime
+import math
+import threading
+import time
+from datetime import date, datetime, time as day_start
+import numpy as np
+from app.config import Config
 from app.models import Itinerary
+from app.core.itinerary_index import SORT_FIELDS, ItineraryIndex, normalize_text
+from app.core.columnar_store import ColumnarStore
+from app.core.port_search import PortTrie
+from app.core.response_cache import ResponseCache
+from app.core.price_overlay import PriceOverlay
+from app.core.snapshot import load_snapshot, write_snapshot
+
+ITINERARY_FILE = "./itinerarios_portugues.json"
+MAX_PAGE_SIZE = 1000
+# Inventory updates lock the stripe of each itinerary they touch (position % LOCK_STRIPES)
+LOCK_STRIPES = 64
 
 class DataManager:
     """
     DataManager is a singleton class that manages the data for the itinerary service.
     It loads the data from the itinerary file and provides a method to get the itineraries.
+
+    The catalog is kept either as a list of Itinerary models behind an ItineraryIndex
+    ("memory", the default) or in a ColumnarStore ("columnar"), selected with the
+    ITINERARY_STORAGE variable. Both expose the same store interface through `index`.
+    The catalog is read from a binary snapshot (ITINERARY_SNAPSHOT) when it is newer
+    than the JSON file.
+
+    Promotions live in a PriceOverlay and replace `cabin_cost` in every item that is
+    returned, without touching the catalog. Sorting by price uses the promotional
+    prices too.
     """
     _instance = None
     _initialized = False
     data: list[Itinerary] = None
+    index: ItineraryIndex | ColumnarStore = None
+    cache: ResponseCache = None
+    promotions: PriceOverlay = None
+    # (overlay version, rank of every position by promotional price)
+    _price_ranks: tuple[int, np.ndarray] = None
+    ports: PortTrie = None
+    _locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
 
     def __new__(cls):
         if cls._instance is None:
@@ -19,32 +54,78 @@ class DataManager:
     def __init__(self):
         if not DataManager._initialized:
             try:
-                with open("./itinerarios_portugues.json", "r", encoding="utf-8") as file:
-                    raw_data = json.load(file)
-                
-                if (not raw_data):
-                    raise Exception("No data loaded from itinerary file")
+                store = self._load_store()
 
-                self.data = [Itinerary(**item) for item in raw_data]
+                if Config.ITINERARY_STORAGE == "columnar":
+                    self.index = store
+                else:
+                    self.data = [store.get(position) for position in range(len(store))]
+                    self.index = ItineraryIndex(self.data)
+                self.cache = ResponseCache()
+                self.promotions = PriceOverlay()
+                self.ports = PortTrie(self.index.names())
 
                 DataManager._initialized = True
             except Exception as e:
                 print(f"Failed loading itinerary file {e}")
 
+    def _load_store(self) -> ColumnarStore:
+        """
+        Load the catalog from the binary snapshot when it is up to date, otherwise
+        parse and validate the JSON file and write a fresh snapshot for the next boot.
+        """
+        if Config.ITINERARY_SNAPSHOT:
+            try:
+                store = load_snapshot(Config.ITINERARY_SNAPSHOT, ITINERARY_FILE)
+                if store is not None:
+                    print("Itinerary catalog loaded from snapshot")
+                    return store
+            except Exception as e:
+                print(f"Failed loading itinerary snapshot {e}")
+
+        with open(ITINERARY_FILE, "r", encoding="utf-8") as file:
+            raw_data = json.load(file)
+        
+        if (not raw_data):
+            raise Exception("No data loaded from itinerary file")
+
+        store = ColumnarStore.from_records(raw_data)
+
+        if Config.ITINERARY_SNAPSHOT:
+            try:
+                write_snapshot(store, Config.ITINERARY_SNAPSHOT, ITINERARY_FILE)
+            except Exception as e:
+                print(f"Failed writing itinerary snapshot {e}")
+
+        return store
+
+    def _item(self, position: int) -> dict:
+        """Itinerary at `position` as returned to clients, with its promotional price if any."""
+        itinerary = self.index.get(position)
+        item = itinerary.to_dict()
+        new_cost = self.promotions.price(itinerary.id, itinerary.date)
+        if new_cost is not None:
+            item['cabin_cost'] = new_cost
+        return item
+
     def get_itinerary_by_id(self, itinerary_id: int) -> Itinerary:
-        for itinerary in self.data:
-            if itinerary.id == itinerary_id:
-                return itinerary.to_dict()
-        return None
+        position = self.index.position_of(itinerary_id)
+        if position is None:
+            return None
+        self._expire_promotions()
+        return self._item(position)
+
+    def get_itinerary_json(self, itinerary_id: int) -> bytes:
+        position = self.index.position_of(itinerary_id)
+        if position is None:
+            return None
+        self._expire_promotions()
+        return self.cache.fragment(position, self._item)
 
     def get_itineraries(self) -> list[Itinerary]:
-        return [item.to_dict() for item in self.data]
+        self._expire_promotions()
+        return [self._item(position) for position in range(len(self.index))]
 
-    def _normalize_text(self, text: str) -> str:
-        """Remove accents and convert to lowercase for text comparison."""
-        import unicodedata
-        return unicodedata.normalize('NFKD', text.lower()).encode('ASCII', 'ignore').decode('ASCII')
-    
     def filter_itineraries(self, filters: dict) -> list[Itinerary]:
         """
         Filter itineraries based on multiple criteria.
@@ -61,32 +142,152 @@ class DataManager:
         Returns:
             list[Itinerary]: Filtered list of itineraries
         """
-        itineraries = self.data
-        filters_itineraries = []
+        self._expire_promotions()
+        return [self._item(position) for position in self._search(filters)]
 
-        if filters['origin'] is not None:
-            filters_itineraries.append(lambda x: x.origin == filters['origin'])
+    def filter_itineraries_json(self, filters: dict, sort: str = None, limit: int = None,
+                                cursor: str = None, fields: list[str] = None) -> bytes:
+        """
+        Same as filter_itineraries, but returns the JSON encoded response body.
+        Bodies are cached per normalized filter until the inventory or a returned item changes.
+
+        Args:
+            filters (dict): Same criteria as filter_itineraries
+            sort (str): "date", "price" or "nights", prefixed with "-" for descending order
+            limit (int): Page size. When set the body is {"items": [...], "next_cursor": ...}
+            cursor (str): `next_cursor` returned by the previous page
+            fields (list): Itinerary fields to return, all of them when empty
+
+        Raises:
+            ValueError: If a filter, the sort, the cursor or a field is invalid
+        """
+        if limit is not None:
+            if limit < 1:
+                raise ValueError("limit must be a positive integer")
+            limit = min(limit, MAX_PAGE_SIZE)
+        if sort is not None and sort.lstrip("-") not in SORT_FIELDS:
+            raise ValueError(f"Invalid sort: {sort}")
+        for field in fields or []:
+            if field not in Itinerary.model_fields:
+                raise ValueError(f"Invalid field: {field}")
+
+        key = (
+            filters.get('origin'),
+            filters.get('destination'),
+            tuple(sorted({normalize_text(place) for place in filters.get('places_visited') or []})),
+            filters.get('date'),
+            filters.get('min_cabins'),
+            filters['continent'].lower() if filters.get('continent') is not None else None,
+            sort,
+            limit,
+            cursor,
+            tuple(fields) if fields else None,
+        )
+
+        self._expire_promotions()
+        body = self.cache.get_response(key)
+        if body is not None:
+            return body
+
+        version = self.cache.version
+        positions = self._search(filters)
+
+        next_cursor = None
+        if sort is not None or limit is not None:
+            positions, next_cursor = self._page(positions, sort, limit, cursor)
 
-        if filters['destination'] is not None:
-            filters_itineraries.append(lambda x: x.destination == filters['destination'])
+        if fields:
+            fragments = [self._project(position, fields) for position in positions]
+        else:
+            fragments = [self.cache.fragment(position, self._item) for position in positions]
+        body = b"[" + b",".join(fragments) + b"]"
 
-        if filters['places_visited'] is not None:
-            filters_itineraries.append(lambda x: set(self._normalize_text(place) for place in filters['places_visited']).issubset(
-                set(self._normalize_text(place) for place in x.places_visited)))
+        if limit is not None:
+            body = b'{"items":' + body + b',"next_cursor":' + json.dumps(next_cursor).encode("utf-8") + b"}"
 
-        if filters['date'] is not None:
-            filters_itineraries.append(lambda x: x.date == datetime.strptime(filters['date'], "%Y-%m-%d").date())
+        self.cache.put_response(key, version, body, positions, order=sort.lstrip("-") if sort else None)
+        return body
 
-        if filters['min_cabins'] is not None:
-            filters_itineraries.append(lambda x: x.available_cabins >= filters['min_cabins'])
+    def _page(self, positions: list[int], sort: str, limit: int, cursor: str) -> tuple[list[int], str]:
+        """
+        Order `positions` with the presorted ranks of the store and cut the page
+        that follows `cursor`. The cursor is the sort key of the last returned item.
+        """
+        if sort is None:
+            keys = positions
+        else:
+            if sort.lstrip("-") == "price" and len(self.promotions):
+                ranks = self._promotional_price_ranks()
+                keys = [int(ranks[position]) for position in positions]
+            else:
+                keys = self.index.sort_keys(positions, sort.lstrip("-"))
+            if sort.startswith("-"):
+                last = len(self.index) - 1
+                keys = [last - key for key in keys]
+
+        after = self._decode_cursor(cursor, sort) if cursor else None
+        candidates = [(key, position) for key, position in zip(keys, positions) if after is None or key > after]
+
+        if limit is None:
+            return [position for _, position in sorted(candidates)], None
+
+        page = heapq.nsmallest(limit, candidates)
+        next_cursor = None
+        if len(candidates) > limit:
+            next_cursor = base64.urlsafe_b64encode(f"{sort or ''}:{page[-1][0]}".encode("utf-8")).decode("utf-8")
+        return [position for _, position in page], next_cursor
+
+    def _promotional_price_ranks(self) -> np.ndarray:
+        """
+        Rank of every position by price with the promotions applied (ties in catalog
+        price order). Computed again only after the overlay changes.
+        """
+        cached = self._price_ranks
+        version = self.promotions.version
+        if cached is not None and cached[0] == version:
+            return cached[1]
 
-        if filters['continent'] is not None:
-            filters_itineraries.append(lambda x: x.trip_continent.lower() == filters['continent'].lower())
+        costs = np.array(self.index.cabin_costs(), dtype=np.float64)
+        for (itinerary_id, _), new_cost in self.promotions.prices().items():
+            costs[self.index.position_of(itinerary_id)] = new_cost
+        catalog_ranks = np.asarray(self.index.sort_keys(range(len(self.index)), "price"))
+
+        ranks = np.empty(len(costs), dtype=np.int64)
+        ranks[np.lexsort((catalog_ranks, costs))] = np.arange(len(costs))
+        self._price_ranks = (version, ranks)
+        return ranks
+
+    def _decode_cursor(self, cursor: str, sort: str) -> int:
+        try:
+            cursor_sort, key = base64.urlsafe_b64decode(cursor.encode("utf-8")).decode("utf-8").split(":")
+            key = int(key)
+        except Exception:
+            raise ValueError("Invalid cursor")
+        if cursor_sort != (sort or ""):
+            raise ValueError("Cursor does not match sort")
+        return key
+
+    def _project(self, position: int, fields: list[str]) -> bytes:
+        item = self._item(position)
+        return json.dumps({field: item[field] for field in fields}, separators=(",", ":")).encode("utf-8")
+
+    def search_ports(self, query: str, limit: int) -> list[dict]:
+        """
+        Typeahead over origins, destinations, return ports and places visited.
+
+        Args:
+            query (str): Beginning of the name, accents and case are ignored
+            limit (int): Maximum number of names to return
+        """
+        return self.ports.search(query, min(max(limit, 1), PortTrie.TOP_K))
+
+    def _search(self, filters: dict) -> list[int]:
+        query = dict(filters)
+        if query.get('date') is not None:
+            query['date'] = datetime.strptime(query['date'], "%Y-%m-%d").date()
+
+        return self.index.search(query)
 
-        filtered_itineraries = [item.to_dict() for item in itineraries if all(f(item) for f in filters_itineraries)]
-            
-        return filtered_itineraries
-    
     def register_booking(self, destination_id: int, cabins: int) -> bool:
         """
         Register a booking by removing the specified number of cabins from the destination.
@@ -95,13 +296,7 @@ class DataManager:
             destination_id (int): ID of the destination to book
             cabins (int): Number of cabins to book
         """
-        for itinerary in self.data:
-            if itinerary.id == destination_id:
-                if itinerary.available_cabins >= cabins:
-                    itinerary.available_cabins -= cabins
-                    return True
-                return False
-        return False
+        return self.apply_inventory_changes([(destination_id, -cabins)])[0]
 
     def register_cancellation(self, destination_id: int, cabins: int) -> bool:
         """
@@ -111,8 +306,82 @@ class DataManager:
             destination_id (int): ID of the destination to cancel
             cabins (int): Number of cabins to cancel
         """
-        for itinerary in self.data:
-            if itinerary.id == destination_id:
-                itinerary.available_cabins += cabins
-                return True
-        return False
+        return self.apply_inventory_changes([(destination_id, cabins)])[0]
+
+    def apply_inventory_changes(self, changes: list[tuple[int, int]]) -> list[bool]:
+        """
+        Apply a batch of inventory changes in arrival order, writing each itinerary once.
+        The check and the update are atomic: the lock stripes of every touched
+        itinerary are held, acquired in order, for the whole batch.
+
+        Args:
+            changes (list): (destination_id, cabins delta) pairs, negative for bookings
+
+        Returns:
+            list[bool]: Whether each change was applied. A booking is refused when the
+                destination does not exist or has not enough cabins left at that point.
+        """
+        positions = [self.index.position_of(destination_id) for destination_id, _ in changes]
+        stripes = sorted({position % LOCK_STRIPES for position in positions if position is not None})
+
+        for stripe in stripes:
+            self._locks[stripe].acquire()
+        try:
+            results = []
+            totals: dict[int, int] = {}
+
+            for position, (_, delta) in zip(positions, changes):
+                if position is None:
+                    results.append(False)
+                    continue
+
+                available = totals[position] if position in totals else self.index.available_cabins(position)
+                if available + delta < 0:
+                    results.append(False)
+                    continue
+
+                totals[position] = available + delta
+                results.append(True)
+
+            for position, cabins in totals.items():
+                self._set_available_cabins(position, cabins)
+        finally:
+            for stripe in reversed(stripes):
+                self._locks[stripe].release()
+
+        return results
+
+    def _set_available_cabins(self, position: int, cabins: int) -> None:
+        self.index.set_available_cabins(position, cabins)
+        self.cache.invalidate(position)
+
+    def apply_promotion(self, itinerary_id: int, boarding_date: str, new_cost: float, ttl_seconds: int) -> bool:
+        """
+        Offer the departure of `itinerary_id` on `boarding_date` at `new_cost` per cabin,
+        for `ttl_seconds` at most and never past the boarding date.
+
+        Returns:
+            bool: Whether the promotion was applied. It is refused when the itinerary
+                does not exist, does not depart on `boarding_date` or has already left.
+
+        Raises:
+            ValueError: If the boarding date or the cost is invalid
+        """
+        boarding_date = date.fromisoformat(boarding_date)
+        new_cost = float(new_cost)
+        if not math.isfinite(new_cost) or new_cost < 0:
+            raise ValueError(f"Invalid cost: {new_cost}")
+
+        position = self.index.position_of(itinerary_id)
+        if position is None or self.index.get(position).date != boarding_date:
+            return False
+
+        expires_at = min(time.time() + ttl_seconds, datetime.combine(boarding_date, day_start.min).timestamp())
+        if not self.promotions.apply(itinerary_id, boarding_date, new_cost, expires_at):
+            return False
+        self.cache.invalidate_item(position, order="price")
+        return True
+
+    def _expire_promotions(self) -> None:
+        for itinerary_id in self.promotions.expire():
+            self.cache.invalidate_item(self.index.position_of(itinerary_id), order="price")
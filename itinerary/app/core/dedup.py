@@ -0,0 +1,31 @@
+import time
+from collections import OrderedDict
+
+
+class ProcessedMessages:
+    """
+    Bounded LRU of message keys that were already applied, used to drop
+    redeliveries. Keys are forgotten after `ttl` seconds or when more than
+    `max_size` keys are tracked.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._keys: OrderedDict[str, float] = OrderedDict()
+
+    def __contains__(self, key: str) -> bool:
+        expires_at = self._keys.get(key)
+        if expires_at is None:
+            return False
+        if expires_at < time.monotonic():
+            del self._keys[key]
+            return False
+        self._keys.move_to_end(key)
+        return True
+
+    def add(self, key: str) -> None:
+        self._keys[key] = time.monotonic() + self.ttl
+        self._keys.move_to_end(key)
+        while len(self._keys) > self.max_size:
+            self._keys.popitem(last=False)
@@ -0,0 +1,161 @@
+import unicodedata
+from collections import Counter
+from datetime import date
+from functools import lru_cache
+from app.models import Itinerary
+
+# Sort names accepted by GET /itineraries and the Itinerary field each one orders by
+SORT_FIELDS = {
+    "date": "date",
+    "price": "cabin_cost",
+    "nights": "number_of_nights",
+}
+
+@lru_cache(maxsize=4096)
+def normalize_text(text: str) -> str:
+    """Remove accents and convert to lowercase for text comparison."""
+    return unicodedata.normalize('NFKD', text.lower()).encode('ASCII', 'ignore').decode('ASCII')
+
+
+class ItineraryIndex:
+    """
+    In-memory secondary indexes over the itinerary catalog.
+
+    Postings hold positions in the catalog list, so results can be returned in
+    catalog order. `by_id` is the primary index from itinerary id to position.
+    Equality filters (origin, destination, continent, date and places visited)
+    are answered from hash indexes, and `min_cabins` from the positions grouped
+    by available cabins. `ranks` holds, per sort field, the rank of every
+    position in the catalog presorted by that field.
+
+    Inventory updates take no index-wide lock: callers serialize the updates of
+    one itinerary (see DataManager.apply_inventory_changes), and an update only
+    touches the groups of its old and new cabin counts.
+    """
+
+    def __init__(self, itineraries: list[Itinerary]):
+        self.itineraries = itineraries
+        self.by_id: dict[int, int] = {}
+        self.by_origin: dict[str, set[int]] = {}
+        self.by_destination: dict[str, set[int]] = {}
+        self.by_continent: dict[str, set[int]] = {}
+        self.by_date: dict[date, set[int]] = {}
+        self.by_place: dict[str, set[int]] = {}
+        self.by_cabins: dict[int, set[int]] = {}
+
+        for position, itinerary in enumerate(itineraries):
+            self.by_id[itinerary.id] = position
+            self.by_origin.setdefault(itinerary.origin, set()).add(position)
+            self.by_destination.setdefault(itinerary.destination, set()).add(position)
+            self.by_continent.setdefault(itinerary.trip_continent.lower(), set()).add(position)
+            self.by_date.setdefault(itinerary.date, set()).add(position)
+            for place in itinerary.places_visited:
+                self.by_place.setdefault(normalize_text(place), set()).add(position)
+            self.by_cabins.setdefault(itinerary.available_cabins, set()).add(position)
+
+        self.ranks: dict[str, list[int]] = {}
+        for sort, field in SORT_FIELDS.items():
+            order = sorted(range(len(itineraries)), key=lambda p: (getattr(itineraries[p], field), p))
+            rank = [0] * len(itineraries)
+            for r, position in enumerate(order):
+                rank[position] = r
+            self.ranks[sort] = rank
+
+    def __len__(self) -> int:
+        return len(self.itineraries)
+
+    def position_of(self, itinerary_id: int) -> int | None:
+        return self.by_id.get(itinerary_id)
+
+    def get(self, position: int) -> Itinerary:
+        return self.itineraries[position]
+
+    def available_cabins(self, position: int) -> int:
+        return self.itineraries[position].available_cabins
+
+    def set_available_cabins(self, position: int, cabins: int) -> None:
+        """Update the inventory of an itinerary and move it inside the cabins index."""
+        itinerary = self.itineraries[position]
+        old_cabins = itinerary.available_cabins
+        if cabins == old_cabins:
+            return
+
+        # Added before it is removed, so a concurrent search always finds it. Groups
+        # are never deleted, another update may be adding to an empty one
+        self.by_cabins.setdefault(cabins, set()).add(position)
+        itinerary.available_cabins = cabins
+        self.by_cabins[old_cabins].discard(position)
+
+    def names(self) -> list[tuple[str, str, int]]:
+        """(field, name, itineraries) for every port and destination name in the catalog."""
+        counts = Counter()
+        for itinerary in self.itineraries:
+            counts[("origin", itinerary.origin)] += 1
+            counts[("destination", itinerary.destination)] += 1
+            counts[("return_port", itinerary.return_port)] += 1
+            for place in set(itinerary.places_visited):
+                counts[("places_visited", place)] += 1
+        return [(field, name, count) for (field, name), count in counts.items()]
+
+    def cabin_costs(self) -> list[float]:
+        """Catalog price of every position."""
+        return [itinerary.cabin_cost for itinerary in self.itineraries]
+
+    def sort_keys(self, positions: list[int], sort: str) -> list[int]:
+        """Rank of each position in the catalog presorted by `sort`."""
+        rank = self.ranks[sort]
+        return [rank[position] for position in positions]
+
+    def _postings(self, filters: dict) -> list[set[int]]:
+        postings = []
+
+        if filters.get('origin') is not None:
+            postings.append(self.by_origin.get(filters['origin'], set()))
+
+        if filters.get('destination') is not None:
+            postings.append(self.by_destination.get(filters['destination'], set()))
+
+        if filters.get('continent') is not None:
+            postings.append(self.by_continent.get(filters['continent'].lower(), set()))
+
+        if filters.get('date') is not None:
+            postings.append(self.by_date.get(filters['date'], set()))
+
+        for place in filters.get('places_visited') or []:
+            postings.append(self.by_place.get(normalize_text(place), set()))
+
+        return postings
+
+    def search(self, filters: dict) -> list[int]:
+        """
+        Return the catalog positions matching the filters, in catalog order.
+
+        Args:
+            filters (dict): Same criteria as DataManager.filter_itineraries, with
+                `date` already parsed to a `datetime.date`.
+        """
+        postings = self._postings(filters)
+        min_cabins = filters.get('min_cabins')
+
+        if not postings:
+            if min_cabins is None:
+                return list(range(len(self.itineraries)))
+            matches = set()
+            for cabins, positions in list(self.by_cabins.items()):
+                if cabins >= min_cabins:
+                    matches.update(positions)
+            # A position being moved may still be in its old group
+            return sorted(p for p in matches if self.itineraries[p].available_cabins >= min_cabins)
+
+        # Intersect starting from the most selective posting list
+        postings.sort(key=len)
+        result = postings[0]
+        for posting in postings[1:]:
+            if not result:
+                break
+            result = result & posting
+
+        if min_cabins is not None:
+            result = {p for p in result if self.itineraries[p].available_cabins >= min_cabins}
+
+        return sorted(result)
@@ -0,0 +1,124 @@
+import heapq
+from app.core.itinerary_index import normalize_text
+
+# Fields of the catalog that feed the search, as named in the results
+SEARCH_FIELDS = ["origin", "destination", "return_port", "places_visited"]
+
+
+class TrieNode:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children: dict[str, TrieNode] = {}
+        # Best (rank, name id) pairs of the subtree, kept sorted
+        self.top: list[tuple[tuple, int]] = []
+
+
+class PortTrie:
+    """
+    Accent-folded prefix trie over port and destination names.
+
+    Every name is inserted once for the whole name and once for each following
+    word, so "jan" finds "Rio de Janeiro". Each node keeps the best TOP_K names of
+    its subtree, ranked by whole-name matches first and then by the number of
+    itineraries that mention the name, so a lookup only walks the query prefix.
+    Queries with no prefix match fall back to a walk that allows one typo.
+    """
+    TOP_K = 10
+
+    def __init__(self, names: list[tuple[str, str, int]]):
+        """
+        Args:
+            names (list): (field, name, itineraries) tuples, see SEARCH_FIELDS
+        """
+        self.root = TrieNode()
+        self.names: list[dict] = []
+
+        entries: dict[str, dict] = {}
+        for field, name, count in names:
+            key = normalize_text(name)
+            entry = entries.setdefault(key, {"name": name, "fields": set(), "itineraries": 0, "best": 0})
+            entry["fields"].add(field)
+            entry["itineraries"] += count
+            if count > entry["best"]:
+                entry["name"], entry["best"] = name, count
+
+        for key, entry in entries.items():
+            name_id = len(self.names)
+            self.names.append({
+                "name": entry["name"],
+                "fields": [field for field in SEARCH_FIELDS if field in entry["fields"]],
+                "itineraries": entry["itineraries"],
+            })
+            words = key.split()
+            for i in range(len(words)):
+                rank = (i > 0, -entry["itineraries"], key)
+                self._insert(" ".join(words[i:]), (rank, name_id))
+
+    def _insert(self, text: str, item: tuple[tuple, int]) -> None:
+        node = self.root
+        self._offer(node, item)
+        for char in text:
+            node = node.children.setdefault(char, TrieNode())
+            self._offer(node, item)
+
+    def _offer(self, node: TrieNode, item: tuple[tuple, int]) -> None:
+        # The whole name is inserted before its words, so a name's first entry is its best
+        if any(name_id == item[1] for _, name_id in node.top):
+            return
+        if len(node.top) < self.TOP_K:
+            node.top.append(item)
+            node.top.sort()
+        elif item < node.top[-1]:
+            node.top[-1] = item
+            node.top.sort()
+
+    def _find(self, prefix: str) -> TrieNode | None:
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def _fuzzy_nodes(self, prefix: str) -> list[TrieNode]:
+        """Nodes whose path is within one edit of `prefix` (bounded Levenshtein walk)."""
+        found = []
+        first_row = list(range(len(prefix) + 1))
+        stack = [(child, char, first_row) for char, child in self.root.children.items()]
+        while stack:
+            node, char, previous_row = stack.pop()
+            row = [previous_row[0] + 1]
+            for i in range(1, len(prefix) + 1):
+                row.append(min(
+                    row[i - 1] + 1,
+                    previous_row[i] + 1,
+                    previous_row[i - 1] + (prefix[i - 1] != char)
+                ))
+            if row[-1] <= 1:
+                found.append(node)
+            elif min(row) <= 1:
+                stack.extend((child, next_char, row) for next_char, child in node.children.items())
+        return found
+
+    def search(self, query: str, limit: int = TOP_K) -> list[dict]:
+        """Return up to `limit` names matching `query` as a prefix, best first."""
+        prefix = normalize_text(query).strip()
+        if not prefix:
+            return []
+
+        node = self._find(prefix)
+        if node is not None:
+            items = node.top
+        else:
+            items = heapq.merge(*(node.top for node in self._fuzzy_nodes(prefix)))
+
+        results, seen = [], set()
+        for _, name_id in items:
+            if name_id in seen:
+                continue
+            seen.add(name_id)
+            results.append(self.names[name_id])
+            if len(results) == limit:
+                break
+        return results
@@ -0,0 +1,69 @@
+import heapq
+import threading
+import time
+from datetime import date
+
+
+class PriceOverlay:
+    """
+    Promotional cabin prices laid over the catalog.
+
+    Promotions are kept by (itinerary id, boarding date) with the time they expire
+    at; a newer promotion for the same departure replaces the previous one. The
+    catalog itself is never modified, readers ask `price` for the current price of
+    an itinerary. Expired promotions are dropped lazily through a heap ordered by
+    expiry, so `expire` is O(1) when nothing is due. `version` changes whenever
+    a price does.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._prices: dict[tuple[int, date], tuple[float, float]] = {}
+        self._expiry: list[tuple[float, int, date]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._prices)
+
+    def apply(self, itinerary_id: int, boarding_date: date, new_cost: float, expires_at: float) -> bool:
+        """Set the price of a departure until `expires_at` (epoch seconds). Returns whether the overlay changed."""
+        key = (itinerary_id, boarding_date)
+        with self._lock:
+            if expires_at <= time.time() or self._prices.get(key) == (new_cost, expires_at):
+                return False
+            self._prices[key] = (new_cost, expires_at)
+            self.version += 1
+            heapq.heappush(self._expiry, (expires_at, itinerary_id, boarding_date))
+        return True
+
+    def price(self, itinerary_id: int, boarding_date: date) -> float | None:
+        entry = self._prices.get((itinerary_id, boarding_date))
+        if entry is None or entry[1] <= time.time():
+            return None
+        return entry[0]
+
+    def expire(self) -> list[int]:
+        """Drop the promotions that are over and return the ids of their itineraries."""
+        now = time.time()
+        if not self._expiry or self._expiry[0][0] > now:
+            return []
+
+        expired = []
+        with self._lock:
+            while self._expiry and self._expiry[0][0] <= now:
+                expires_at, itinerary_id, boarding_date = heapq.heappop(self._expiry)
+                key = (itinerary_id, boarding_date)
+                # Heap entries of replaced promotions are stale, only the current one counts
+                entry = self._prices.get(key)
+                if entry is not None and entry[1] == expires_at:
+                    del self._prices[key]
+                    expired.append(itinerary_id)
+            if expired:
+                self.version += 1
+        return expired
+
+    def prices(self) -> dict[tuple[int, date], float]:
+        """Current price of every departure on promotion."""
+        now = time.time()
+        with self._lock:
+            return {key: new_cost for key, (new_cost, expires_at) in self._prices.items() if expires_at > now}
@@ -4,6 +4,10 @@ import threading
 import json
 from flask import current_app
 from app.core.data_manager import DataManager
+from app.core.dedup import ProcessedMessages
+
+DEAD_LETTER_QUEUE = "itinerary_dead_letter"
+PROMOTIONS_QUEUE = "itinerary_promotions"
 
 class RabbitMQManager:
     _instance = None
@@ -11,6 +15,7 @@ class RabbitMQManager:
     _channel = None
     _consumer_thread = None
     _running = False
+    _pending = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -19,6 +24,17 @@ class RabbitMQManager:
 
     def __init__(self):
         if not self._connection:
+            self._prefetch = current_app.config['CONSUMER_PREFETCH']
+            self._batch_size = current_app.config['CONSUMER_BATCH_SIZE']
+            self._batch_timeout = current_app.config['CONSUMER_BATCH_TIMEOUT_MS'] / 1000
+            self._max_retries = current_app.config['CONSUMER_MAX_RETRIES']
+            self._promotion_ttl = current_app.config['PROMOTION_TTL_SECONDS']
+            self._retry_base_ms = current_app.config['CONSUMER_RETRY_BASE_MS']
+            self._processed = ProcessedMessages(
+                max_size=current_app.config['DEDUP_CACHE_SIZE'],
+                ttl=current_app.config['DEDUP_TTL_SECONDS']
+            )
+            self._pending = []
             self._connection = self._create_connection()
             self._channel = self._connection.channel()
             self._setup_exchanges()
@@ -40,6 +56,7 @@ class RabbitMQManager:
 
     def _setup_exchanges(self):
         self._channel.exchange_declare(exchange="direct", exchange_type="direct")
+        self._channel.exchange_declare(exchange="promotions_topic", exchange_type="topic")
         self._setup_queues()
 
     def _setup_queues(self):
@@ -61,6 +78,33 @@ class RabbitMQManager:
             routing_key=current_app.config['BOOKING_CANCELLED_ROUTING_KEY']
         )
 
+        # Retry Queues -> one per attempt, so every message in a queue has the same
+        # backoff (queue TTL) and none waits behind a longer one. Expired messages
+        # are dead-lettered straight back to the main queue (through the default
+        # exchange, so the other consumers of the routing key don't see them again)
+        for queue_name in ["booking_created", "booking_cancelled"]:
+            for attempt in range(self._max_retries):
+                self._channel.queue_declare(
+                    queue=self._retry_queue(queue_name, attempt),
+                    durable=True,
+                    arguments={
+                        "x-message-ttl": self._retry_base_ms * 2 ** attempt,
+                        "x-dead-letter-exchange": "",
+                        "x-dead-letter-routing-key": queue_name
+                    }
+                )
+
+        # Promotions Queue -> every promotion, applied to the price overlay
+        self._channel.queue_declare(queue=PROMOTIONS_QUEUE, durable=True)
+        self._channel.queue_bind(
+            exchange="promotions_topic",
+            queue=PROMOTIONS_QUEUE,
+            routing_key=str(current_app.config['MARKETING_ROUTING_KEY']) + ".#"
+        )
+
+        # Dead Letter Queue -> messages that can't be applied, kept for inspection
+        self._channel.queue_declare(queue=DEAD_LETTER_QUEUE, durable=True)
+
         print("Exchanges and queues setup complete")
 
     def _start_consumer_thread(self):
@@ -78,7 +122,10 @@ class RabbitMQManager:
                     self._channel = self._connection.channel()
                     self._setup_exchanges()
 
-                # Set up consumers for both queues
+                self._pending = []
+                self._channel.basic_qos(prefetch_count=self._prefetch)
+
+                # Set up consumers for the inventory queues and the promotions
                 self._channel.basic_consume(
                     queue="booking_created",
                     on_message_callback=self._handle_booking_created
@@ -87,48 +134,131 @@ class RabbitMQManager:
                     queue="booking_cancelled",
                     on_message_callback=self._handle_booking_cancelled
                 )
+                self._channel.basic_consume(
+                    queue=PROMOTIONS_QUEUE,
+                    on_message_callback=self._handle_promotion
+                )
 
-                self._channel.start_consuming()
+                while self._running:
+                    self._collect_batch()
+                    if self._pending:
+                        self._process_batch()
             except Exception as e:
                 print(f"Error in consumer thread: {e}")
                 if self._connection and not self._connection.is_closed:
                     self._connection.close()
 
-    def _handle_booking_created(self, ch, method, properties, body):
-        try:
-            print("Booking created received")
-            data = json.loads(body)
-            result = DataManager().register_booking(
-                destination_id=data['destination_id'],
-                cabins=data['number_of_cabins']
-            )
+    def _collect_batch(self):
+        """Dispatch deliveries until the batch is full or the batch timeout expires."""
+        deadline = time.monotonic() + self._batch_timeout
+        while len(self._pending) < self._batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._connection.process_data_events(time_limit=remaining)
+
+    def _process_batch(self):
+        """
+        Apply the collected inventory changes in one pass and ack the whole batch
+        with a single multiple ack. Redeliveries of an already applied booking are
+        skipped, and refused changes are republished for a retry before the ack.
+        """
+        batch, self._pending = self._pending, []
+
+        deliveries, keys = [], set()
+        for delivery in batch:
+            key = delivery["key"]
+            if key is not None and (key in keys or key in self._processed):
+                continue
+            if key is not None:
+                keys.add(key)
+            deliveries.append(delivery)
+
+        results = DataManager().apply_inventory_changes([delivery["change"] for delivery in deliveries])
+
+        for delivery, result in zip(deliveries, results):
             if result:
-                ch.basic_ack(delivery_tag=method.delivery_tag)
-                print("Booking created processed")
+                if delivery["key"] is not None:
+                    self._processed.add(delivery["key"])
             else:
-                ch.basic_nack(delivery_tag=method.delivery_tag)
-                print("Booking created not processed")
+                self._retry_or_dead_letter(delivery, "inventory change refused")
+
+        self._channel.basic_ack(delivery_tag=max(delivery["delivery_tag"] for delivery in batch), multiple=True)
+
+    def _retry_or_dead_letter(self, delivery: dict, reason: str):
+        headers = dict(delivery["properties"].headers or {})
+        attempts = headers.get("x-attempts", 0)
+
+        if attempts >= self._max_retries:
+            self._dead_letter(delivery["properties"], delivery["body"], reason)
+            return
+
+        headers["x-attempts"] = attempts + 1
+        self._channel.basic_publish(
+            exchange="",
+            routing_key=self._retry_queue(delivery['queue'], attempts),
+            body=delivery["body"],
+            properties=pika.BasicProperties(headers=headers, delivery_mode=2)
+        )
+
+    def _retry_queue(self, queue: str, attempt: int) -> str:
+        return f"{queue}_retry_{attempt}"
+
+    def _dead_letter(self, properties, body: bytes, reason: str):
+        print(f"Inventory message dead-lettered: {reason}")
+        headers = dict(properties.headers or {})
+        headers["x-dead-letter-reason"] = reason
+        self._channel.basic_publish(
+            exchange="",
+            routing_key=DEAD_LETTER_QUEUE,
+            body=body,
+            properties=pika.BasicProperties(headers=headers, delivery_mode=2)
+        )
+
+    def _enqueue(self, ch, method, properties, body, queue: str, sign: int):
+        try:
+            data = json.loads(body)
+            change = (data['destination_id'], sign * data['number_of_cabins'])
         except Exception as e:
-            print(f"Error handling booking created: {e}")
-            ch.basic_nack(delivery_tag=method.delivery_tag)
+            # Malformed messages will never succeed, don't requeue them
+            self._dead_letter(properties, body, f"invalid message: {e}")
+            ch.basic_ack(delivery_tag=method.delivery_tag)
+            return
+
+        booking_id = data.get('booking_id')
+        self._pending.append({
+            "delivery_tag": method.delivery_tag,
+            "queue": queue,
+            "key": f"{queue}:{booking_id}" if booking_id else None,
+            "change": change,
+            "properties": properties,
+            "body": body
+        })
+
+    def _handle_booking_created(self, ch, method, properties, body):
+        self._enqueue(ch, method, properties, body, "booking_created", -1)
 
     def _handle_booking_cancelled(self, ch, method, properties, body):
+        self._enqueue(ch, method, properties, body, "booking_cancelled", 1)
+
+    def _handle_promotion(self, ch, method, properties, body):
+        # Promotions are applied as they arrive, they are rare and only touch the overlay
         try:
-            print("Booking cancelled received")
             data = json.loads(body)
-            result = DataManager().register_cancellation(
-                destination_id=data['destination_id'],
-                cabins=data['number_of_cabins']
+            applied = DataManager().apply_promotion(
+                int(data['destination_id']),
+                data['boarding_date'],
+                data['new_cost'],
+                self._promotion_ttl
             )
-            if result:
-                ch.basic_ack(delivery_tag=method.delivery_tag)
-                print("Booking cancelled processed")
-            else:
-                ch.basic_nack(delivery_tag=method.delivery_tag)
-                print("Booking cancelled not processed")
         except Exception as e:
-            print(f"Error handling booking cancelled: {e}")
-            ch.basic_nack(delivery_tag=method.delivery_tag)
+            self._dead_letter(properties, body, f"invalid promotion: {e}")
+            ch.basic_ack(delivery_tag=method.delivery_tag)
+            return
+
+        if applied:
+            print(f"Promotion applied to itinerary {data['destination_id']}: {data['new_cost']}")
+        ch.basic_ack(delivery_tag=method.delivery_tag)
 
     @property
     def channel(self):
@@ -0,0 +1,107 @@
+import json
+import threading
+from collections import deque
+
+
+class ResponseCache:
+    """
+    Pre-encoded JSON for the itinerary catalog.
+
+    Each itinerary is serialized once into a byte fragment, and whole `/itineraries`
+    responses are cached by normalized filter key. Every change bumps `version`.
+    An inventory change (`invalidate`) can change which itineraries match a filter,
+    so it drops every cached response. A change to the content of one itinerary
+    only (`invalidate_item`, e.g. its price) drops that fragment and the responses
+    that contain it, plus those sorted on the changed field, whose order may change.
+    """
+    MAX_RESPONSES = 1024
+    # Changes remembered to check responses built while they happened
+    MAX_CHANGES = 1024
+
+    def __init__(self):
+        self.version = 0
+        self._fragments: dict[int, bytes] = {}
+        self._responses: dict[tuple, tuple[bytes, frozenset[int], str | None]] = {}
+        self._by_position: dict[int, set[tuple]] = {}
+        self._by_order: dict[str, set[tuple]] = {}
+        # (version, changed position or None for every position, changed sort field)
+        self._changes: deque[tuple[int, int | None, str | None]] = deque(maxlen=self.MAX_CHANGES)
+        self._lock = threading.Lock()
+
+    def fragment(self, position: int, build) -> bytes:
+        """Encoded item at `position`, `build(position)` gives its dict on a miss."""
+        fragment = self._fragments.get(position)
+        if fragment is None:
+            version = self.version
+            fragment = json.dumps(build(position), separators=(",", ":")).encode("utf-8")
+            with self._lock:
+                if version == self.version:
+                    self._fragments[position] = fragment
+        return fragment
+
+    def get_response(self, key: tuple) -> bytes | None:
+        entry = self._responses.get(key)
+        return entry[0] if entry is not None else None
+
+    def put_response(self, key: tuple, version: int, body: bytes, positions: list[int], order: str = None) -> None:
+        """
+        Cache `body`, built at `version` from the items at `positions` sorted on the
+        field `order` (if any), unless one of them or that field changed since.
+        """
+        positions = frozenset(positions)
+        with self._lock:
+            if version != self.version and not self._unchanged_since(version, positions, order):
+                return
+            self._drop(key)
+            if len(self._responses) >= self.MAX_RESPONSES:
+                self._drop(next(iter(self._responses)))
+            self._responses[key] = (body, positions, order)
+            for position in positions:
+                self._by_position.setdefault(position, set()).add(key)
+            if order is not None:
+                self._by_order.setdefault(order, set()).add(key)
+
+    def _unchanged_since(self, version: int, positions: frozenset[int], order: str | None) -> bool:
+        if not self._changes or self._changes[0][0] > version + 1:
+            # Older than the changes remembered
+            return False
+        return not any(
+            changed is None or changed in positions or (order is not None and changed_order == order)
+            for changed_version, changed, changed_order in self._changes
+            if changed_version > version
+        )
+
+    def _drop(self, key: tuple) -> None:
+        entry = self._responses.pop(key, None)
+        if entry is None:
+            return
+        _, positions, order = entry
+        for position in positions:
+            keys = self._by_position.get(position)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_position[position]
+        if order is not None:
+            self._by_order[order].discard(key)
+
+    def invalidate(self, position: int) -> None:
+        with self._lock:
+            self.version += 1
+            self._changes.append((self.version, None, None))
+            self._fragments.pop(position, None)
+            self._responses.clear()
+            self._by_position.clear()
+            self._by_order.clear()
+
+    def invalidate_item(self, position: int, order: str = None) -> None:
+        """Drop the item at `position` and, when `order` is given, the responses sorted on it."""
+        with self._lock:
+            self.version += 1
+            self._changes.append((self.version, position, order))
+            self._fragments.pop(position, None)
+            keys = set(self._by_position.get(position, ()))
+            if order is not None:
+                keys |= self._by_order.get(order, set())
+            for key in keys:
+                self._drop(key)
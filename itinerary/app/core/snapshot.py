@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import pickle
+import struct
+import numpy as np
+from app.models import Itinerary
+from app.core.columnar_store import ColumnarStore, StringColumn
+
+# Snapshot layout:
+#   MAGIC | header length (uint64) | pickled header | padding | column bytes...
+# Every column starts on an ALIGNMENT boundary so it can be memory-mapped in place.
+MAGIC = b"ITNSNAP1"
+ALIGNMENT = 64
+FORMAT_VERSION = 1
+
+
+def schema_hash() -> str:
+    """Hash of the Itinerary schema and of the snapshot layout, used to detect stale snapshots."""
+    schema = json.dumps(Itinerary.model_json_schema(), sort_keys=True)
+    columns = ",".join(ColumnarStore.NUMERIC_COLUMNS + ColumnarStore.STRING_COLUMNS)
+    return hashlib.sha256(f"{FORMAT_VERSION}|{columns}|{schema}".encode("utf-8")).hexdigest()
+
+
+def source_stamp(source_path: str) -> list[int]:
+    stat = os.stat(source_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_snapshot(store: ColumnarStore, path: str, source_path: str) -> None:
+    """Write the store columns to `path`, atomically replacing any previous snapshot."""
+    columns = dict(store.columns)
+    columns["available_cabins"] = store.available_cabins_column
+    for name in ColumnarStore.STRING_COLUMNS:
+        columns[f"{name}_codes"] = store.strings[name].codes
+    columns = {name: np.ascontiguousarray(column) for name, column in columns.items()}
+
+    layout = {}
+    offset = 0
+    for name, column in columns.items():
+        layout[name] = (column.dtype.str, len(column), offset)
+        offset = _aligned(offset + column.nbytes)
+
+    header = pickle.dumps({
+        "schema": schema_hash(),
+        "source": source_stamp(source_path),
+        "strings": {name: store.strings[name].values for name in ColumnarStore.STRING_COLUMNS},
+        "columns": layout,
+    })
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(MAGIC)
+        file.write(struct.pack("<Q", len(header)))
+        file.write(header)
+        for name, column in columns.items():
+            file.seek(data_start + layout[name][2])
+            file.write(column.tobytes())
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path: str, source_path: str) -> ColumnarStore | None:
+    """
+    Map the snapshot at `path` into a ColumnarStore.
+
+    Returns None when the snapshot is missing, was written for another schema or
+    is older than the JSON source, so the caller can fall back to the JSON file.
+    """
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            return None
+        (header_length,) = struct.unpack("<Q", file.read(8))
+        header = pickle.loads(file.read(header_length))
+
+    if header["schema"] != schema_hash() or header["source"] != source_stamp(source_path):
+        return None
+
+    data_start = _aligned(len(MAGIC) + 8 + header_length)
+    columns = {}
+    for name, (dtype, length, offset) in header["columns"].items():
+        if length == 0:
+            columns[name] = np.empty(0, dtype=dtype)
+            continue
+        columns[name] = np.memmap(path, dtype=dtype, mode="r", offset=data_start + offset, shape=(length,))
+
+    strings = {
+        name: StringColumn(values=values, codes=columns.pop(f"{name}_codes"))
+        for name, values in header["strings"].items()
+    }
+    return ColumnarStore(columns, strings)
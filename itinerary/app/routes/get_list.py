@@ -1,4 +1,4 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 from app.core.data_manager import DataManager
 
 itineraries_bp = Blueprint("itineraries", __name__)
@@ -16,15 +16,33 @@ def get_itineraries():
         "continent": request.args.get('continent')
     }
 
-    itineraries = data_manager.filter_itineraries(filters)
+    fields = [field for value in request.args.getlist('fields') for field in value.split(",") if field]
+
+    try:
+        itineraries = data_manager.filter_itineraries_json(
+            filters,
+            sort=request.args.get('sort'),
+            limit=request.args.get('limit', type=int),
+            cursor=request.args.get('cursor'),
+            fields=fields
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    return jsonify(itineraries)
+    return Response(itineraries, mimetype="application/json")
+
+@itineraries_bp.route("/itineraries/search", methods=["GET"])
+def search_ports():
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', 10, type=int)
+
+    return jsonify(data_manager.search_ports(query, limit))
 
 @itineraries_bp.route("/itineraries/<int:itinerary_id>", methods=["GET"])
 def get_itinerary_by_id(itinerary_id: int):
-    itinerary = data_manager.get_itinerary_by_id(itinerary_id)
+    itinerary = data_manager.get_itinerary_json(itinerary_id)
 
     if not itinerary:
         return jsonify({"error": "Itinerary not found"}), 404
     
-    return jsonify(itinerary)
\ No newline at end of file
+    return Response(itinerary, mimetype="application/json")
\ No newline at end of file
@@ -0,0 +1,177 @@
+"""
+Throughput of the batched inventory consumer (messages/s) against one that
+applies and acks every message on its own, like the consumer used to, with an
+in-process stand-in for the broker.
+
+The stand-in delivers booking_created / booking_cancelled messages up to the
+prefetch window whenever the consumer reads from the connection, and charges
+--frame-us for every frame the consumer sends (acks, retries) and --poll-us
+for every read, standing for the system calls and the broker's work. The
+batched run is the real RabbitMQManager consumer loop, both apply the messages
+to the real catalog. Run from the itinerary directory:
+
+    cd itinerary
+    python -m benchmarks.consumer --messages 50000
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+
+from app.config import Config
+from app.core.data_manager import DataManager
+from app.core.dedup import ProcessedMessages
+from app.core.rabbitmq import RabbitMQManager
+
+
+def busy_wait(microseconds: float) -> None:
+    end = time.perf_counter() + microseconds / 1e6
+    while time.perf_counter() < end:
+        pass
+
+
+class StandInBroker:
+    """Connection and channel of one consumer, with every message already queued."""
+
+    def __init__(self, messages: list[tuple[str, bytes]], frame_us: float, poll_us: float):
+        self.ready = deque(messages)
+        self.total = len(messages)
+        self.unacked: dict[int, None] = {}
+        self.acked = 0
+        self.done = threading.Event()
+        self.is_closed = False
+        self._frame_us = frame_us
+        self._poll_us = poll_us
+        self._prefetch = 0
+        self._consumers = {}
+        self._next_tag = 1
+
+    # Connection
+    def process_data_events(self, time_limit: float = 0) -> None:
+        busy_wait(self._poll_us)
+        if not self.ready:
+            time.sleep(time_limit)
+            return
+        while self.ready and (not self._prefetch or len(self.unacked) < self._prefetch):
+            queue, body = self.ready.popleft()
+            tag = self._next_tag
+            self._next_tag += 1
+            self.unacked[tag] = None
+            method = SimpleNamespace(delivery_tag=tag, redelivered=False, routing_key=queue)
+            self._consumers[queue](self, method, SimpleNamespace(headers=None), body)
+
+    def close(self) -> None:
+        self.is_closed = True
+
+    # Channel
+    def basic_qos(self, prefetch_count: int) -> None:
+        self._prefetch = prefetch_count
+
+    def basic_consume(self, queue: str, on_message_callback) -> None:
+        self._consumers[queue] = on_message_callback
+
+    def basic_ack(self, delivery_tag: int, multiple: bool = False) -> None:
+        busy_wait(self._frame_us)
+        tags = [tag for tag in self.unacked if tag <= delivery_tag] if multiple else [delivery_tag]
+        for tag in tags:
+            del self.unacked[tag]
+        self.acked += len(tags)
+        if self.acked >= self.total:
+            self.done.set()
+
+    def basic_nack(self, delivery_tag: int, requeue: bool = True) -> None:
+        self.basic_ack(delivery_tag)
+
+    def basic_publish(self, **kwargs) -> None:
+        busy_wait(self._frame_us)
+
+
+def messages(count: int, ids: list[int], seed: int) -> list[tuple[str, bytes]]:
+    rng = random.Random(seed)
+    result = []
+    for booking_id in range(count):
+        queue = "booking_created" if booking_id % 2 == 0 else "booking_cancelled"
+        body = {"booking_id": f"b{seed}-{booking_id}", "destination_id": rng.choice(ids), "number_of_cabins": 1}
+        result.append((queue, json.dumps(body).encode("utf-8")))
+    return result
+
+
+def consume_one_by_one(broker: StandInBroker) -> float:
+    """Apply and ack every message as it is delivered, without prefetch limit."""
+    def handle(ch, method, properties, body):
+        data = json.loads(body)
+        if method.routing_key == "booking_created":
+            applied = DataManager().register_booking(data['destination_id'], data['number_of_cabins'])
+        else:
+            applied = DataManager().register_cancellation(data['destination_id'], data['number_of_cabins'])
+        if applied:
+            ch.basic_ack(delivery_tag=method.delivery_tag)
+        else:
+            ch.basic_nack(delivery_tag=method.delivery_tag)
+
+    broker.basic_consume("booking_created", handle)
+    broker.basic_consume("booking_cancelled", handle)
+    start = time.perf_counter()
+    while not broker.done.is_set():
+        broker.process_data_events()
+    return time.perf_counter() - start
+
+
+def consume_batched(broker: StandInBroker, batch_size: int, prefetch: int) -> float:
+    """Run the consumer loop of RabbitMQManager until every message is acked."""
+    manager = object.__new__(RabbitMQManager)
+    manager._prefetch = prefetch
+    manager._batch_size = batch_size
+    manager._batch_timeout = Config.CONSUMER_BATCH_TIMEOUT_MS / 1000
+    manager._max_retries = Config.CONSUMER_MAX_RETRIES
+    manager._promotion_ttl = Config.PROMOTION_TTL_SECONDS
+    manager._retry_base_ms = Config.CONSUMER_RETRY_BASE_MS
+    manager._processed = ProcessedMessages(max_size=Config.DEDUP_CACHE_SIZE, ttl=Config.DEDUP_TTL_SECONDS)
+    manager._connection = broker
+    manager._channel = broker
+    manager._running = True
+
+    consumer = threading.Thread(target=manager._consume_messages)
+    consumer.daemon = True
+    start = time.perf_counter()
+    consumer.start()
+    broker.done.wait()
+    elapsed = time.perf_counter() - start
+    manager._running = False
+    consumer.join()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50_000)
+    parser.add_argument("--batch-size", type=int, default=Config.CONSUMER_BATCH_SIZE)
+    parser.add_argument("--prefetch", type=int, default=Config.CONSUMER_PREFETCH)
+    parser.add_argument("--frame-us", type=float, default=20, help="cost of a frame sent to the broker")
+    parser.add_argument("--poll-us", type=float, default=20, help="cost of a read from the connection")
+    args = parser.parse_args()
+
+    manager = DataManager()
+    if not DataManager._initialized:
+        raise SystemExit("The itinerary catalog could not be loaded")
+    ids = [manager.index.get(position).id for position in range(len(manager.index))]
+
+    print(f"{args.messages} messages, {args.frame_us}us per frame sent, {args.poll_us}us per read")
+    runs = [
+        ("one by one", consume_one_by_one),
+        (f"batches of {args.batch_size}, prefetch {args.prefetch}", lambda broker: consume_batched(broker, args.batch_size, args.prefetch)),
+    ]
+    baseline = None
+    for seed, (name, consume) in enumerate(runs):
+        broker = StandInBroker(messages(args.messages, ids, seed), args.frame_us, args.poll_us)
+        elapsed = consume(broker)
+        rate = args.messages / elapsed
+        baseline = baseline or rate
+        print(f"{name:32} {elapsed:8.3f} s {rate:10.0f} messages/s {rate / baseline:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
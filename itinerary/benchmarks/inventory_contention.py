@@ -0,0 +1,119 @@
+"""
+Stress test of concurrent inventory updates, and their throughput with the
+striped locks of DataManager against a single global lock.
+
+--threads threads book and cancel cabins of --hot itineraries at random while
+other threads search by min_cabins. Every run checks that no itinerary was
+oversold (its cabins never go below 0 and match the initial cabins minus the
+accepted bookings plus the cancellations) and that the cabins index agrees with
+the catalog. Run from the itinerary directory, with the catalog next to it:
+
+    cd itinerary
+    python -m benchmarks.inventory_contention --threads 16 --operations 20000
+"""
+import argparse
+import random
+import threading
+import time
+from collections import defaultdict
+
+from app.config import Config
+from app.core.data_manager import LOCK_STRIPES, DataManager
+
+
+def run(manager: DataManager, ids: list[int], threads: int, operations: int, readers: int) -> float:
+    booked = defaultdict(int)
+    cancelled = defaultdict(int)
+    totals_lock = threading.Lock()
+    start_line = threading.Barrier(threads + readers + 1)
+    done = threading.Event()
+
+    def writer(seed: int):
+        rng = random.Random(seed)
+        mine_booked = defaultdict(int)
+        mine_cancelled = defaultdict(int)
+        start_line.wait()
+        for _ in range(operations):
+            destination_id = rng.choice(ids)
+            cabins = rng.randint(1, 3)
+            # Mostly bookings, so itineraries run out and bookings get refused
+            if rng.random() < 0.8:
+                if manager.register_booking(destination_id, cabins):
+                    mine_booked[destination_id] += cabins
+            elif manager.register_cancellation(destination_id, cabins):
+                mine_cancelled[destination_id] += cabins
+        with totals_lock:
+            for destination_id, cabins in mine_booked.items():
+                booked[destination_id] += cabins
+            for destination_id, cabins in mine_cancelled.items():
+                cancelled[destination_id] += cabins
+
+    def reader():
+        start_line.wait()
+        while not done.is_set():
+            manager.index.search({"min_cabins": 1})
+
+    initial = {destination_id: manager.index.available_cabins(manager.index.position_of(destination_id)) for destination_id in ids}
+    workers = [threading.Thread(target=writer, args=(seed,)) for seed in range(threads)]
+    searchers = [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in workers + searchers:
+        thread.start()
+
+    start_line.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    for thread in searchers:
+        thread.join()
+
+    for destination_id in ids:
+        position = manager.index.position_of(destination_id)
+        available = manager.index.available_cabins(position)
+        expected = initial[destination_id] - booked[destination_id] + cancelled[destination_id]
+        assert available >= 0, f"itinerary {destination_id} oversold: {available} cabins"
+        assert available == expected, f"itinerary {destination_id} has {available} cabins, expected {expected}"
+        if hasattr(manager.index, "by_cabins"):
+            groups = [cabins for cabins, positions in manager.index.by_cabins.items() if position in positions]
+            assert groups == [available], f"itinerary {destination_id} is indexed under {groups} cabins, has {available}"
+
+    # Leave the catalog as it was for the next run
+    for destination_id, cabins in initial.items():
+        manager.index.set_available_cabins(manager.index.position_of(destination_id), cabins)
+
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--operations", type=int, default=20000, help="inventory changes per thread")
+    parser.add_argument("--readers", type=int, default=2, help="threads searching by min_cabins meanwhile")
+    parser.add_argument("--hot", type=int, default=64, help="itineraries booked")
+    args = parser.parse_args()
+
+    manager = DataManager()
+    if not DataManager._initialized:
+        raise SystemExit("The itinerary catalog could not be loaded")
+    ids = [manager.index.get(position).id for position in range(min(args.hot, len(manager.index)))]
+
+    striped = list(DataManager._locks)
+    global_lock = threading.Lock()
+    changes = args.threads * args.operations
+    print(f"{args.threads} threads x {args.operations} changes on {len(ids)} itineraries, "
+          f"{args.readers} searching, {Config.ITINERARY_STORAGE} storage")
+
+    results = []
+    for name, locks in [(f"{LOCK_STRIPES} lock stripes", striped), ("one global lock", [global_lock] * LOCK_STRIPES)]:
+        DataManager._locks = locks
+        elapsed = run(manager, ids, args.threads, args.operations, args.readers)
+        results.append((name, elapsed))
+        print(f"{name:20} {elapsed:8.3f} s {changes / elapsed:10.0f} changes/s  no oversell")
+    DataManager._locks = striped
+
+    print(f"striped / global: {results[1][1] / results[0][1]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
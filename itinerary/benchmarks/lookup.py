@@ -0,0 +1,86 @@
+"""
+Latency of looking up an itinerary and of changing its inventory by id, from
+100 to 1M itineraries.
+
+The catalog is the real one repeated with new ids up to each size. For every
+size it times DataManager.get_itinerary_by_id and a booking followed by its
+cancellation on random ids, and, for contrast, the linear scan over the catalog
+the lookups used to do (up to --scan-limit itineraries). Run from the itinerary
+directory:
+
+    cd itinerary
+    python -m benchmarks.lookup
+    ITINERARY_STORAGE=columnar python -m benchmarks.lookup
+"""
+import argparse
+import json
+import random
+import time
+from datetime import date
+
+from app.config import Config
+from app.core.columnar_store import ColumnarStore
+from app.core.data_manager import ITINERARY_FILE, DataManager
+from app.core.itinerary_index import ItineraryIndex
+from app.core.price_overlay import PriceOverlay
+from app.core.response_cache import ResponseCache
+from app.models import Itinerary
+
+
+def catalog(records: list[dict], size: int) -> list[dict]:
+    return [{**records[i % len(records)], "id": i + 1} for i in range(size)]
+
+
+def manager_for(records: list[dict]) -> DataManager:
+    """A DataManager over `records`, built without the singleton."""
+    manager = object.__new__(DataManager)
+    if Config.ITINERARY_STORAGE == "columnar":
+        manager.index = ColumnarStore.from_records(records)
+    else:
+        # Records come from the validated catalog, skip validating them again
+        manager.data = [Itinerary.model_construct(**{**record, "date": date.fromisoformat(record["date"])}) for record in records]
+        manager.index = ItineraryIndex(manager.data)
+    manager.cache = ResponseCache()
+    manager.promotions = PriceOverlay()
+    return manager
+
+
+def per_call_us(function, ids: list[int]) -> float:
+    start = time.perf_counter()
+    for itinerary_id in ids:
+        function(itinerary_id)
+    return (time.perf_counter() - start) / len(ids) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--lookups", type=int, default=20_000, help="random ids looked up per size")
+    parser.add_argument("--scan-limit", type=int, default=100_000, help="largest catalog the linear scan is timed on")
+    args = parser.parse_args()
+
+    with open(ITINERARY_FILE, "r", encoding="utf-8") as file:
+        records = json.load(file)
+
+    print(f"{Config.ITINERARY_STORAGE} storage, {args.lookups} random ids per size, times per call")
+    print(f"{'itineraries':>12} {'get by id':>12} {'book+cancel':>12} {'linear scan':>12}")
+    for size in args.sizes:
+        manager = manager_for(catalog(records, size))
+        rng = random.Random(size)
+        ids = [rng.randint(1, size) for _ in range(args.lookups)]
+
+        lookup = per_call_us(manager.get_itinerary_by_id, ids)
+        update = per_call_us(lambda i: (manager.register_booking(i, 1), manager.register_cancellation(i, 1)), ids)
+
+        scan = "-"
+        if size <= args.scan_limit:
+            items = [manager.index.get(position) for position in range(len(manager.index))]
+            scan_ids = ids[:max(10, args.lookups * 1000 // size)]
+            scan = f"{per_call_us(lambda i: next(item for item in items if item.id == i), scan_ids):10.1f}us"
+
+        print(f"{size:>12} {lookup:10.1f}us {update:10.1f}us {scan:>12}")
+        del manager
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Startup time of the itinerary catalog: loading the binary snapshot against
+parsing and validating the JSON file.
+
+For each size the real catalog is repeated with new ids and written as JSON to
+a temporary directory. The JSON path (json.load and a pydantic validation of
+every record, what a boot without an up to date snapshot does) and the
+snapshot path are then timed, up to the catalog being loaded and up to the
+store of ITINERARY_STORAGE being ready to serve. Run from the itinerary
+directory:
+
+    cd itinerary
+    python -m benchmarks.startup
+    ITINERARY_STORAGE=columnar python -m benchmarks.startup
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from app.config import Config
+from app.core.columnar_store import ColumnarStore
+from app.core.data_manager import ITINERARY_FILE
+from app.core.itinerary_index import ItineraryIndex
+from app.core.snapshot import load_snapshot, write_snapshot
+
+
+def ready(store: ColumnarStore):
+    """What DataManager serves from once the catalog is loaded."""
+    if Config.ITINERARY_STORAGE == "columnar":
+        return store
+    return ItineraryIndex([store.get(position) for position in range(len(store))])
+
+
+def timed(function) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    with open(ITINERARY_FILE, "r", encoding="utf-8") as file:
+        records = json.load(file)
+
+    print(f"{Config.ITINERARY_STORAGE} storage, times to loaded / ready")
+    print(f"{'itineraries':>12} {'JSON':>20} {'snapshot':>20} {'speedup':>16}")
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "itineraries.json")
+        snapshot = os.path.join(directory, "itineraries.snapshot")
+        for size in args.sizes:
+            with open(source, "w", encoding="utf-8") as file:
+                json.dump([{**records[i % len(records)], "id": i + 1} for i in range(size)], file)
+
+            def from_json():
+                with open(source, "r", encoding="utf-8") as file:
+                    return ColumnarStore.from_records(json.load(file))
+
+            json_loaded, store = timed(from_json)
+            json_ready = json_loaded + timed(lambda: ready(store))[0]
+            write_snapshot(store, snapshot, source)
+            del store
+
+            snapshot_loaded, store = timed(lambda: load_snapshot(snapshot, source))
+            if store is None:
+                raise SystemExit("The snapshot was not accepted")
+            snapshot_ready = snapshot_loaded + timed(lambda: ready(store))[0]
+            del store
+
+            print(f"{size:>12} {json_loaded:8.3f}s /{json_ready:7.3f}s {snapshot_loaded:8.3f}s /{snapshot_ready:7.3f}s "
+                  f"{json_loaded / snapshot_loaded:6.0f}x /{json_ready / snapshot_ready:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
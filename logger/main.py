@@ -25,7 +25,14 @@ if not all([RABBITMQ_USER, RABBITMQ_PASS, RABBITMQ_HOST, RABBITMQ_PORT, LOGS_ROU
 
 def callback(ch, method, properties, body):
     data = body.decode("utf-8")
-    sender = properties.headers.get("sender", "unknown")
+    headers = properties.headers or {}
+    sender = headers.get("sender", "unknown")
+
+    # Batched messages carry a JSON list of log lines
+    if headers.get("batch"):
+        for line in json.loads(data):
+            print(f"[{sender}]: {line}")
+        return
 
     print(f"[{sender}]: {data}")
 
@@ -15,6 +15,17 @@ class Config:
 
     MARKETING_API_PORT = os.getenv("MARKETING_API_PORT")
 
+    # Log shipping: lines per message, max delay, buffered lines and what to drop
+    # when the buffer is full ("drop_oldest" or "drop_newest")
+    LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "50"))
+    LOG_FLUSH_INTERVAL_MS = int(os.getenv("LOG_FLUSH_INTERVAL_MS", "200"))
+    LOG_BUFFER_SIZE = int(os.getenv("LOG_BUFFER_SIZE", "10000"))
+    LOG_OVERFLOW_POLICY = os.getenv("LOG_OVERFLOW_POLICY", "drop_oldest")
+
+    # Bulk promotions: promotions published per transaction, and most per request
+    PROMOTIONS_BULK_BATCH_SIZE = int(os.getenv("PROMOTIONS_BULK_BATCH_SIZE", "500"))
+    PROMOTIONS_BULK_MAX_ITEMS = int(os.getenv("PROMOTIONS_BULK_MAX_ITEMS", "100000"))
+
     @classmethod
     def validate(cls):
         required_vars = [
@@ -0,0 +1,69 @@
+import pika
+
+
+class BatchPublisher:
+    """
+    Publishes messages in batches on its own connection.
+
+    Each batch is committed in one AMQP transaction: once `publish_batch` returns
+    without error the broker has accepted every message of the batch, at the cost
+    of one round trip per batch instead of one per message. A failed batch is
+    rolled back by the broker and retried on a new connection, so it is either
+    published as a whole or not at all.
+    """
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, create_connection, setup, exchange: str):
+        self._create_connection = create_connection
+        self._setup = setup
+        self._exchange = exchange
+        self._connection = None
+        self._channel = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _connect(self):
+        if self._connection and self._connection.is_open and self._channel and self._channel.is_open:
+            return
+        self._connection = self._create_connection()
+        self._channel = self._connection.channel()
+        self._setup(self._channel)
+        self._channel.tx_select()
+
+    def close(self):
+        try:
+            if self._connection and self._connection.is_open:
+                self._connection.close()
+        except Exception:
+            pass
+        self._connection = None
+        self._channel = None
+
+    def publish_batch(self, messages: list[tuple[str, bytes]], headers: dict) -> None:
+        """
+        Publish (routing key, body) pairs in one transaction.
+
+        Raises:
+            Exception: The error of the last attempt when the batch could not be published
+        """
+        for attempt in range(self.MAX_ATTEMPTS):
+            try:
+                self._connect()
+                for routing_key, body in messages:
+                    self._channel.basic_publish(
+                        exchange=self._exchange,
+                        routing_key=routing_key,
+                        body=body,
+                        properties=pika.BasicProperties(headers=headers)
+                    )
+                self._channel.tx_commit()
+                return
+            except Exception as e:
+                print(f"Error publishing batch of {len(messages)} messages (attempt {attempt + 1}): {e}")
+                self.close()
+                if attempt == self.MAX_ATTEMPTS - 1:
+                    raise
@@ -0,0 +1,168 @@
+import codecs
+import json
+import re
+
+CHUNK_SIZE = 64 * 1024
+# Largest array element accepted, so a malformed body can't make us buffer all of it
+MAX_ITEM_SIZE = 1024 * 1024
+WHITESPACE = " \t\r\n"
+
+# Characters that matter to find where an element ends, outside and inside strings
+STRUCTURE = re.compile(r'[][{}",]')
+STRING_END = re.compile(r'["\\]')
+SEPARATOR = re.compile(r'[ \t\r\n]*[,\]]')
+
+
+class InvalidItem(ValueError):
+    """An item that could not be decoded, the items after it are still read."""
+
+
+def iter_ndjson(stream):
+    """
+    Values of a newline delimited JSON stream, one per non-empty line. A line that
+    is not valid JSON gives an InvalidItem in its place.
+    """
+    for number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield InvalidItem(f"Invalid JSON on line {number}: {e}")
+
+
+def _scan(buffer: str, i: int, depth: int, in_string: bool) -> tuple[int | None, int, int, bool]:
+    """
+    Look for the end of the array element being scanned, from `i` with the given
+    nesting `depth` and string state. Returns (end, i, depth, in_string): `end` is
+    None when the buffer ends first, and the rest is where to resume scanning.
+    """
+    while True:
+        if in_string:
+            match = STRING_END.search(buffer, i)
+            if match is None:
+                return None, len(buffer), depth, True
+            if match.group() == "\\":
+                if match.end() >= len(buffer):
+                    # The escaped character is in the next chunk
+                    return None, match.start(), depth, True
+                i = match.end() + 1
+                continue
+            in_string = False
+            i = match.end()
+            if depth == 0:
+                return i, i, depth, False
+            continue
+
+        match = STRUCTURE.search(buffer, i)
+        if match is None:
+            return None, len(buffer), depth, False
+        char = match.group()
+        if char == '"':
+            in_string = True
+            i = match.end()
+        elif char in "[{":
+            depth += 1
+            i = match.end()
+        elif depth == 0:
+            # A "," or closing bracket ends a scalar element
+            return match.start(), match.start(), depth, False
+        elif char == ",":
+            i = match.end()
+        else:
+            depth -= 1
+            i = match.end()
+            if depth == 0:
+                return i, i, depth, False
+
+
+def iter_json_array(stream):
+    """
+    Elements of a JSON array, decoded one at a time while `stream` is read, so the
+    whole array is never held in memory. An element that does not decode from what
+    has been read so far is delimited first, so more is read only when the element
+    is incomplete and a malformed one fails as soon as it has been read.
+
+    Raises:
+        ValueError: If the stream is not a JSON array or an element is invalid or
+            larger than MAX_ITEM_SIZE. Elements before the error have already been yielded.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0
+    eof = False
+
+    def read() -> bool:
+        nonlocal buffer, position, eof
+        if eof:
+            return False
+        chunk = stream.read(CHUNK_SIZE)
+        eof = not chunk
+        buffer = buffer[position:] + utf8.decode(chunk, final=eof)
+        position = 0
+        return True
+
+    def peek() -> str:
+        """Next non-whitespace character, "" at the end of the stream."""
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in WHITESPACE:
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            if not read():
+                return ""
+
+    if peek() != "[":
+        raise ValueError("Expected a JSON array")
+    position += 1
+
+    def delimit() -> int:
+        """End of the element at `position`, reading until it is complete."""
+        scan, depth, in_string = position, 0, False
+        while True:
+            end, scan, depth, in_string = _scan(buffer, scan, depth, in_string)
+            if end is not None:
+                return end
+            if len(buffer) - position > MAX_ITEM_SIZE:
+                raise ValueError(f"Item {index} is larger than {MAX_ITEM_SIZE} bytes")
+            start = position
+            if not read():
+                raise ValueError(f"Invalid JSON in item {index}: unexpected end of data")
+            # read() dropped what was before the element
+            scan -= start
+
+    if peek() == "]":
+        position += 1
+    else:
+        index = 0
+        while True:
+            peek()
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                end = None
+            # Unless a separator follows, the element may continue in the next chunk
+            # (a number cut short decodes too) or be malformed: delimit it to know
+            # which, then decode it once
+            if end is None or not SEPARATOR.match(buffer, end):
+                end = delimit()
+                try:
+                    value = json.loads(buffer[position:end])
+                except ValueError as e:
+                    raise ValueError(f"Invalid JSON in item {index}: {e}")
+            position = end
+            yield value
+            index += 1
+
+            separator = peek()
+            position += 1
+            if separator == "]":
+                break
+            if separator != ",":
+                raise ValueError(f"Expected ',' or ']' after item {index - 1}")
+
+    if peek() != "":
+        raise ValueError("Unexpected data after the JSON array")
@@ -1,11 +1,15 @@
 import time
 import pika
 from flask import current_app
+from common.log_sink import LogSink
+from app.core.batch_publisher import BatchPublisher
 
 class RabbitMQManager:
     _instance = None
+    _parameters = None
     _connection = None
     _channel = None
+    _log_sink = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -14,26 +18,37 @@ class RabbitMQManager:
 
     def __init__(self):
         if not self._connection:
+            # Read once: the log sink thread and other threads have no app context
+            self._parameters = pika.ConnectionParameters(
+                host=current_app.config['RABBITMQ_HOST'],
+                port=int(current_app.config['RABBITMQ_PORT']),
+                credentials=pika.PlainCredentials(
+                    current_app.config['RABBITMQ_USER'],
+                    current_app.config['RABBITMQ_PASS']
+                ),
+                heartbeat=3600
+            )
             self._connection = self._create_connection()
             self._channel = self._connection.channel()
             self._setup_exchanges()
+            self._log_sink = LogSink(
+                create_connection=self._create_connection,
+                sender="promotions",
+                routing_key=current_app.config['LOGS_ROUTING_KEY'],
+                batch_size=current_app.config['LOG_BATCH_SIZE'],
+                flush_interval_ms=current_app.config['LOG_FLUSH_INTERVAL_MS'],
+                capacity=current_app.config['LOG_BUFFER_SIZE'],
+                overflow_policy=current_app.config['LOG_OVERFLOW_POLICY']
+            )
 
     def _create_connection(self):
-        credentials = pika.PlainCredentials(
-            current_app.config['RABBITMQ_USER'],
-            current_app.config['RABBITMQ_PASS']
-        )
-        return pika.BlockingConnection(
-            pika.ConnectionParameters(
-                host=current_app.config['RABBITMQ_HOST'],
-                port=int(current_app.config['RABBITMQ_PORT']),
-                credentials=credentials,
-                heartbeat=3600
-            )
-        )
+        return pika.BlockingConnection(self._parameters)
 
     def _setup_exchanges(self):
-        self._channel.exchange_declare(exchange="promotions_topic", exchange_type="topic")
+        self._declare_exchanges(self._channel)
+
+    def _declare_exchanges(self, channel):
+        channel.exchange_declare(exchange="promotions_topic", exchange_type="topic")
 
     @property
     def channel(self):
@@ -57,3 +72,13 @@ class RabbitMQManager:
             properties=pika.BasicProperties(headers=headers or {})
         )
 
+    def promotion_publisher(self) -> BatchPublisher:
+        """Publisher of promotions in batches, on a connection of its own (close it when done)."""
+        return BatchPublisher(
+            create_connection=self._create_connection,
+            setup=self._declare_exchanges,
+            exchange="promotions_topic"
+        )
+
+    def publish_log(self, message: str):
+        self._log_sink.log(message)
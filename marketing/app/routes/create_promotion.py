@@ -1,52 +1,166 @@
 from flask import Blueprint, jsonify, request, current_app
 import time
 import json
+import math
+from datetime import date
 from uuid import uuid4
 from app.core.rabbitmq import RabbitMQManager
+from app.core.json_stream import InvalidItem, iter_json_array, iter_ndjson
 
 promotions_bp = Blueprint("promotions", __name__)
 
-@promotions_bp.route("/promotion", methods=["POST"])
-def create_promotion():
-    print('called /promotion')
-    data = request.json
-    
+NDJSON_TYPES = ["application/x-ndjson", "application/ndjson", "application/jsonl"]
+
+def build_promotion(data) -> dict:
+    """
+    Validate a promotion request and build the promotion to publish.
+
+    Raises:
+        ValueError: If a field is missing or invalid
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Promotion must be a JSON object")
+
     required_fields = [
-        "destination_id", 
-        "new_cost", 
+        "destination_id",
+        "new_cost",
         "boarding_date"
     ]
     for field in required_fields:
-        if not data.get(field):
-            return jsonify({
-                "error": f"Missing required field: {field}"
-            }), 400
-    
-    promotion = {
+        if data.get(field) in (None, ""):
+            raise ValueError(f"Missing required field: {field}")
+
+    try:
+        destination_id = int(data["destination_id"])
+    except (TypeError, ValueError):
+        raise ValueError("Invalid destination_id")
+
+    try:
+        boarding_date = date.fromisoformat(data["boarding_date"]).isoformat()
+    except (TypeError, ValueError):
+        raise ValueError("Invalid boarding_date, expected YYYY-MM-DD")
+
+    new_cost = data["new_cost"]
+    if isinstance(new_cost, bool) or not isinstance(new_cost, (int, float)) or not math.isfinite(new_cost) or new_cost < 0:
+        raise ValueError("Invalid new_cost, expected a non-negative number")
+
+    return {
         "id": str(uuid4()),
-        "destination_id": int(data["destination_id"]),
-        "boarding_date": data["boarding_date"],
+        "destination_id": destination_id,
+        "boarding_date": boarding_date,
         "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
-        "new_cost": data["new_cost"]
+        "new_cost": new_cost
     }
 
-    rabbitmq_manager = RabbitMQManager()
-    rabbitmq_manager.publish_promotion(
-        routing_key=current_app.config['LOGS_ROUTING_KEY'], 
-        message=f"Creating promotion to destination {data["destination_id"]}", 
-        headers={"sender": "promotions"}
-    )
+def promotion_routing_key(promotion: dict) -> str:
+    return str(current_app.config['MARKETING_ROUTING_KEY']) + f".{promotion["destination_id"]}"
+
+@promotions_bp.route("/promotion", methods=["POST"])
+def create_promotion():
+    print('called /promotion')
+    data = request.json
 
-    routing_key = str(current_app.config['MARKETING_ROUTING_KEY']) + f".{data["destination_id"]}"
+    try:
+        promotion = build_promotion(data)
+    except ValueError as e:
+        return jsonify({
+            "error": str(e)
+        }), 400
+
+    rabbitmq_manager = RabbitMQManager()
+    rabbitmq_manager.publish_log(f"Creating promotion to destination {promotion["destination_id"]}")
 
     rabbitmq_manager.publish_promotion(
-        routing_key= routing_key,
-        message=json.dumps(promotion), 
+        routing_key=promotion_routing_key(promotion),
+        message=json.dumps(promotion),
         headers={"sender": "promotions"}
     )
-    
+
     return jsonify({
         "status": "success",
         "message": "Promotion created successfully",
         "promotion": promotion
     }), 201
+
+@promotions_bp.route("/promotions/bulk", methods=["POST"])
+def create_promotions_bulk():
+    """
+    Create many promotions in one call. The body is either a JSON array of
+    promotions or NDJSON (one promotion per line, with an NDJSON content type).
+
+    Promotions are validated while the body is read and the valid ones are
+    published in transactions of PROMOTIONS_BULK_BATCH_SIZE. The response has one
+    result per item, in order: "published" (with the promotion id), "invalid" or
+    "failed" (with the error). It is 201 when every item was published, else 207.
+    """
+    print('called /promotions/bulk')
+    batch_size = current_app.config['PROMOTIONS_BULK_BATCH_SIZE']
+    max_items = current_app.config['PROMOTIONS_BULK_MAX_ITEMS']
+
+    if request.mimetype in NDJSON_TYPES:
+        items = iter_ndjson(request.stream)
+    else:
+        items = iter_json_array(request.stream)
+
+    rabbitmq_manager = RabbitMQManager()
+    results = []
+    counts = {"published": 0, "invalid": 0, "failed": 0}
+    batch = []
+    error = None
+
+    def publish(publisher):
+        try:
+            publisher.publish_batch(
+                [(promotion_routing_key(promotion), json.dumps(promotion).encode("utf-8")) for _, promotion in batch],
+                {"sender": "promotions"}
+            )
+            for result, promotion in batch:
+                result.update({"status": "published", "id": promotion["id"]})
+            counts["published"] += len(batch)
+        except Exception as e:
+            for result, _ in batch:
+                result.update({"status": "failed", "error": f"Could not publish: {e}"})
+            counts["failed"] += len(batch)
+        batch.clear()
+
+    with rabbitmq_manager.promotion_publisher() as publisher:
+        try:
+            for index, data in enumerate(items):
+                if index >= max_items:
+                    error = f"Too many promotions, at most {max_items} per request"
+                    break
+
+                result = {"index": index}
+                results.append(result)
+                try:
+                    if isinstance(data, InvalidItem):
+                        raise data
+                    promotion = build_promotion(data)
+                except ValueError as e:
+                    result.update({"status": "invalid", "error": str(e)})
+                    counts["invalid"] += 1
+                    continue
+
+                batch.append((result, promotion))
+                if len(batch) >= batch_size:
+                    publish(publisher)
+        except ValueError as e:
+            # The body itself is malformed, the items read so far are kept
+            error = str(e)
+
+        if batch:
+            publish(publisher)
+
+    rabbitmq_manager.publish_log(f"Created {counts["published"]} promotions in bulk")
+
+    response = {
+        "status": "success" if counts["published"] == len(results) and not error else "partial",
+        **counts,
+        "results": results
+    }
+    if error:
+        response["error"] = error
+        if not results:
+            response["status"] = "error"
+            return jsonify(response), 400
+    return jsonify(response), 201 if response["status"] == "success" else 207
@@ -0,0 +1,80 @@
+"""
+Throughput of POST /promotions/bulk against one POST /promotion per promotion.
+
+Runs against a marketing service started with its broker (docker compose up):
+
+    cd marketing
+    python -m benchmarks.bulk_promotions --count 2000
+
+The promotions are really published, to --destination-id (0 by default, which no
+itinerary has), so subscribers and the catalog are left alone.
+"""
+import argparse
+import json
+import os
+import time
+
+import requests
+
+
+def promotions(count: int, destination_id: int, boarding_date: str) -> list[dict]:
+    return [
+        {"destination_id": destination_id, "boarding_date": boarding_date, "new_cost": 100 + i % 50}
+        for i in range(count)
+    ]
+
+
+def single(session: requests.Session, url: str, items: list[dict]) -> float:
+    start = time.perf_counter()
+    for item in items:
+        response = session.post(f"{url}/promotion", json=item)
+        response.raise_for_status()
+    return time.perf_counter() - start
+
+
+def bulk(session: requests.Session, url: str, items: list[dict], ndjson: bool) -> float:
+    if ndjson:
+        body = "\n".join(json.dumps(item) for item in items).encode("utf-8")
+        content_type = "application/x-ndjson"
+    else:
+        body = json.dumps(items).encode("utf-8")
+        content_type = "application/json"
+
+    start = time.perf_counter()
+    response = session.post(f"{url}/promotions/bulk", data=body, headers={"Content-Type": content_type})
+    elapsed = time.perf_counter() - start
+    result = response.json()
+    if response.status_code != 201:
+        raise RuntimeError(f"Bulk request returned {response.status_code}: {result.get('error')}, {result.get('failed')} failed")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=f"http://localhost:{os.getenv('MARKETING_API_PORT', '1235')}")
+    parser.add_argument("--count", type=int, default=2000, help="promotions per run")
+    parser.add_argument("--destination-id", type=int, default=0)
+    parser.add_argument("--boarding-date", default="2030-01-01")
+    args = parser.parse_args()
+
+    items = promotions(args.count, args.destination_id, args.boarding_date)
+    session = requests.Session()
+
+    # Warm up the connections of both sides
+    single(session, args.url, items[:10])
+    bulk(session, args.url, items[:10], ndjson=False)
+
+    runs = [
+        ("POST /promotion", single(session, args.url, items)),
+        ("POST /promotions/bulk (JSON)", bulk(session, args.url, items, ndjson=False)),
+        ("POST /promotions/bulk (NDJSON)", bulk(session, args.url, items, ndjson=True)),
+    ]
+
+    baseline = runs[0][1]
+    print(f"{args.count} promotions to {args.url}")
+    for name, elapsed in runs:
+        print(f"{name:32} {elapsed:8.3f} s {args.count / elapsed:10.0f} promotions/s {baseline / elapsed:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,11 +12,19 @@ class Config:
     # Routing Keys
     PAYMENT_ACCEPTED_ROUTING_KEY = os.getenv("PAYMENT_ACCEPTED_ROUTING_KEY")
     PAYMENT_REJECTED_ROUTING_KEY = os.getenv("PAYMENT_REJECTED_ROUTING_KEY")
+    BOOKING_CREATED_ROUTING_KEY = os.getenv("BOOKING_CREATED_ROUTING_KEY")
+    PAYMENT_LINK_CREATED_ROUTING_KEY = os.getenv("PAYMENT_LINK_CREATED_ROUTING_KEY", "payment_link_created")
     
     # API port
     PAYMENT_MS_PORT = os.getenv("PAYMENT_MS_PORT")
     PAYMENT_API_PORT = os.getenv("PAYMENT_API_PORT")
 
+    # Threads creating payment links from booking_created events, each with its own connection
+    PAYMENT_LINK_WORKERS = int(os.getenv("PAYMENT_LINK_WORKERS", "4"))
+
+    # Number of booking shards: events about a booking go to its shard's routing key
+    BOOKING_SHARD_COUNT = int(os.getenv("BOOKING_SHARD_COUNT", "1"))
+
     @classmethod
     def validate(cls):
         required_vars = [
@@ -26,6 +34,7 @@ class Config:
             cls.RABBITMQ_PORT,
             cls.PAYMENT_ACCEPTED_ROUTING_KEY,
             cls.PAYMENT_REJECTED_ROUTING_KEY,
+            cls.BOOKING_CREATED_ROUTING_KEY,
             cls.PAYMENT_MS_PORT,
             cls.PAYMENT_API_PORT
         ]
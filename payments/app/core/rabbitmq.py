@@ -1,11 +1,26 @@
+import json
 import time
+import threading
 import pika
 from flask import current_app
+from app.services.payment_manager import PaymentManager
+from common.shard_ring import HashRing
+
+# Fields of a booking_created message needed to create its payment
+BOOKING_CREATED_FIELDS = [
+    "booking_id",
+    "amount",
+    "customer_email",
+    "customer_name",
+    "number_of_passengers",
+    "number_of_cabins"
+]
 
 class RabbitMQManager:
     _instance = None
     _connection = None
     _channel = None
+    _ring = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -17,6 +32,8 @@ class RabbitMQManager:
             self._connection = self._create_connection()
             self._channel = self._connection.channel()
             self._setup_exchanges()
+            self._ring = HashRing(current_app.config["BOOKING_SHARD_COUNT"])
+            self._start_payment_link_workers()
 
     def _create_connection(self):
         credentials = pika.PlainCredentials(
@@ -35,6 +52,72 @@ class RabbitMQManager:
     def _setup_exchanges(self):
         self._channel.exchange_declare(exchange="direct", exchange_type="direct")
 
+    def _start_payment_link_workers(self):
+        """
+        Create payment links from booking_created events, so bookings do not wait
+        for the payments API. Each worker has its own connection and handles one
+        event at a time, acknowledging it once the result is published.
+        """
+        app = current_app._get_current_object()
+        for _ in range(current_app.config["PAYMENT_LINK_WORKERS"]):
+            worker = threading.Thread(target=self._consume_booking_created, args=(app,))
+            worker.daemon = True
+            worker.start()
+
+    def _consume_booking_created(self, app):
+        with app.app_context():
+            while True:
+                connection = None
+                try:
+                    connection = self._create_connection()
+                    channel = connection.channel()
+                    channel.exchange_declare(exchange="direct", exchange_type="direct")
+
+                    queue_name = "booking_created_payments"
+                    channel.queue_declare(queue=queue_name, durable=True)
+                    channel.queue_bind(exchange="direct", queue=queue_name, routing_key=current_app.config["BOOKING_CREATED_ROUTING_KEY"])
+                    channel.basic_qos(prefetch_count=1)
+                    channel.basic_consume(queue=queue_name, on_message_callback=self._handle_booking_created)
+                    channel.start_consuming()
+                except Exception as e:
+                    print(f"Error in payment link worker: {e}")
+                    if connection and connection.is_open:
+                        connection.close()
+                    time.sleep(5)
+
+    def _handle_booking_created(self, ch, method, properties, body):
+        try:
+            data = json.loads(body.decode("utf-8"))
+            if not data.get("create_payment_link"):
+                ch.basic_ack(delivery_tag=method.delivery_tag)
+                return
+            booking = {field: data[field] for field in BOOKING_CREATED_FIELDS}
+        except Exception as e:
+            # A malformed message would fail on every redelivery, drop it
+            print(f"Rejecting malformed booking_created message: {e}")
+            ch.basic_reject(delivery_tag=method.delivery_tag, requeue=False)
+            return
+
+        result = {"booking_id": booking["booking_id"]}
+        try:
+            payment = PaymentManager().create_payment(**booking)
+            result["payment_link"] = payment.payment_link
+            result["payment_id"] = payment.id
+        except Exception as e:
+            print(e)
+            result["error"] = str(e)
+
+        ch.basic_publish(
+            exchange="direct",
+            routing_key=self._ring.routing_key(current_app.config["PAYMENT_LINK_CREATED_ROUTING_KEY"], data["booking_id"]),
+            body=json.dumps(result).encode("utf-8"),
+            properties=pika.BasicProperties(
+                headers={"sender": "payments"},
+                delivery_mode=2
+            )
+        )
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+
     @property
     def channel(self):
         while True:
@@ -50,10 +133,10 @@ class RabbitMQManager:
         return self._channel
 
 
-    def publish_payment_approved(self, message: str):
+    def publish_payment_approved(self, message: str, booking_id: str):
         self.channel.basic_publish(
             exchange="direct",
-            routing_key=current_app.config["PAYMENT_ACCEPTED_ROUTING_KEY"],
+            routing_key=self._ring.routing_key(current_app.config["PAYMENT_ACCEPTED_ROUTING_KEY"], booking_id),
             body=message.encode("utf-8"),
             properties=pika.BasicProperties(
                 headers={"sender": "payments"},
@@ -61,10 +144,10 @@ class RabbitMQManager:
             )
         )
 
-    def publish_payment_rejected(self, message: str):
+    def publish_payment_rejected(self, message: str, booking_id: str):
         self.channel.basic_publish(
             exchange="direct",
-            routing_key=current_app.config["PAYMENT_REJECTED_ROUTING_KEY"],
+            routing_key=self._ring.routing_key(current_app.config["PAYMENT_REJECTED_ROUTING_KEY"], booking_id),
             body=message.encode("utf-8"),
             properties=pika.BasicProperties(
                 headers={"sender": "payments"},
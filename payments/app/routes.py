@@ -51,9 +51,9 @@ def update_payment():
     print(transaction_data)
 
     if payment_status == PaymentStatus.AUTHORIZED:
-        rabbitmq_manager.publish_payment_approved(json.dumps(message_payload))
+        rabbitmq_manager.publish_payment_approved(json.dumps(message_payload), payment.booking_id)
     elif payment_status == PaymentStatus.DECLINED:
-        rabbitmq_manager.publish_payment_rejected(json.dumps(message_payload))
+        rabbitmq_manager.publish_payment_rejected(json.dumps(message_payload), payment.booking_id)
     
     return jsonify({
         "status": "success",
@@ -1,3 +1,4 @@
+import threading
 import requests
 from typing import Dict, Optional
 from uuid import uuid4
@@ -5,10 +6,15 @@ from flask import current_app
 
 from app.models.payment import Payment
 
+# Payments of a booking are created under the lock of its stripe (hash(booking_id) % LOCK_STRIPES)
+LOCK_STRIPES = 64
+
 class PaymentManager:
     _instance = None
     _initialized = False
     payments: Dict[str, Payment] = {}
+    payments_by_booking: Dict[str, Payment] = {}
+    _locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
 
     def __new__(cls):
         if cls._instance is None:
@@ -20,6 +26,16 @@ class PaymentManager:
             PaymentManager._initialized = True
 
     def create_payment(self, booking_id: str, amount: float, customer_email: str, customer_name: str, number_of_passengers: int, number_of_cabins: int) -> Payment:
+        # A redelivered booking_created event must not create a second link, even
+        # when both deliveries are handled at the same time by different workers
+        with self._locks[hash(booking_id) % LOCK_STRIPES]:
+            return self._create_payment(booking_id, amount, customer_email, customer_name, number_of_passengers, number_of_cabins)
+
+    def _create_payment(self, booking_id: str, amount: float, customer_email: str, customer_name: str, number_of_passengers: int, number_of_cabins: int) -> Payment:
+        existing = self.payments_by_booking.get(booking_id)
+        if existing:
+            return existing
+
         payment = Payment(
             id=f"PAY-{uuid4().hex[:8].upper()}",
             booking_id=booking_id,
@@ -54,6 +70,7 @@ class PaymentManager:
             raise Exception({"error": f"Payment API error: {str(e)}", "code": 500})
         
         self.payments[payment.id] = payment
+        self.payments_by_booking[booking_id] = payment
         return payment
 
     def get_payment(self, payment_id: str) -> Optional[Payment]:
@@ -8,6 +8,8 @@ from dotenv import load_dotenv
 from models import Ticket, TicketBookingResponse
 
 from crypto_verify import verify_signature
+from common.log_sink import LogSink
+from common.shard_ring import HashRing
 
 load_dotenv()
 
@@ -27,6 +29,16 @@ LOGS_ROUTING_KEY = os.getenv("LOGS_ROUTING_KEY")
 PAYMENT_ACCEPTED_ROUTING_KEY=os.getenv("PAYMENT_ACCEPTED_ROUTING_KEY")
 TICKET_GENERATED_ROUTING_KEY=os.getenv("TICKET_GENERATED_ROUTING_KEY")
 
+# Number of booking shards: events about a booking go to its shard's routing key
+BOOKING_SHARD_COUNT = int(os.getenv("BOOKING_SHARD_COUNT", "1"))
+ring = HashRing(BOOKING_SHARD_COUNT)
+
+# Log shipping
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "50"))
+LOG_FLUSH_INTERVAL_MS = int(os.getenv("LOG_FLUSH_INTERVAL_MS", "200"))
+LOG_BUFFER_SIZE = int(os.getenv("LOG_BUFFER_SIZE", "10000"))
+LOG_OVERFLOW_POLICY = os.getenv("LOG_OVERFLOW_POLICY", "drop_oldest")
+
 if not all([RABBITMQ_USER, RABBITMQ_PASS, RABBITMQ_HOST, RABBITMQ_PORT, LOGS_ROUTING_KEY, PAYMENT_ACCEPTED_ROUTING_KEY, TICKET_GENERATED_ROUTING_KEY]):
     raise EnvironmentError("One or more required environment variables are missing.")
 
@@ -37,32 +49,17 @@ if not all([RABBITMQ_USER, RABBITMQ_PASS, RABBITMQ_HOST, RABBITMQ_PORT, LOGS_ROU
 def payment_accepted_callback(ch, method, properties, body):
     data = json.loads(body.decode("utf-8"))
 
-    ch.basic_publish(
-        exchange="direct", 
-        routing_key=LOGS_ROUTING_KEY, 
-        body=f"Payment Accepted Received".encode("utf-8"), 
-        properties=pika.BasicProperties(headers={"sender": "ticket"})
-    )
+    log_sink.log("Payment Accepted Received")
 
     signature = base64.b64decode(data["signature"])
     transaction = data["transaction"]
     transaction_str = json.dumps(transaction, sort_keys=True)
 
     if not verify_signature(value=transaction_str, sig=signature):
-        ch.basic_publish(
-            exchange="direct", 
-            routing_key=LOGS_ROUTING_KEY, 
-            body=f"ERROR: Payment accepted - signature invalid! transaction_id: {transaction["id"]} for booking_id {transaction["booking_id"]}".encode("utf-8"), 
-            properties=pika.BasicProperties(headers={"sender": "ticket"})
-        )
+        log_sink.log(f"ERROR: Payment accepted - signature invalid! transaction_id: {transaction["id"]} for booking_id {transaction["booking_id"]}")
         return
     
-    ch.basic_publish(
-        exchange="direct", 
-        routing_key=LOGS_ROUTING_KEY, 
-        body=f"Payment validated - generating tickets! transaction_id: {transaction["id"]} for booking_id {transaction["booking_id"]}".encode("utf-8"), 
-        properties=pika.BasicProperties(headers={"sender": "ticket"})
-    )
+    log_sink.log(f"Payment validated - generating tickets! transaction_id: {transaction["id"]} for booking_id {transaction["booking_id"]}")
 
     tickets = []
     num_passengers = transaction["number_of_passengers"]
@@ -90,7 +87,7 @@ def payment_accepted_callback(ch, method, properties, body):
 
     ch.basic_publish(
         exchange="direct", 
-        routing_key=TICKET_GENERATED_ROUTING_KEY, 
+        routing_key=ring.routing_key(TICKET_GENERATED_ROUTING_KEY, transaction["booking_id"]), 
         body=ticket_response.model_dump_json().encode("utf-8"), 
         properties=pika.BasicProperties(headers={"sender": "ticket"})
     )
@@ -120,10 +117,22 @@ connection = create_rabbitmq_connection()
 channel = connection.channel()
 channel.exchange_declare(exchange="direct", exchange_type="direct")
 
+# Log lines are shipped in batches from a separate connection
+log_sink = LogSink(
+    create_connection=create_rabbitmq_connection,
+    sender="ticket",
+    routing_key=LOGS_ROUTING_KEY,
+    batch_size=LOG_BATCH_SIZE,
+    flush_interval_ms=LOG_FLUSH_INTERVAL_MS,
+    capacity=LOG_BUFFER_SIZE,
+    overflow_policy=LOG_OVERFLOW_POLICY
+)
+
 # Payment Accepted Queue ->  consumer
 queue_name = "payment_accepted_ticket"
 channel.queue_declare(queue=queue_name, durable=True)
-channel.queue_bind(exchange="direct", queue=queue_name, routing_key=PAYMENT_ACCEPTED_ROUTING_KEY)
+for routing_key in ring.routing_keys(PAYMENT_ACCEPTED_ROUTING_KEY):
+    channel.queue_bind(exchange="direct", queue=queue_name, routing_key=routing_key)
 channel.basic_consume(queue=queue_name, on_message_callback=payment_accepted_callback, auto_ack=True)
 
 print("Finished setup. All queues declared")
@@ -140,6 +149,7 @@ def start_rabbitmq_consumer():
     except KeyboardInterrupt:
         print("Stopping ticket service.")
     finally:
+        log_sink.stop()
         if connection and not connection.is_closed:
             connection.close()
 